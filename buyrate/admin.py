@@ -1,6 +1,13 @@
 from django.contrib import admin
+from django.db import transaction
+from django.http import FileResponse, Http404
+from django.urls import path, reverse
+from django.utils.html import format_html
 
-from .models import Ad, Review
+from .cache import AdFacetsCache, AdsListCache, EdgeCache
+from .models import Ad, AdImport, AuthorStats, Review
+from .services import ReviewStatsService
+from .tasks import import_ads
 
 
 @admin.register(Ad)
@@ -12,6 +19,7 @@ class AdAdmin(admin.ModelAdmin):
         list_filter - фильтрация по автору, дате и времени создания
         list_display - выводит на экран: название, цена, автор, время и дата создания
         search_fields - поиск по: названию
+    Изменение и удаление объявлений сбрасывает кэш списка объявлений и пограничный кэш
     """
 
     ordering = ("-created_at",)
@@ -24,6 +32,25 @@ class AdAdmin(admin.ModelAdmin):
     )
     search_fields = ("title",)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        AdsListCache.bump_generation()
+        AdFacetsCache.bump_generation()
+        EdgeCache.purge("ads-list", *EdgeCache.ad_keys([obj.pk]))
+
+    def delete_model(self, request, obj):
+        keys = EdgeCache.ad_keys([obj.pk], reviews=True)
+        super().delete_model(request, obj)
+        AdsListCache.bump_generation()
+        AdFacetsCache.bump_generation()
+        EdgeCache.purge("ads-list", "reviews-list", *keys)
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        AdsListCache.bump_generation()
+        AdFacetsCache.bump_generation()
+        EdgeCache.purge("ads", "reviews")
+
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
@@ -34,6 +61,8 @@ class ReviewAdmin(admin.ModelAdmin):
         list_filter - фильтрация по автору, объявлению, дате и времени создания
         list_display - выводит на экран: автор, объявление, дата и время создания
         search_fields - поиск по: объявлению
+    Создание, изменение и удаление отзывов обновляет агрегаты отзывов объявления через ReviewStatsService
+    (как и API) и сбрасывает кэш списка объявлений и пограничный кэш
     """
 
     ordering = ("-created_at",)
@@ -44,3 +73,141 @@ class ReviewAdmin(admin.ModelAdmin):
         "created_at",
     )
     search_fields = ("ad",)
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if not change:
+                ReviewStatsService.review_created(obj)
+                ad_ids = [obj.ad_id]
+            elif "ad" in form.changed_data:
+                # отзыв перенесен на другое объявление: пересчитываются агрегаты обоих
+                ad_ids = [form.initial["ad"], obj.ad_id]
+                ReviewStatsService.refresh(ad_ids)
+            else:
+                ReviewStatsService.review_updated(obj.ad_id)
+                ad_ids = [obj.ad_id]
+            AdsListCache.bump_generation()
+            EdgeCache.purge("ads-list", "reviews-list", *EdgeCache.ad_keys(ad_ids, reviews=True))
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            ReviewStatsService.review_deleted(obj.ad_id)
+            AdsListCache.bump_generation()
+            EdgeCache.purge("ads-list", "reviews-list", *EdgeCache.ad_keys([obj.ad_id], reviews=True))
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            ad_ids = set(queryset.values_list("ad_id", flat=True))
+            super().delete_queryset(request, queryset)
+            ReviewStatsService.refresh(ad_ids)
+            AdsListCache.bump_generation()
+            EdgeCache.purge("ads", "reviews")
+
+
+@admin.register(AdImport)
+class AdImportAdmin(admin.ModelAdmin):
+    """
+    Класс для загрузки объявлений продавца из CSV администратором
+    Атрибуты:
+        ordering - сортировка по дате и времени загрузки по убыванию
+        list_filter - фильтрация по статусу
+        list_display - выводит на экран: файл, продавец, статус, к-во созданных и отклоненных, файл ошибок
+        raw_id_fields - продавец выбирается по ID
+    Загрузку можно только создать и просмотреть. Сохранение новой загрузки ставит задачу import_ads
+    в исходящую очередь, файл ошибок скачивается только через админку (каталог imports закрыт в nginx)
+    """
+
+    ordering = ("-created_at",)
+    list_filter = ("status",)
+    list_display = (
+        "file",
+        "author",
+        "status",
+        "created",
+        "failed",
+        "errors_link",
+        "created_at",
+        "started_at",
+        "finished_at",
+    )
+    raw_id_fields = ("author",)
+    readonly_fields = (
+        "status",
+        "created",
+        "failed",
+        "errors_link",
+        "error",
+        "created_at",
+        "started_at",
+        "finished_at",
+    )
+
+    def get_fields(self, request, obj=None):
+        if obj is None:
+            return ("file", "author")
+        return ("file", "author", *self.readonly_fields)
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            import_ads.enqueue(obj.pk)
+
+    def get_urls(self):
+        urls = [
+            path(
+                "<int:object_id>/errors/",
+                self.admin_site.admin_view(self.errors_view),
+                name="buyrate_adimport_errors",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    @admin.display(description="Файл ошибок")
+    def errors_link(self, obj):
+        if not obj.errors_file:
+            return "-"
+        return format_html('<a href="{}">скачать</a>', reverse("admin:buyrate_adimport_errors", args=[obj.pk]))
+
+    def errors_view(self, request, object_id):
+        """Отдает файл ошибок загрузки"""
+        obj = self.get_object(request, str(object_id))
+        if obj is None or not obj.errors_file or not self.has_view_permission(request, obj):
+            raise Http404
+        return FileResponse(obj.errors_file.open("rb"), as_attachment=True, filename=f"ad-import-{obj.pk}-errors.csv")
+
+
+@admin.register(AuthorStats)
+class AuthorStatsAdmin(admin.ModelAdmin):
+    """
+    Класс для просмотра администратором статистики продавцов (материализованное представление, только чтение)
+    Атрибуты:
+        ordering - сортировка по к-ву объявлений по убыванию
+        list_display - выводит на экран: продавец, к-во объявлений и отзывов, средняя цена, последняя активность
+        search_fields - поиск по: email продавца
+    Статистика обновляется задачей refresh_author_stats по расписанию celery beat
+    """
+
+    ordering = ("-ads_count", "-author_id")
+    list_display = (
+        "author",
+        "ads_count",
+        "reviews_count",
+        "avg_price",
+        "last_activity_at",
+    )
+    list_select_related = ("author",)
+    search_fields = ("author__email",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
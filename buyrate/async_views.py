@@ -0,0 +1,240 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+
+from buyrate.cache import AdsListCache, EdgeCache
+from buyrate.mixins import ConditionalGetMixin, EdgeCacheMixin
+from buyrate.models import Ad, Review
+from buyrate.paginators import AsyncBuyRatePaginator
+from buyrate.views import AdRetrieveAPIView, AdsListAPIView, AllReviewsListAPIView, ReviewsListAPIView
+from config.renderers import ORJSONRenderer
+from users.authentication import AsyncJWTAuthentication
+
+
+class BaseAsyncReadView(View):
+    """
+    Базовое асинхронное представление чтения (GET) для запуска под ASGI.
+    Конфигурация (queryset, фильтры, сериализатор, права) берется из синхронного представления sync_view_class,
+    а запросы к БД выполняются асинхронным ORM, поэтому ожидание БД не занимает поток воркера.
+    Ответы и ошибки совпадают по формату с ответами DRF, включая заголовки пограничного кэша (EdgeCacheMixin).
+    Атрибуты:
+        sync_view_class - синхронное представление DRF с конфигурацией
+    Методы:
+        get(self, request, *args, **kwargs) -> HttpResponse:
+            Аутентифицирует пользователя, проверяет права и возвращает ответ.
+        authenticate(self) -> None:
+            Определяет пользователя по JWT без блокирующих запросов.
+        check_permissions(self) -> None:
+            Проверяет права синхронного представления.
+        read(self, request, *args, **kwargs) -> HttpResponse:
+            Возвращает ответ с данными асинхронного метода get_data, который определяют подклассы.
+        render(self, data, status_code=200, headers=None) -> HttpResponse:
+            Возвращает JSON-ответ.
+        handle_exception(self, exc) -> HttpResponse:
+            Возвращает ответ с ошибкой в формате DRF.
+        finalize_response(self, response) -> HttpResponse:
+            Добавляет к ответу заголовки пограничного кэша синхронного представления.
+    """
+
+    sync_view_class = None
+    http_method_names = ["get", "head", "options"]
+    authentication_class = AsyncJWTAuthentication
+    renderer_class = ORJSONRenderer
+
+    async def get(self, request, *args, **kwargs) -> HttpResponse:
+        """Аутентифицирует пользователя, проверяет права и возвращает ответ."""
+        self.request = Request(request)
+        self.request.accepted_renderer = self.renderer_class()
+        self.request.accepted_media_type = self.renderer_class.media_type
+        self.authenticator = self.authentication_class()
+        self.view = self.sync_view_class(request=self.request, args=args, kwargs=kwargs, format_kwarg=None)
+        try:
+            await self.authenticate()
+            self.check_permissions()
+            response = await self.read(self.request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            response = self.handle_exception(exc)
+        return self.finalize_response(response)
+
+    async def authenticate(self) -> None:
+        """Определяет пользователя по JWT без блокирующих запросов."""
+        result = await self.authenticator.aauthenticate(self.request)
+        if result is None:
+            self.request.user, self.request.auth = AnonymousUser(), None
+        else:
+            self.request.user, self.request.auth = result
+
+    def check_permissions(self) -> None:
+        """Проверяет права синхронного представления."""
+        for permission in self.view.get_permissions():
+            if not permission.has_permission(self.request, self.view):
+                if self.request.auth is None:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, "message", None))
+
+    async def read(self, request, *args, **kwargs) -> HttpResponse:
+        """Возвращает ответ с данными get_data."""
+        return self.render(await self.get_data())
+
+    def render(self, data, status_code: int = status.HTTP_200_OK, headers: dict | None = None) -> HttpResponse:
+        """Возвращает JSON-ответ."""
+        content = self.request.accepted_renderer.render(data, self.request.accepted_media_type)
+        return HttpResponse(
+            content, status=status_code, content_type=self.request.accepted_media_type, headers=headers
+        )
+
+    def handle_exception(self, exc) -> HttpResponse:
+        """Возвращает ответ с ошибкой в формате DRF."""
+        headers = {}
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            headers["WWW-Authenticate"] = self.authenticator.authenticate_header(self.request)
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        return self.render(data, exc.status_code, headers)
+
+    def finalize_response(self, response) -> HttpResponse:
+        """Добавляет к ответу заголовки пограничного кэша синхронного представления"""
+        if isinstance(self.view, EdgeCacheMixin):
+            EdgeCache.set_headers(self.request, response, self.view.get_surrogate_keys())
+        return response
+
+
+class BaseAsyncListView(BaseAsyncReadView):
+    """
+    Базовое асинхронное представление списка с пагинацией BuyRatePaginator
+    Использует быстрый сериализатор синхронного представления (FastReadListMixin), если он доступен.
+    Методы:
+        get_queryset(self):
+            Возвращает отфильтрованный queryset синхронного представления.
+        get_data(self) -> dict:
+            Возвращает страницу списка.
+    """
+
+    pagination_class = AsyncBuyRatePaginator
+
+    async def get_queryset(self):
+        """
+        Возвращает отфильтрованный queryset синхронного представления.
+        Фильтры выполняются в потоке: проверка параметров фильтра может обращаться к БД.
+        """
+        return await sync_to_async(self.view.filter_queryset)(self.view.get_queryset())
+
+    async def get_data(self) -> dict:
+        """Возвращает страницу списка."""
+        paginator = self.pagination_class()
+        queryset = await self.get_queryset()
+        fast_serializer = self.view.get_fast_serializer()
+        if fast_serializer is not None:
+            queryset = fast_serializer.get_queryset(queryset)
+        page = await paginator.apaginate_queryset(queryset, self.request, self.view)
+        if fast_serializer is not None:
+            data = fast_serializer.serialize(page)
+        else:
+            data = self.view.get_serializer(page, many=True).data
+        return paginator.get_paginated_response(data).data
+
+
+class AsyncAdsListView(BaseAsyncListView):
+    """
+    Асинхронное представление списка объявлений (GET), аналог AdsListAPIView
+    Поддерживает поиск, фильтры, ?embed_reviews=N и кэш ответов анонимным пользователям.
+    Методы:
+        read(self, request, *args, **kwargs) -> HttpResponse:
+            Возвращает список объявлений из кэша или формирует и кэширует его.
+    """
+
+    sync_view_class = AdsListAPIView
+
+    async def read(self, request, *args, **kwargs) -> HttpResponse:
+        """Возвращает список объявлений из кэша или формирует и кэширует его."""
+        if not AdsListCache.is_cacheable(request):
+            return await super().read(request, *args, **kwargs)
+        data = await sync_to_async(AdsListCache.get)(request)
+        if data is not None:
+            return self.render(data, headers={"X-Cache": "HIT"})
+        data = await self.get_data()
+        await sync_to_async(AdsListCache.set)(request, data)
+        return self.render(data, headers={"X-Cache": "MISS"})
+
+
+class AsyncAdRetrieveView(ConditionalGetMixin, BaseAsyncReadView):
+    """
+    Асинхронное представление объявления по идентификатору (GET), аналог AdRetrieveAPIView
+    Поддерживает условный GET с теми же ETag и Last-Modified.
+    Методы:
+        aget_object(self) -> Ad:
+            Возвращает объявление, загружая его один раз за запрос.
+        aget_validators(self) -> tuple:
+            Возвращает валидаторы объявления.
+    """
+
+    sync_view_class = AdRetrieveAPIView
+
+    async def read(self, request, *args, **kwargs) -> HttpResponse:
+        return await self.aconditional_get(super().read, request, *args, **kwargs)
+
+    async def aget_object(self) -> Ad:
+        """Возвращает объявление, загружая его один раз за запрос."""
+        if not hasattr(self.view, "_object"):
+            queryset = await sync_to_async(self.view.filter_queryset)(self.view.get_queryset())
+            lookup_url_kwarg = self.view.lookup_url_kwarg or self.view.lookup_field
+            obj = await queryset.filter(**{self.view.lookup_field: self.view.kwargs[lookup_url_kwarg]}).afirst()
+            if obj is None:
+                raise exceptions.NotFound(f"No {queryset.model._meta.object_name} matches the given query.")
+            self.view.check_object_permissions(self.request, obj)
+            self.view._object = obj
+        return self.view._object
+
+    async def aget_validators(self) -> tuple:
+        """Возвращает валидаторы объявления."""
+        await self.aget_object()
+        return self.view.get_validators()
+
+    async def get_data(self) -> dict:
+        return self.view.get_serializer(await self.aget_object()).data
+
+
+class AsyncAllReviewsListView(BaseAsyncListView):
+    """Асинхронное представление списка всех отзывов (GET), аналог AllReviewsListAPIView"""
+
+    sync_view_class = AllReviewsListAPIView
+
+
+class AsyncReviewsListView(ConditionalGetMixin, BaseAsyncListView):
+    """
+    Асинхронное представление списка отзывов объявления (GET), аналог ReviewsListAPIView
+    Поддерживает условный GET с теми же ETag и Last-Modified.
+    Методы:
+        aget_validators(self) -> tuple:
+            Возвращает валидаторы списка отзывов одним агрегирующим запросом.
+        get_queryset(self):
+            Возвращает отзывы объявления или ошибку 404.
+        aad_exists(self, ad_id) -> bool:
+            Проверяет существование объявления.
+    """
+
+    sync_view_class = ReviewsListAPIView
+
+    async def read(self, request, *args, **kwargs) -> HttpResponse:
+        return await self.aconditional_get(super().read, request, *args, **kwargs)
+
+    async def aget_validators(self) -> tuple:
+        """Возвращает валидаторы списка отзывов одним агрегирующим запросом."""
+        self.view.validators_row = await self.view.get_validators_queryset().afirst()
+        return self.view.make_list_validators(self.view.validators_row)
+
+    async def get_queryset(self):
+        """Возвращает отзывы объявления или ошибку 404."""
+        ad_id = self.view.kwargs.get("ad_id")
+        if ad_id is None or not await self.aad_exists(ad_id):
+            raise exceptions.NotFound(self.view.ad_not_found_message)
+        queryset = Review.objects.filter(ad_id=ad_id).order_by("-created_at", "-id")
+        return await sync_to_async(self.view.filter_queryset)(queryset)
+
+    async def aad_exists(self, ad_id) -> bool:
+        """Проверяет существование объявления по результату запроса валидаторов, если он уже выполнен."""
+        if hasattr(self.view, "validators_row"):
+            return self.view.validators_row is not None
+        return await Ad.objects.filter(id=ad_id).aexists()
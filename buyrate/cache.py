@@ -0,0 +1,233 @@
+import hashlib
+import secrets
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from buyrate.tasks import purge_edge_cache
+from config.replicas import WriteFence
+
+
+class AdsListCache:
+    """
+    Поколенческий кэш ответов списка объявлений для анонимных пользователей.
+    Ключ ответа строится из номера поколения и нормализованных параметров запроса,
+    поэтому для инвалидации достаточно увеличить номер поколения: старые ключи истекают по TTL.
+    Методы:
+        is_cacheable(request) -> bool:
+            Проверяет, можно ли отдать ответ из кэша.
+        get(request):
+            Возвращает данные ответа из кэша или None.
+        set(request, data) -> None:
+            Сохраняет данные ответа в кэш.
+        bump_generation() -> None:
+            Увеличивает номер поколения после фиксации транзакции.
+        stats() -> dict:
+            Возвращает счетчики попаданий и промахов.
+    """
+
+    prefix = "buyrate:ads"
+    generation_key = f"{prefix}:generation"
+    hits_key = f"{prefix}:hits"
+    misses_key = f"{prefix}:misses"
+    bypass_query_param = "nocache"
+
+    @classmethod
+    def is_cacheable(cls, request) -> bool:
+        """Проверяет, можно ли отдать ответ из кэша: анонимный GET без отказа от кэша"""
+        if request.method != "GET" or request.user.is_authenticated:
+            return False
+        if request.query_params.get(cls.bypass_query_param) in ("1", "true"):
+            return False
+        return "no-cache" not in request.headers.get("Cache-Control", "")
+
+    @classmethod
+    def get(cls, request):
+        """Возвращает данные ответа из кэша или None"""
+        data = cache.get(cls.make_key(request))
+        cls._incr(cls.misses_key if data is None else cls.hits_key)
+        return data
+
+    @classmethod
+    def set(cls, request, data) -> None:
+        """Сохраняет данные ответа в кэш"""
+        cache.set(cls.make_key(request), data, settings.ADS_LIST_CACHE_TIMEOUT)
+
+    @classmethod
+    def make_key(cls, request) -> str:
+        """Строит ключ из поколения, хоста и отсортированных параметров запроса"""
+        params = sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            if name != cls.bypass_query_param
+            for value in values
+        )
+        raw = f"{request.get_host()}?{params}"
+        return f"{cls.prefix}:{cls.get_generation()}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+    @classmethod
+    def get_generation(cls) -> int:
+        """Возвращает текущий номер поколения"""
+        return cache.get_or_set(cls.generation_key, time.time_ns, timeout=None)
+
+    @classmethod
+    def bump_generation(cls) -> None:
+        """Увеличивает номер поколения после фиксации текущей транзакции (после границы записи для реплик)"""
+        WriteFence.record_on_commit()
+        transaction.on_commit(cls._bump)
+
+    @classmethod
+    def _bump(cls) -> None:
+        try:
+            cache.incr(cls.generation_key)
+        except ValueError:
+            cache.set(cls.generation_key, time.time_ns(), timeout=None)
+
+    @classmethod
+    def stats(cls) -> dict:
+        """Возвращает счетчики попаданий и промахов"""
+        counters = cache.get_many([cls.hits_key, cls.misses_key])
+        return {"hits": counters.get(cls.hits_key, 0), "misses": counters.get(cls.misses_key, 0)}
+
+    @staticmethod
+    def _incr(key: str) -> None:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 0, timeout=None)
+            cache.incr(key)
+
+
+class AdFacetsCache(AdsListCache):
+    """
+    Кэш счетчиков фасетов объявлений (AdFacetsAPIView) с коротким временем жизни (ADS_FACETS_CACHE_TIMEOUT).
+    Поколение свое: счетчики зависят только от объявлений, поэтому его сбрасывает только запись объявлений,
+    а создание, удаление и импорт отзывов (сброс поколения списка) фасеты не сбрасывают.
+    Ключ строится из параметров поиска и фильтров: пагинация, сортировка и пустые значения на счетчики
+    не влияют и в ключ не входят, поисковый запрос нормализуется (пробелы, регистр) так же, как его
+    разбирает полнотекстовый поиск, остальные параметры входят в ключ как есть.
+    Счетчики не зависят от пользователя, поэтому кэшируются и для авторизованных запросов.
+    При промахе счетчики считает один запрос (блокировка в кэше на ADS_FACETS_LOCK_TIMEOUT секунд),
+    остальные ждут его результата и считают сами, только если блокировка истекла. Блокировка хранит случайный
+    токен владельца и снимается только им.
+    Методы:
+        get_or_set(request, compute) -> tuple:
+            Возвращает данные из кэша или вычисляет их одним запросом и признак попадания.
+    """
+
+    prefix = "buyrate:facets"
+    generation_key = f"{prefix}:generation"
+    hits_key = f"{prefix}:hits"
+    misses_key = f"{prefix}:misses"
+    params = ("search", "title", "price_min", "price_max", "author", "created_at_after", "created_at_before")
+    lock_poll_interval = 0.05
+
+    @classmethod
+    def is_cacheable(cls, request) -> bool:
+        """Проверяет, можно ли отдать ответ из кэша: GET без отказа от кэша"""
+        if request.method != "GET" or request.query_params.get(cls.bypass_query_param) in ("1", "true"):
+            return False
+        return "no-cache" not in request.headers.get("Cache-Control", "")
+
+    @classmethod
+    def set(cls, request, data) -> None:
+        """Сохраняет данные ответа в кэш"""
+        cache.set(cls.make_key(request), data, settings.ADS_FACETS_CACHE_TIMEOUT)
+
+    @classmethod
+    def get_or_set(cls, request, compute) -> tuple:
+        """
+        Возвращает данные из кэша или вычисляет их, не допуская одновременного пересчета одного ключа
+        :param request: Запрос
+        :param compute: Функция вычисления данных
+        :return: Данные и признак попадания в кэш
+        """
+        key = cls.make_key(request)
+        data = cache.get(key)
+        cls._incr(cls.misses_key if data is None else cls.hits_key)
+        if data is not None:
+            return data, True
+        lock_key = f"{key}:lock"
+        token = secrets.token_hex(16)
+        owner = cache.add(lock_key, token, settings.ADS_FACETS_LOCK_TIMEOUT)
+        if not owner:
+            deadline = time.monotonic() + settings.ADS_FACETS_LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(cls.lock_poll_interval)
+                data = cache.get(key)
+                if data is not None:
+                    return data, True
+        try:
+            data = compute()
+            cache.set(key, data, settings.ADS_FACETS_CACHE_TIMEOUT)
+        finally:
+            # снимает только свою блокировку: ждущий после таймаута и владелец, чья блокировка истекла
+            # и перешла другому запросу, чужую не удаляют
+            if owner and cache.get(lock_key) == token:
+                cache.delete(lock_key)
+        return data, False
+
+    @classmethod
+    def make_key(cls, request) -> str:
+        """Строит ключ из поколения, хоста и параметров поиска и фильтров (поисковый запрос нормализуется)"""
+        params = []
+        for name in cls.params:
+            for value in request.query_params.getlist(name):
+                if name == "search":
+                    value = " ".join(value.split()).lower()
+                if value:
+                    params.append((name, value))
+        raw = f"{request.get_host()}?{sorted(params)}"
+        return f"{cls.prefix}:{cls.get_generation()}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+
+class EdgeCache:
+    """
+    Заголовки пограничного кэша (nginx proxy_cache) и его очистка по суррогатным ключам.
+    Успешные ответы без заголовка Authorization кэшируются на границе на EDGE_CACHE_TIMEOUT секунд (s-maxage),
+    а браузер перепроверяет их по ETag (max-age=0); ответы на запросы с Authorization помечаются private.
+    Ключи ответа (ads, ads-list, ad-<id>, ad-<id>-reviews, reviews, reviews-list) передаются в заголовке
+    Surrogate-Key, после записи затронутые ключи очищаются задачей purge_edge_cache, которая ставится
+    в исходящую очередь текущей транзакции. Без EDGE_PURGE_URL очистка отключена.
+    Методы:
+        set_headers(request, response, keys) -> None:
+            Добавляет к ответу заголовки Cache-Control, Vary и Surrogate-Key.
+        purge(*keys) -> None:
+            Ставит очистку ключей в исходящую очередь.
+        ad_keys(ad_ids, reviews=False) -> list:
+            Возвращает ключи объявлений и, при необходимости, их отзывов.
+    """
+
+    header = "Surrogate-Key"
+    vary = ("Accept", "Authorization")
+    cacheable_statuses = (200, 304)
+
+    @classmethod
+    def set_headers(cls, request, response, keys) -> None:
+        """Добавляет к ответу заголовки Cache-Control, Vary и Surrogate-Key (Cache-Control - только к 200 и 304)"""
+        patch_vary_headers(response, cls.vary)
+        if response.status_code not in cls.cacheable_statuses:
+            return
+        if "HTTP_AUTHORIZATION" in request.META:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=0, s_maxage=settings.EDGE_CACHE_TIMEOUT)
+        response[cls.header] = " ".join(keys)
+
+    @staticmethod
+    def purge(*keys) -> None:
+        """Ставит очистку ключей в исходящую очередь (задача выполнится после фиксации транзакции)"""
+        if settings.EDGE_PURGE_URL and keys:
+            WriteFence.record_on_commit()
+            purge_edge_cache.enqueue(sorted(set(keys)))
+
+    @staticmethod
+    def ad_keys(ad_ids, reviews: bool = False) -> list:
+        """Возвращает ключи объявлений и, если reviews, ключи списков их отзывов"""
+        keys = [f"ad-{ad_id}" for ad_id in ad_ids]
+        if reviews:
+            keys += [f"ad-{ad_id}-reviews" for ad_id in ad_ids]
+        return keys
@@ -0,0 +1,106 @@
+import django_filters
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, Q
+from rest_framework.filters import SearchFilter
+
+from buyrate.models import Ad, AuthorStats
+
+
+class AdSearchFilter(SearchFilter):
+    """
+    Полнотекстовый поиск объявлений по названию и описанию (PostgreSQL).
+    Запрос сопоставляется с поисковым вектором (GIN-индекс) в конфигурациях russian и english,
+    а для опечаток используется триграммное сходство с названием (GIN-индекс gin_trgm_ops).
+    Результаты сортируются по релевантности.
+    Методы:
+        filter_queryset(self, request, queryset, view):
+            Фильтрует и ранжирует объявления по поисковому запросу.
+    """
+
+    search_configs = ("russian", "english")
+    search_type = "websearch"
+
+    def filter_queryset(self, request, queryset, view):
+        """Фильтрует и ранжирует объявления по поисковому запросу."""
+        text = request.query_params.get(self.search_param, "").strip()
+        if not text:
+            return queryset
+
+        query = None
+        for config in self.search_configs:
+            config_query = SearchQuery(text, config=config, search_type=self.search_type)
+            query = config_query if query is None else query | config_query
+
+        return (
+            queryset.annotate(
+                search_rank=SearchRank(F("search_vector"), query),
+                search_similarity=TrigramWordSimilarity(text, "title"),
+            )
+            .filter(Q(search_vector=query) | Q(title__trigram_word_similar=text))
+            .order_by(F("search_rank").desc(), F("search_similarity").desc(), "-created_at", "-id")
+        )
+
+
+class AdOrderingFilter(django_filters.OrderingFilter):
+    """
+    Сортировка объявлений по разрешенным полям с добавлением id того же направления.
+    id делает порядок однозначным (страницы не теряют и не повторяют строки), а пара (поле, id)
+    совпадает с составными индексами и сортировкой курсорной пагинации.
+    """
+
+    tiebreaker = "id"
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        ordering = self.get_ordering_value(value[0])
+        return qs.order_by(ordering, f"-{self.tiebreaker}" if ordering.startswith("-") else self.tiebreaker)
+
+
+class AdFilter(django_filters.FilterSet):
+    """
+    Фильтры и сортировка списка объявлений.
+    Каждое сочетание фильтра и сортировки обслуживается составным индексом (миграция 0007_ad_filter_indexes):
+    (price, id), (author, created_at, id), (author, price, id) и (created_at, id), название - индексом
+    (title, created_at, id) (миграция 0012_ad_title_index).
+    Атрибуты:
+        title - точное совпадение названия
+        price_min, price_max - диапазон цены (включительно)
+        author - ID автора
+        created_at_after, created_at_before - диапазон даты создания (ISO 8601, включительно)
+        ordering - сортировка: created_at, -created_at (по умолчанию), price, -price
+    """
+
+    price_min = django_filters.NumberFilter(field_name="price", lookup_expr="gte", min_value=0)
+    price_max = django_filters.NumberFilter(field_name="price", lookup_expr="lte", min_value=0)
+    # Число, а не выбор модели: проверка ModelChoiceFilter обращается к таблице пользователей
+    author = django_filters.NumberFilter(field_name="author_id", min_value=1)
+    created_at = django_filters.IsoDateTimeFromToRangeFilter()
+    ordering = AdOrderingFilter(fields=("created_at", "price"))
+
+    class Meta:
+        model = Ad
+        fields = ["title", "author"]
+
+
+class AuthorStatsOrderingFilter(AdOrderingFilter):
+    """Сортировка статистики продавцов с добавлением ID продавца того же направления."""
+
+    tiebreaker = "author_id"
+
+
+class AuthorStatsFilter(django_filters.FilterSet):
+    """
+    Фильтры и сортировка статистики продавцов.
+    Атрибуты:
+        ads_count_min - минимальное к-во объявлений (1 - только продавцы с объявлениями)
+        ordering - сортировка: ads_count, -ads_count (по умолчанию), reviews_count, -reviews_count,
+            last_activity_at, -last_activity_at
+    """
+
+    ads_count_min = django_filters.NumberFilter(field_name="ads_count", lookup_expr="gte", min_value=0)
+    ordering = AuthorStatsOrderingFilter(fields=("ads_count", "reviews_count", "last_activity_at"))
+
+    class Meta:
+        model = AuthorStats
+        fields = []
@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from buyrate.models import Ad, Review
+from buyrate.serializers import AdSerializers, FastReadSerializers, ReviewSerializers
+from config.renderers import ORJSONRenderer
+
+
+class Command(BaseCommand):
+    """
+    Команда для замера скорости сериализации списков объявлений и отзывов.
+    Сравнивает ModelSerializer + JSONRenderer с FastReadSerializers + ORJSONRenderer на строках в памяти
+    (без обращений к БД) и выводит время на строку и ускорение.
+    Методы:
+        add_arguments(self, parser):
+            Добавляет аргументы команды: rows, repeat.
+        handle(self, *args, **options) -> None:
+            Обрабатывает команду замера.
+    """
+
+    help = "Замер скорости сериализации списков объявлений и отзывов."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды: rows, repeat."""
+        parser.add_argument("--rows", type=int, default=1000, help="К-во строк")
+        parser.add_argument("--repeat", type=int, default=5, help="К-во повторов (берется лучший)")
+
+    def handle(self, *args, **options) -> None:
+        """Обрабатывает команду замера."""
+        rows, repeat = options["rows"], options["repeat"]
+        now = timezone.now()
+        ads = [
+            Ad(
+                id=i,
+                title=f"Объявление {i}",
+                price=1000 + i,
+                description="Описание объявления " * 5,
+                author_id=i % 10 + 1,
+                created_at=now,
+                updated_at=now,
+                reviews_count=i % 7,
+                last_review_at=now if i % 2 else None,
+            )
+            for i in range(1, rows + 1)
+        ]
+        reviews = [
+            Review(id=i, text="Текст отзыва " * 5, author_id=i % 10 + 1, ad_id=i, created_at=now, updated_at=now)
+            for i in range(1, rows + 1)
+        ]
+
+        for serializer_class, objects in ((AdSerializers, ads), (ReviewSerializers, reviews)):
+            fast_serializer = FastReadSerializers(serializer_class)
+            values = [tuple(getattr(obj, column) for column in fast_serializer.columns) for obj in objects]
+
+            baseline = self.measure(lambda: JSONRenderer().render(serializer_class(objects, many=True).data), repeat)
+            fast = self.measure(lambda: ORJSONRenderer().render(fast_serializer.serialize(values)), repeat)
+            self.stdout.write(
+                f"{serializer_class.__name__}: ModelSerializer+json {baseline / rows * 1e6:.2f} мкс/строка, "
+                f"FastReadSerializers+orjson {fast / rows * 1e6:.2f} мкс/строка, ускорение x{baseline / fast:.1f}"
+            )
+
+    @staticmethod
+    def measure(func, repeat: int) -> float:
+        """Возвращает лучшее время выполнения функции из repeat повторов, секунды"""
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
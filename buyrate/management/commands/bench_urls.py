@@ -0,0 +1,339 @@
+import io
+import json
+import statistics
+import tempfile
+import time
+from collections import Counter
+from contextlib import ExitStack, nullcontext
+from datetime import timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from buyrate import urls as buyrate_urls
+from buyrate.models import Ad, Review
+from config.query_budget import QueryRecorder
+from users import urls as users_urls
+from users.models import User
+from users.services import PasswordResetTokenService
+
+
+class Command(BaseCommand):
+    """
+    Команда нагрузочного замера всех URL buyrate и users на текущих данных (например, seed_buyrate).
+    Каждый URL запрашивается iterations раз тестовым клиентом в процессе (весь стек middleware, без сети)
+    от имени пользователей bench-user@example.com и bench-admin@example.com (создаются при первом запуске).
+    Для каждого URL считаются задержка (p50/p95/p99) и к-во SQL-запросов на запрос. Запросы записи
+    выполняются в транзакции, которая откатывается: данные БД и задачи TaskOutbox не меняются, кэши - меняются.
+    Транзакции представлений записи при этом вложенные, и к-во запросов включает их SAVEPOINT/RELEASE,
+    как в тестах. Результат сохраняется в JSON и при --baseline
+    сравнивается с сохраненным прогоном: рост p95 больше чем в threshold раз или рост к-ва запросов - регрессия.
+    Методы:
+        add_arguments(self, parser):
+            Добавляет аргументы команды: iterations, warmup, output, baseline, threshold, fail-on-regression, only.
+        handle(self, *args, **options) -> None:
+            Обрабатывает команду замера.
+        get_url_names() -> list:
+            Возвращает имена всех URL buyrate и users.
+        get_users(self) -> dict:
+            Возвращает пользователей замера.
+        get_cases(self, users: dict) -> dict:
+            Возвращает запросы замера по именам URL.
+        measure(self, client, case: dict, iterations: int, warmup: int) -> dict:
+            Выполняет запрос URL и возвращает статистику.
+        compare(report: dict, baseline: dict, threshold: float) -> list:
+            Возвращает регрессии относительно базового прогона.
+    """
+
+    help = "Замер задержки (p50/p95/p99) и к-ва SQL-запросов всех URL buyrate и users."
+    password = "bench-password"
+    bench_users = {"user": ("bench-user@example.com", "user"), "admin": ("bench-admin@example.com", "admin")}
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды: iterations, warmup, output, baseline, threshold, fail-on-regression, only."""
+        parser.add_argument("--iterations", type=int, default=30, help="К-во замеров на URL")
+        parser.add_argument("--warmup", type=int, default=3, help="К-во запросов на URL до замера (прогрев кэшей)")
+        parser.add_argument("--output", type=str, default="bench_urls.json", help="Файл результата (JSON)")
+        parser.add_argument("--baseline", type=str, default=None, help="Файл базового прогона для сравнения")
+        parser.add_argument("--threshold", type=float, default=1.2, help="Допустимый рост p95 относительно базы, раз")
+        parser.add_argument("--fail-on-regression", action="store_true", help="Ошибка при регрессии (для CI)")
+        parser.add_argument("--only", nargs="+", default=None, help="Имена URL для замера (buyrate:ads ...)")
+
+    def handle(self, *args, **options) -> None:
+        """Обрабатывает команду замера."""
+        if options["iterations"] < 2 or options["warmup"] < 0:
+            raise CommandError("Нужно не меньше 2 замеров на URL и неотрицательный прогрев.")
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as file:
+                baseline = json.load(file)
+
+        names = self.get_url_names()
+        if options["only"]:
+            unknown = sorted(set(options["only"]) - set(names))
+            if unknown:
+                raise CommandError(f"Неизвестные URL: {unknown}")
+            names = [name for name in names if name in options["only"]]
+        cases = self.get_cases(self.get_users())
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "iterations": options["iterations"],
+            "data": {"users": User.objects.count(), "ads": Ad.objects.count(), "reviews": Review.objects.count()},
+            "urls": {},
+            "skipped": [name for name in names if name not in cases],
+        }
+
+        client = APIClient()
+        client.raise_request_exception = False
+        # Загруженные аватары сохраняются во временный каталог
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            # Сначала чтение: запросы записи закрепляют пользователей за основной БД (ReplicaMiddleware)
+            for name in sorted((name for name in names if name in cases), key=lambda name: cases[name]["write"]):
+                result = self.measure(client, cases[name], options["iterations"], options["warmup"])
+                report["urls"][name] = result
+                self.stdout.write(
+                    f"{name:<32} {result['method']:<6} {result['status']} "
+                    f"p50 {result['p50_ms']:8.2f} p95 {result['p95_ms']:8.2f} p99 {result['p99_ms']:8.2f} мс, "
+                    f"запросов {result['queries']}"
+                )
+        report["urls"] = {name: report["urls"][name] for name in names if name in report["urls"]}
+
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        for name in report["skipped"]:
+            self.stdout.write(self.style.WARNING(f"URL без сценария замера: {name}"))
+        self.stdout.write(self.style.SUCCESS(f"Результат сохранен в {options['output']}"))
+
+        if baseline is not None:
+            regressions = self.compare(report, baseline, options["threshold"])
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(f"Регрессия: {regression}"))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS("Регрессий относительно базового прогона нет"))
+            elif options["fail_on_regression"]:
+                raise CommandError(f"Регрессий: {len(regressions)}")
+
+    @staticmethod
+    def get_url_names() -> list:
+        """Возвращает имена всех URL buyrate и users (пространство имен:имя)"""
+        return [
+            f"{module.app_name}:{pattern.name}"
+            for module in (buyrate_urls, users_urls)
+            for pattern in module.urlpatterns
+        ]
+
+    def get_users(self) -> dict:
+        """Возвращает пользователей замера (user, admin), создавая их при первом запуске"""
+        users = {}
+        for key, (email, role) in self.bench_users.items():
+            user, created = User.objects.get_or_create(email=email, defaults={"role": role})
+            if created:
+                user.set_password(self.password)
+                user.save(update_fields=["password"])
+            users[key] = user
+        return users
+
+    def get_cases(self, users: dict) -> dict:
+        """
+        Возвращает запросы замера по именам URL: метод, путь, данные (или функция, которая их возвращает),
+        пользователь (user, admin или None), формат тела. Объявление замера - объявление с наибольшим
+        к-вом отзывов, отзыв - его последний отзыв.
+        """
+        ad = Ad.objects.order_by("-reviews_count", "-id").first()
+        review = Review.objects.filter(ad=ad).order_by("-created_at", "-id").first() if ad else None
+        if review is None:
+            raise CommandError("Нет объявлений с отзывами: сгенерируйте данные командой seed_buyrate.")
+        batch_ids = list(Ad.objects.order_by("-created_at", "-id").values_list("id", flat=True)[:10])
+        user = users["user"]
+        ad_data = {"title": "Велосипед", "price": 1000, "description": "Объявление замера"}
+        import_body = "\n".join(
+            json.dumps({"ad": ad.pk, "author": user.pk, "text": "Отзыв замера"}) for _ in range(100)
+        ).encode("utf-8")
+        uidb64 = urlsafe_base64_encode(force_bytes(str(user.pk)))
+
+        def avatar_data() -> dict:
+            buffer = io.BytesIO()
+            Image.new("RGB", (256, 256), (200, 30, 30)).save(buffer, format="PNG")
+            return {"image": SimpleUploadedFile("avatar.png", buffer.getvalue(), content_type="image/png")}
+
+        def reset_password_confirm_data() -> dict:
+            token = PasswordResetTokenService.issue(user.pk)
+            return {"uid": uidb64, "token": token, "new_password": self.password}
+
+        ad_kwargs = {"pk": ad.pk}
+        review_kwargs = {"ad_id": ad.pk, "pk": review.pk}
+        case = self.make_case
+        return {
+            "buyrate:ads": case("GET", reverse("buyrate:ads"), user="user"),
+            # Без кэша фасетов: замеряется агрегатный запрос
+            "buyrate:ad-facets": case("GET", f"{reverse('buyrate:ad-facets')}?nocache=1", user="user"),
+            "buyrate:ad-create": case("POST", reverse("buyrate:ad-create"), ad_data, user="user"),
+            "buyrate:ad-detail": case("GET", reverse("buyrate:ad-detail", kwargs=ad_kwargs), user="user"),
+            "buyrate:ad-update": case(
+                "PATCH", reverse("buyrate:ad-update", kwargs=ad_kwargs), {"price": 2000}, user="admin"
+            ),
+            "buyrate:ad-delete": case("DELETE", reverse("buyrate:ad-delete", kwargs=ad_kwargs), user="admin"),
+            "buyrate:ad-batch-create": case(
+                "POST", reverse("buyrate:ad-batch-create"), [ad_data] * len(batch_ids), user="user"
+            ),
+            "buyrate:ad-batch-update": case(
+                "PATCH",
+                reverse("buyrate:ad-batch-update"),
+                [{"id": ad_id, "price": 2000} for ad_id in batch_ids],
+                user="admin",
+            ),
+            "buyrate:ad-batch-delete": case(
+                "DELETE", reverse("buyrate:ad-batch-delete"), {"ids": batch_ids}, user="admin"
+            ),
+            "buyrate:ad-batch-reprice": case(
+                "POST", reverse("buyrate:ad-batch-reprice"), {"percent": "5", "ids": batch_ids}, user="admin"
+            ),
+            "buyrate:ad-reviews": case("GET", reverse("buyrate:ad-reviews", kwargs={"ad_id": ad.pk}), user="user"),
+            "buyrate:ad-review-create": case(
+                "POST",
+                reverse("buyrate:ad-review-create", kwargs={"ad_id": ad.pk}),
+                {"text": "Отзыв замера"},
+                user="user",
+            ),
+            "buyrate:ad-review-detail": case(
+                "GET", reverse("buyrate:ad-review-detail", kwargs=review_kwargs), user="user"
+            ),
+            "buyrate:ad-review-update": case(
+                "PATCH", reverse("buyrate:ad-review-update", kwargs=review_kwargs), {"text": "Изменен"}, user="admin"
+            ),
+            "buyrate:ad-review-delete": case(
+                "DELETE", reverse("buyrate:ad-review-delete", kwargs=review_kwargs), user="admin"
+            ),
+            "buyrate:all-reviews": case("GET", reverse("buyrate:all-reviews"), user="user"),
+            "buyrate:reviews-import": case(
+                "POST",
+                reverse("buyrate:reviews-import"),
+                import_body,
+                user="admin",
+                content_type="application/x-ndjson",
+            ),
+            "buyrate:author-stats": case("GET", reverse("buyrate:author-stats"), user="admin"),
+            "buyrate:author-stats-detail": case(
+                "GET", reverse("buyrate:author-stats-detail", kwargs={"pk": ad.author_id}), user="admin"
+            ),
+            "buyrate:export": case(
+                "GET",
+                reverse("buyrate:export", kwargs={"table": "ads"}),
+                {"created_from": (timezone.now() - timedelta(days=1)).isoformat()},
+                user="user",
+            ),
+            "users:token_obtain_pair": case(
+                "POST", reverse("users:token_obtain_pair"), {"email": user.email, "password": self.password}
+            ),
+            "users:token_refresh": case(
+                "POST", reverse("users:token_refresh"), {"refresh": str(RefreshToken.for_user(user))}
+            ),
+            "users:register": case(
+                "POST", reverse("users:register"), {"email": "bench-register@example.com", "password": self.password}
+            ),
+            "users:reset_password": case("POST", reverse("users:reset_password"), {"email": user.email}),
+            "users:reset_password_confirm": case(
+                "POST", reverse("users:reset_password_confirm"), reset_password_confirm_data
+            ),
+            "users:avatar_upload": case(
+                "PUT", reverse("users:avatar_upload"), avatar_data, user="user", request_format="multipart"
+            ),
+            "users:avatar": case("GET", reverse("users:avatar", kwargs={"pk": user.pk}), {"size": 40}),
+        }
+
+    @staticmethod
+    def make_case(
+        method: str, path: str, data=None, user: str = None, request_format: str = "json", content_type: str = None
+    ) -> dict:
+        """Возвращает запрос замера; запросы, кроме GET, считаются записью и откатываются"""
+        return {
+            "method": method,
+            "path": path,
+            "data": data,
+            "user": user,
+            "format": request_format,
+            "content_type": content_type,
+            "write": method != "GET",
+        }
+
+    def measure(self, client, case: dict, iterations: int, warmup: int) -> dict:
+        """
+        Выполняет запрос URL warmup + iterations раз и возвращает статистику замеров
+        :param client: Тестовый клиент
+        :param case: Запрос замера
+        :param iterations: К-во замеров
+        :param warmup: К-во запросов до замера
+        :return: Метод, путь, частый статус, статусы, задержка p50/p95/p99/средняя (мс), к-во SQL-запросов
+        """
+        headers = {}
+        if case["user"] is not None:
+            user = User.objects.get(email=self.bench_users[case["user"]][0])
+            headers["HTTP_AUTHORIZATION"] = f"Bearer {AccessToken.for_user(user)}"
+        timings, queries, statuses = [], [], Counter()
+        for iteration in range(warmup + iterations):
+            with transaction.atomic() if case["write"] else nullcontext():
+                data = case["data"]() if callable(case["data"]) else case["data"]
+                recorder = QueryRecorder()
+                with ExitStack() as stack:
+                    for connection in connections.all():
+                        stack.enter_context(connection.execute_wrapper(recorder))
+                    start = time.perf_counter()
+                    if case["content_type"] is not None:
+                        response = client.generic(
+                            case["method"], case["path"], data, content_type=case["content_type"], **headers
+                        )
+                    elif case["method"] == "GET":
+                        response = client.get(case["path"], data, **headers)
+                    else:
+                        response = getattr(client, case["method"].lower())(
+                            case["path"], data, format=case["format"], **headers
+                        )
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                    elapsed = time.perf_counter() - start
+                if case["write"]:
+                    transaction.set_rollback(True)
+            if iteration >= warmup:
+                timings.append(elapsed * 1000)
+                queries.append(recorder.count)
+                statuses[response.status_code] += 1
+
+        percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+        return {
+            "method": case["method"],
+            "path": case["path"],
+            "status": statuses.most_common(1)[0][0],
+            "statuses": {str(code): count for code, count in sorted(statuses.items())},
+            "p50_ms": round(percentiles[49], 3),
+            "p95_ms": round(percentiles[94], 3),
+            "p99_ms": round(percentiles[98], 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "queries": round(statistics.median(queries)),
+            "queries_max": max(queries),
+        }
+
+    @staticmethod
+    def compare(report: dict, baseline: dict, threshold: float) -> list:
+        """
+        Возвращает регрессии относительно базового прогона: рост p95 больше чем в threshold раз
+        или рост максимального к-ва SQL-запросов на запрос
+        """
+        regressions = []
+        for name, result in report["urls"].items():
+            base = baseline.get("urls", {}).get(name)
+            if base is None:
+                continue
+            if result["p95_ms"] > base["p95_ms"] * threshold:
+                regressions.append(f"{name}: p95 {result['p95_ms']:.2f} мс (было {base['p95_ms']:.2f} мс)")
+            if result["queries_max"] > base["queries_max"]:
+                regressions.append(f"{name}: запросов {result['queries_max']} (было {base['queries_max']})")
+        return regressions
@@ -0,0 +1,99 @@
+import json
+import os
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Команда локального сервиса очистки пограничного кэша nginx по суррогатным ключам.
+    nginx без коммерческих модулей не очищает кэш по ключам, поэтому сервис принимает POST (или PURGE)
+    с заголовком Surrogate-Key и удаляет из каталога proxy_cache_path файлы, в сохраненных заголовках
+    ответа которых есть хотя бы один из ключей. Удаленный файл nginx считает промахом и запрашивает ответ заново.
+    Методы:
+        add_arguments(self, parser):
+            Добавляет аргументы команды: cache-dir, host, port.
+        handle(self, *args, **options) -> None:
+            Запускает HTTP-сервер очистки.
+        make_server(host, port, cache_dir) -> ThreadingHTTPServer:
+            Возвращает HTTP-сервер очистки.
+        purge(cache_dir, keys) -> int:
+            Удаляет файлы кэша с ключами и возвращает их к-во.
+    """
+
+    help = "Локальный сервис очистки кэша nginx по суррогатным ключам (Surrogate-Key)."
+    header = "Surrogate-Key"
+    header_pattern = re.compile(rb"^Surrogate-Key:[ \t]*([^\r\n]*)", re.IGNORECASE | re.MULTILINE)
+    header_limit = 64 * 1024  # заголовки ответа лежат в начале файла кэша после строки KEY
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды: cache-dir, host, port."""
+        parser.add_argument("--cache-dir", default="/var/cache/nginx/buyrate", help="Каталог proxy_cache_path")
+        parser.add_argument("--host", default="0.0.0.0", help="Адрес сервера")
+        parser.add_argument("--port", type=int, default=8080, help="Порт сервера")
+
+    def handle(self, *args, **options) -> None:
+        """Запускает HTTP-сервер очистки."""
+        server = self.make_server(options["host"], options["port"], options["cache_dir"])
+        self.stdout.write(self.style.SUCCESS(f"Очистка {options['cache_dir']} на {options['host']}:{options['port']}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    @classmethod
+    def make_server(cls, host: str, port: int, cache_dir: str) -> ThreadingHTTPServer:
+        """Возвращает HTTP-сервер, который на POST/PURGE с заголовком Surrogate-Key отвечает {"purged": N}"""
+        command = cls
+
+        class PurgeHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                keys = self.headers.get(command.header, "").split()
+                if not keys:
+                    self.send_error(400, f"{command.header} header required")
+                    return
+                body = json.dumps({"purged": command.purge(cache_dir, keys)}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_PURGE = do_POST
+
+        return ThreadingHTTPServer((host, port), PurgeHandler)
+
+    @classmethod
+    def purge(cls, cache_dir: str, keys: list) -> int:
+        """
+        Удаляет файлы кэша nginx, в заголовке Surrogate-Key которых есть хотя бы один из ключей
+        :param cache_dir: Каталог proxy_cache_path
+        :param keys: Суррогатные ключи
+        :return: К-во удаленных файлов
+        """
+        keys = {key.encode("utf-8") for key in keys}
+        purged = 0
+        for root, _, files in os.walk(cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    with open(path, "rb") as file:
+                        head = file.read(cls.header_limit)
+                except OSError:
+                    continue
+                start = head.find(b"\nKEY: ")
+                if start == -1:
+                    continue
+                match = cls.header_pattern.search(head, start, head.find(b"\r\n\r\n", start))
+                if match is None or not keys.intersection(match.group(1).split()):
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                purged += 1
+        return purged
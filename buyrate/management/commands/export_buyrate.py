@@ -0,0 +1,60 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from buyrate.services import BuyRateExportService
+
+
+class Command(BaseCommand):
+    """
+    Команда для потоковой выгрузки объявлений или отзывов в NDJSON/CSV.
+    Строки читаются серверным курсором, поэтому память не зависит от размера таблицы.
+    Методы:
+        add_arguments(self, parser):
+            Добавляет аргументы команды: table, format, output, created-from, created-to, gzip, chunk-size.
+        handle(self, *args, **options) -> None:
+            Обрабатывает команду выгрузки.
+    """
+
+    help = "Потоковая выгрузка объявлений или отзывов в NDJSON/CSV."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды: table, format, output, created-from, created-to, gzip, chunk-size."""
+        parser.add_argument("table", choices=list(BuyRateExportService.tables), help="Таблица выгрузки")
+        parser.add_argument("--format", choices=BuyRateExportService.formats, default="ndjson", help="Формат")
+        parser.add_argument("--output", type=str, default="-", help='Путь к файлу или "-" для stdout')
+        parser.add_argument("--created-from", type=str, help="Начало диапазона даты создания (ISO 8601)")
+        parser.add_argument("--created-to", type=str, help="Конец диапазона даты создания (ISO 8601)")
+        parser.add_argument("--gzip", action="store_true", help="Сжимать выгрузку в gzip")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="К-во строк, читаемых из курсора за раз")
+
+    def handle(self, *args, **options) -> None:
+        """Обрабатывает команду выгрузки."""
+        blocks = BuyRateExportService.stream(
+            options["table"],
+            options["format"],
+            created_from=self.parse_date(options["created_from"]),
+            created_to=self.parse_date(options["created_to"]),
+            compress=options["gzip"],
+            chunk_size=options["chunk_size"],
+        )
+        if options["output"] == "-":
+            for block in blocks:
+                sys.stdout.buffer.write(block)
+            sys.stdout.buffer.flush()
+            return
+        with open(options["output"], "wb") as file:
+            for block in blocks:
+                file.write(block)
+        self.stderr.write(self.style.SUCCESS(f"Выгрузка сохранена в {options['output']}"))
+
+    @staticmethod
+    def parse_date(value: str | None):
+        """Преобразует строку ISO 8601 в дату и время"""
+        if value is None:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f"Некорректная дата: {value}")
+        return parsed
@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from buyrate.cache import AdFacetsCache, AdsListCache, EdgeCache
+from buyrate.services import AdImportService
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Команда для массового импорта объявлений продавца из CSV (или stdin, если указан "-").
+    Допустимые строки загружаются через COPY одной транзакцией, отклоненные записываются в файл ошибок.
+    Методы:
+        add_arguments(self, parser):
+            Добавляет аргументы команды: path, author, errors.
+        handle(self, *args, **options) -> None:
+            Обрабатывает команду импорта объявлений.
+    """
+
+    help = "Импорт объявлений продавца из CSV (столбцы title, price, description)."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды: path, author, errors."""
+        parser.add_argument("path", type=str, help='Путь к CSV-файлу (UTF-8) или "-" для stdin')
+        parser.add_argument("--author", type=str, required=True, help="Email или ID продавца")
+        parser.add_argument("--errors", type=str, default="ad_import_errors.csv", help="Файл отклоненных строк (CSV)")
+
+    def handle(self, *args, **options) -> None:
+        """Обрабатывает команду импорта объявлений."""
+        author = options["author"]
+        lookup = {"pk": author} if author.isdigit() else {"email": author}
+        author_id = User.objects.filter(**lookup).values_list("id", flat=True).first()
+        if author_id is None:
+            raise CommandError(f"Продавец {author} не найден.")
+
+        start = time.perf_counter()
+        try:
+            with open(options["errors"], "w", encoding="utf-8", newline="") as errors:
+                if options["path"] == "-":
+                    report = AdImportService.import_csv(sys.stdin, author_id, errors)
+                else:
+                    with open(options["path"], encoding="utf-8-sig", newline="") as file:
+                        report = AdImportService.import_csv(file, author_id, errors)
+        except ValueError as error:
+            # Импорт откатан целиком, частичный файл ошибок не нужен
+            os.remove(options["errors"])
+            message = "Файл должен быть в кодировке UTF-8." if isinstance(error, UnicodeDecodeError) else str(error)
+            raise CommandError(message)
+        elapsed = time.perf_counter() - start
+        if report["created"]:
+            AdsListCache.bump_generation()
+            AdFacetsCache.bump_generation()
+            EdgeCache.purge("ads-list")
+
+        rows = report["created"] + report["failed"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Импортировано объявлений: {report['created']} за {elapsed:.1f} с ({rows / elapsed:.0f} строк/с)"
+            )
+        )
+        if report["failed"]:
+            self.stdout.write(self.style.WARNING(f"Строк с ошибками: {report['failed']}, см. {options['errors']}"))
+        else:
+            os.remove(options["errors"])
@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from buyrate.cache import AdsListCache, EdgeCache
+from buyrate.services import ReviewImportService
+
+
+class Command(BaseCommand):
+    """
+    Команда для потокового импорта отзывов из NDJSON-файла (или stdin, если указан "-").
+    Строки читаются по одной и вставляются пачками, ошибки выводятся с номерами строк.
+    Методы:
+        add_arguments(self, parser):
+            Добавляет аргументы команды: path, chunk-size.
+        handle(self, *args, **options) -> None:
+            Обрабатывает команду импорта отзывов.
+    """
+
+    help = "Импорт отзывов из NDJSON."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды: path, chunk-size."""
+        parser.add_argument("path", type=str, help='Путь к NDJSON-файлу или "-" для stdin')
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Размер пачки bulk_create")
+
+    def handle(self, *args, **options) -> None:
+        """Обрабатывает команду импорта отзывов."""
+        if options["path"] == "-":
+            report = ReviewImportService.import_lines(sys.stdin, chunk_size=options["chunk_size"])
+        else:
+            with open(options["path"], encoding="utf-8") as file:
+                report = ReviewImportService.import_lines(file, chunk_size=options["chunk_size"])
+        if report["created"]:
+            AdsListCache.bump_generation()
+            EdgeCache.purge("ads", "reviews")
+
+        for error in report["errors"]:
+            self.stdout.write(self.style.ERROR(f"Строка {error['line']}: {error['errors']}"))
+        self.stdout.write(self.style.SUCCESS(f"Импортировано отзывов: {report['created']}"))
+        if report["failed"]:
+            self.stdout.write(self.style.WARNING(f"Строк с ошибками: {report['failed']}"))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from buyrate.services import ReviewStatsService
+
+
+class Command(BaseCommand):
+    """
+    Команда для сверки агрегатов отзывов объявлений (reviews_count, last_review_at) с таблицей отзывов.
+    Расхождения исправляются пачками, с ключом --dry-run только выводится их к-во.
+    Методы:
+        add_arguments(self, parser):
+            Добавляет аргументы команды: batch-size, dry-run.
+        handle(self, *args, **options) -> None:
+            Обрабатывает команду сверки агрегатов.
+    """
+
+    help = "Сверка и исправление агрегатов отзывов объявлений."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды: batch-size, dry-run."""
+        parser.add_argument("--batch-size", type=int, default=1000, help="Размер пачки объявлений")
+        parser.add_argument("--dry-run", action="store_true", help="Только посчитать расхождения")
+
+    def handle(self, *args, **options) -> None:
+        """Обрабатывает команду сверки агрегатов."""
+        dry_run = options["dry_run"]
+        drifted = ReviewStatsService.reconcile(batch_size=options["batch_size"], dry_run=dry_run)
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("Расхождений не найдено."))
+        elif dry_run:
+            self.stdout.write(self.style.WARNING(f"Найдено расхождений: {drifted}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Исправлено расхождений: {drifted}"))
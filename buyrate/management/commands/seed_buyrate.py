@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from buyrate.cache import AdFacetsCache, AdsListCache, EdgeCache
+from buyrate.services import AuthorStatsService, BuyRateSeedService
+
+
+class Command(BaseCommand):
+    """
+    Команда генерации синтетических пользователей, объявлений и отзывов для нагрузочных замеров (bench_urls).
+    Данные добавляются к существующим и записываются через COPY (BuyRateSeedService),
+    после чего пересчитывается статистика продавцов (AuthorStatsService).
+    Методы:
+        add_arguments(self, parser):
+            Добавляет аргументы команды: users, ads, reviews, chunk-size, seed.
+        handle(self, *args, **options) -> None:
+            Обрабатывает команду генерации.
+    """
+
+    help = "Генерация синтетических пользователей, объявлений и отзывов (COPY)."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды: users, ads, reviews, chunk-size, seed."""
+        parser.add_argument("--users", type=int, default=100_000, help="К-во пользователей")
+        parser.add_argument("--ads", type=int, default=1_000_000, help="К-во объявлений")
+        parser.add_argument("--reviews", type=int, default=5_000_000, help="К-во отзывов")
+        parser.add_argument("--chunk-size", type=int, default=10_000, help="Размер пачки COPY")
+        parser.add_argument("--seed", type=int, default=None, help="Начальное значение генератора (воспроизводимость)")
+
+    def handle(self, *args, **options) -> None:
+        """Обрабатывает команду генерации."""
+        if min(options["users"], options["ads"], options["reviews"]) < 0 or options["chunk_size"] < 1:
+            raise CommandError("К-во записей не может быть отрицательным, размер пачки - меньше 1.")
+        start = time.perf_counter()
+        try:
+            result = BuyRateSeedService.seed(
+                options["users"],
+                options["ads"],
+                options["reviews"],
+                chunk_size=options["chunk_size"],
+                seed=options["seed"],
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+        elapsed = time.perf_counter() - start
+        if result["ads"] or result["reviews"]:
+            AdsListCache.bump_generation()
+            AdFacetsCache.bump_generation()
+            EdgeCache.purge("ads", "reviews")
+            AuthorStatsService.refresh(concurrently=False)
+
+        rows = sum(result.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано пользователей: {result['users']}, объявлений: {result['ads']}, отзывов: {result['reviews']} "
+                f"за {elapsed:.1f} с ({rows / elapsed:.0f} строк/с)"
+            )
+        )
+        if result["users"]:
+            self.stdout.write(f"Пароль пользователей seed<id>@example.com: {BuyRateSeedService.password}")
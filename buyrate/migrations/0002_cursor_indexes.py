@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buyrate", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(fields=["-created_at", "-id"], name="buyrate_ad_created_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(fields=["-created_at", "-id"], name="buyrate_review_created_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(fields=["ad", "-created_at", "-id"], name="buyrate_review_ad_created_idx"),
+        ),
+    ]
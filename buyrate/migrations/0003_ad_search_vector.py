@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:12
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+CREATE OR REPLACE FUNCTION buyrate_ad_search_vector(title text, description text) RETURNS tsvector
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT setweight(to_tsvector('pg_catalog.russian', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('pg_catalog.english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('pg_catalog.russian', coalesce(description, '')), 'B')
+        || setweight(to_tsvector('pg_catalog.english', coalesce(description, '')), 'B')
+$$;
+
+CREATE OR REPLACE FUNCTION buyrate_ad_search_vector_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := buyrate_ad_search_vector(NEW.title, NEW.description);
+    RETURN NEW;
+END
+$$;
+
+CREATE TRIGGER buyrate_ad_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, description ON buyrate_ad
+    FOR EACH ROW EXECUTE FUNCTION buyrate_ad_search_vector_trigger();
+"""
+
+SEARCH_VECTOR_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS buyrate_ad_search_vector_update ON buyrate_ad;
+DROP FUNCTION IF EXISTS buyrate_ad_search_vector_trigger();
+DROP FUNCTION IF EXISTS buyrate_ad_search_vector(text, text);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buyrate", "0002_cursor_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="ad",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name="Поисковый вектор"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="buyrate_ad_search_vector_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["title"], name="buyrate_ad_title_trgm_idx", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_SQL, SEARCH_VECTOR_REVERSE_SQL),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:13
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_review_stats(apps, schema_editor):
+    """Заполняет агрегаты отзывов у существующих объявлений одним запросом"""
+    Ad = apps.get_model("buyrate", "Ad")
+    Review = apps.get_model("buyrate", "Review")
+    reviews = Review.objects.filter(ad_id=OuterRef("pk"))
+    Ad.objects.filter(reviews__isnull=False).update(
+        reviews_count=Coalesce(
+            Subquery(reviews.values("ad_id").annotate(total=Count("id")).values("total"), output_field=IntegerField()),
+            0,
+        ),
+        last_review_at=Subquery(reviews.order_by("-created_at").values("created_at")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buyrate", "0003_ad_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="last_review_at",
+            field=models.DateTimeField(
+                blank=True, editable=False, null=True, verbose_name="Время и дата последнего отзыва"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="reviews_count",
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="К-во отзывов"),
+        ),
+        migrations.RunPython(fill_review_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:16
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_updated_at(apps, schema_editor):
+    """Проставляет время изменения существующих записей равным времени создания"""
+    for model_name in ("Ad", "Review"):
+        apps.get_model("buyrate", model_name).objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buyrate", "0004_ad_review_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, help_text="Автоматическое время изменения", verbose_name="Время и дата изменения"
+            ),
+        ),
+        migrations.AddField(
+            model_name="review",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, help_text="Автоматическое время изменения", verbose_name="Время и дата изменения"
+            ),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
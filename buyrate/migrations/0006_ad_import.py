@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buyrate", "0005_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AdImport",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "file",
+                    models.FileField(
+                        help_text="Столбцы: title, price, description (UTF-8)",
+                        upload_to="imports/ads/",
+                        verbose_name="CSV-файл",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "в очереди"),
+                            ("running", "выполняется"),
+                            ("done", "завершен"),
+                            ("failed", "ошибка"),
+                        ],
+                        default="pending",
+                        max_length=7,
+                        verbose_name="Статус",
+                    ),
+                ),
+                ("created", models.PositiveIntegerField(default=0, verbose_name="Создано объявлений")),
+                ("failed", models.PositiveIntegerField(default=0, verbose_name="Отклонено строк")),
+                (
+                    "errors_file",
+                    models.FileField(blank=True, upload_to="imports/ads/errors/", verbose_name="Файл ошибок"),
+                ),
+                ("error", models.TextField(blank=True, default="", verbose_name="Ошибка")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Время и дата загрузки")),
+                ("finished_at", models.DateTimeField(blank=True, null=True, verbose_name="Время и дата окончания")),
+                (
+                    "author",
+                    models.ForeignKey(
+                        help_text="Введите ID автора объявлений",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ad_imports",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Продавец",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "импорт объявлений",
+                "verbose_name_plural": "импорты объявлений",
+            },
+        ),
+    ]
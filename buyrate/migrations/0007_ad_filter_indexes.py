@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индексы создаются без блокировки записи в таблицу (CREATE INDEX CONCURRENTLY вне транзакции)
+    atomic = False
+
+    dependencies = [
+        ("buyrate", "0006_ad_import"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="ad",
+            index=models.Index(fields=["price", "id"], name="buyrate_ad_price_id_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="ad",
+            index=models.Index(fields=["author", "-created_at", "-id"], name="buyrate_ad_author_created_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="ad",
+            index=models.Index(fields=["author", "price", "id"], name="buyrate_ad_author_price_idx"),
+        ),
+        # Индекс внешнего ключа удаляется после создания составных индексов, начинающихся с author
+        migrations.AlterField(
+            model_name="ad",
+            name="author",
+            field=models.ForeignKey(
+                db_index=False,
+                help_text="Введите ID автора объявления",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="ads",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Создатель объявления",
+            ),
+        ),
+    ]
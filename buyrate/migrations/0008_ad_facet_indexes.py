@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:58
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индексы с INCLUDE создаются до удаления прежних, оба шага - без блокировки записи в таблицу
+    atomic = False
+
+    dependencies = [
+        ("buyrate", "0007_ad_filter_indexes"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="ad",
+            index=models.Index(fields=["-created_at", "-id"], include=["price"], name="buyrate_ad_created_incl_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="ad",
+            index=models.Index(fields=["price", "id"], include=["created_at"], name="buyrate_ad_price_incl_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="ad",
+            index=models.Index(
+                fields=["author", "price", "id"], include=["created_at"], name="buyrate_ad_auth_price_incl_idx"
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="ad",
+            name="buyrate_ad_created_id_idx",
+        ),
+        RemoveIndexConcurrently(
+            model_name="ad",
+            name="buyrate_ad_price_id_idx",
+        ),
+        RemoveIndexConcurrently(
+            model_name="ad",
+            name="buyrate_ad_author_price_idx",
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Отзывы на объявления продавца берутся из агрегата reviews_count (ReviewStatsService), таблица отзывов
+# читается только для последней активности автора. Уникальный индекс нужен для REFRESH ... CONCURRENTLY.
+AUTHOR_STATS_SQL = """
+CREATE MATERIALIZED VIEW buyrate_author_stats AS
+SELECT
+    coalesce(ads.author_id, reviews.author_id) AS author_id,
+    coalesce(ads.ads_count, 0) AS ads_count,
+    coalesce(ads.reviews_count, 0) AS reviews_count,
+    ads.avg_price,
+    greatest(ads.last_ad_at, reviews.last_review_at) AS last_activity_at
+FROM (
+    SELECT
+        author_id,
+        count(*) AS ads_count,
+        sum(reviews_count) AS reviews_count,
+        round(avg(price), 2) AS avg_price,
+        max(updated_at) AS last_ad_at
+    FROM buyrate_ad
+    GROUP BY author_id
+) AS ads
+FULL JOIN (
+    SELECT author_id, max(updated_at) AS last_review_at
+    FROM buyrate_review
+    GROUP BY author_id
+) AS reviews ON reviews.author_id = ads.author_id;
+
+CREATE UNIQUE INDEX buyrate_author_stats_author_idx ON buyrate_author_stats (author_id);
+"""
+
+AUTHOR_STATS_REVERSE_SQL = "DROP MATERIALIZED VIEW IF EXISTS buyrate_author_stats;"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buyrate", "0008_ad_facet_indexes"),
+        ("users", "0005_user_avatar_variants"),
+    ]
+
+    operations = [
+        migrations.RunSQL(AUTHOR_STATS_SQL, AUTHOR_STATS_REVERSE_SQL),
+        migrations.CreateModel(
+            name="AuthorStats",
+            fields=[
+                (
+                    "author",
+                    models.OneToOneField(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="author_stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Продавец",
+                    ),
+                ),
+                ("ads_count", models.PositiveIntegerField(verbose_name="К-во объявлений")),
+                ("reviews_count", models.PositiveIntegerField(verbose_name="К-во отзывов")),
+                (
+                    "avg_price",
+                    models.DecimalField(decimal_places=2, max_digits=12, null=True, verbose_name="Средняя цена"),
+                ),
+                ("last_activity_at", models.DateTimeField(verbose_name="Время и дата последней активности")),
+            ],
+            options={
+                "verbose_name": "статистика продавца",
+                "verbose_name_plural": "статистика продавцов",
+                "db_table": "buyrate_author_stats",
+                "managed": False,
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buyrate", "0009_author_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="adimport",
+            name="started_at",
+            field=models.DateTimeField(blank=True, null=True, verbose_name="Время и дата начала"),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_reviews_changed_at(apps, schema_editor):
+    """Заполняет время изменения отзывов у существующих объявлений по последнему изменению отзыва"""
+    Ad = apps.get_model("buyrate", "Ad")
+    Review = apps.get_model("buyrate", "Review")
+    Ad.objects.filter(reviews__isnull=False).update(
+        reviews_changed_at=Subquery(
+            Review.objects.filter(ad_id=OuterRef("pk")).order_by("-updated_at").values("updated_at")[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("buyrate", "0010_ad_import_started_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="reviews_changed_at",
+            field=models.DateTimeField(
+                blank=True, editable=False, null=True, verbose_name="Время и дата изменения отзывов"
+            ),
+        ),
+        migrations.RunPython(fill_reviews_changed_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:15
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индекс создается без блокировки записи в таблицу (CREATE INDEX CONCURRENTLY вне транзакции)
+    atomic = False
+
+    dependencies = [
+        ("buyrate", "0011_ad_reviews_changed_at"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="ad",
+            index=models.Index(fields=["title", "-created_at", "-id"], name="buyrate_ad_title_created_idx"),
+        ),
+    ]
@@ -0,0 +1,142 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from buyrate.cache import EdgeCache
+from buyrate.serializers import FastReadSerializers
+
+
+class ConditionalGetMixin:
+    """
+    Миксин условного GET (ETag / Last-Modified / 304).
+    Валидаторы вычисляются методом get_validators до сериализации,
+    при совпадении If-None-Match / If-Modified-Since возвращается 304 без вызова обработчика.
+    Методы:
+        get_validators(self) -> tuple:
+            Возвращает части ETag и время последнего изменения или (None, None).
+        aget_validators(self) -> tuple:
+            Асинхронный вариант get_validators.
+        conditional_get(self, handler, request, *args, **kwargs):
+            Возвращает 304 или ответ обработчика с заголовками ETag и Last-Modified.
+        aconditional_get(self, handler, request, *args, **kwargs):
+            Асинхронный вариант conditional_get для асинхронного обработчика.
+        make_validators(request, parts, last_modified) -> tuple:
+            Возвращает ETag и метку времени Last-Modified.
+        set_validators(response, etag, timestamp):
+            Добавляет к ответу заголовки ETag и Last-Modified.
+    """
+
+    def get_validators(self) -> tuple:
+        """
+        Возвращает части ETag и время последнего изменения или (None, None), если ресурса нет.
+        Представления переопределяют метод, по умолчанию (None, None): ответ отдается без валидаторов
+        """
+        return None, None
+
+    async def aget_validators(self) -> tuple:
+        """Асинхронный вариант get_validators"""
+        return await sync_to_async(self.get_validators)()
+
+    def conditional_get(self, handler, request, *args, **kwargs):
+        """Возвращает 304 или ответ обработчика с заголовками ETag и Last-Modified"""
+        parts, last_modified = self.get_validators()
+        if parts is None:
+            return handler(request, *args, **kwargs)
+
+        etag, timestamp = self.make_validators(request, parts, last_modified)
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return self.set_validators(response, etag, timestamp)
+
+    async def aconditional_get(self, handler, request, *args, **kwargs):
+        """Асинхронный вариант conditional_get для асинхронного обработчика"""
+        parts, last_modified = await self.aget_validators()
+        if parts is None:
+            return await handler(request, *args, **kwargs)
+
+        etag, timestamp = self.make_validators(request, parts, last_modified)
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = await handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return self.set_validators(response, etag, timestamp)
+
+    @staticmethod
+    def make_validators(request, parts, last_modified) -> tuple:
+        """Возвращает ETag и метку времени Last-Modified"""
+        raw = "|".join(str(part) for part in (*parts, request.accepted_renderer.format, request.get_full_path()))
+        etag = quote_etag(hashlib.md5(raw.encode("utf-8"), usedforsecurity=False).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        return etag, timestamp
+
+    @staticmethod
+    def set_validators(response, etag: str, timestamp: int | None):
+        """Добавляет к ответу заголовки ETag и Last-Modified"""
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        return response
+
+
+class FastReadListMixin:
+    """
+    Миксин быстрого чтения списка.
+    Если сериализатор представления поддерживается FastReadSerializers, страница выбирается через values_list
+    и сериализуется без создания экземпляров моделей, иначе используется обычный list.
+    Методы:
+        get_fast_serializer(self) -> FastReadSerializers | None:
+            Возвращает быстрый сериализатор для сериализатора представления или None.
+        list(self, request, *args, **kwargs) -> Response:
+            Возвращает страницу списка.
+    """
+
+    def get_fast_serializer(self) -> FastReadSerializers | None:
+        """Возвращает быстрый сериализатор для сериализатора представления или None"""
+        serializer_class = self.get_serializer_class()
+        if not FastReadSerializers.supports(serializer_class):
+            return None
+        return FastReadSerializers(serializer_class)
+
+    def list(self, request, *args, **kwargs) -> Response:
+        """Возвращает страницу списка"""
+        fast_serializer = self.get_fast_serializer()
+        if fast_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = fast_serializer.get_queryset(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(fast_serializer.serialize(queryset))
+        return self.get_paginated_response(fast_serializer.serialize(page))
+
+
+class EdgeCacheMixin:
+    """
+    Миксин заголовков пограничного кэша (EdgeCache) для представлений чтения.
+    Атрибуты:
+        surrogate_keys - постоянные суррогатные ключи ответа
+    Методы:
+        get_surrogate_keys(self) -> list:
+            Возвращает суррогатные ключи ответа.
+        finalize_response(self, request, response, *args, **kwargs):
+            Добавляет к ответу заголовки Cache-Control, Vary и Surrogate-Key.
+    """
+
+    surrogate_keys = ()
+
+    def get_surrogate_keys(self) -> list:
+        """Возвращает суррогатные ключи ответа (без обращений к БД)"""
+        return list(self.surrogate_keys)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Добавляет к ответу заголовки Cache-Control, Vary и Surrogate-Key"""
+        response = super().finalize_response(request, response, *args, **kwargs)
+        EdgeCache.set_headers(request, response, self.get_surrogate_keys())
+        return response
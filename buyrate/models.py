@@ -1,8 +1,24 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 from config import settings
 
 
+class AdSearchVector(models.Func):
+    """
+    Выражение поискового вектора объявления.
+    Вызывает SQL-функцию buyrate_ad_search_vector(title, description), которую использует
+    и триггер таблицы buyrate_ad: заголовок (вес A) и описание (вес B) в конфигурациях russian и english.
+    """
+
+    function = "buyrate_ad_search_vector"
+    output_field = SearchVectorField()
+
+    def __init__(self, **extra):
+        super().__init__(models.F("title"), models.F("description"), **extra)
+
+
 class Ad(models.Model):
     """
     Представление объявления
@@ -12,21 +28,40 @@ class Ad(models.Model):
         description(str): Описание товара
         author(ForeignKey): Пользователь, который создал объявление
         created_at(datetime): Время и дата создания объявления.
+        updated_at(datetime): Время и дата последнего изменения объявления.
+        search_vector(SearchVectorField): Поисковый вектор по названию и описанию (заполняется триггером БД)
+        reviews_count(int): К-во отзывов объявления
+        last_review_at(datetime): Время и дата последнего отзыва
+        reviews_changed_at(datetime): Время и дата последнего изменения отзывов (создание, изменение, удаление),
+            только растет - по нему отдается Last-Modified списка отзывов
     """
 
     title = models.CharField(max_length=255, verbose_name="Название", help_text="Введите название товара")
     price = models.PositiveIntegerField(verbose_name="Цена", help_text="Введите цену товара")
     description = models.TextField(verbose_name="Описание", help_text="Введите описание товара")
+    # Отдельный индекс не нужен: author - первый столбец составных индексов фильтра по автору
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         models.CASCADE,
         related_name="ads",
+        db_index=False,
         verbose_name="Создатель объявления",
         help_text="Введите ID автора объявления",
     )
     created_at = models.DateTimeField(
         auto_now_add=True, verbose_name="Время и дата создания", help_text="Автоматическое время создания"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name="Время и дата изменения", help_text="Автоматическое время изменения"
+    )
+    search_vector = SearchVectorField(null=True, editable=False, verbose_name="Поисковый вектор")
+    reviews_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="К-во отзывов")
+    last_review_at = models.DateTimeField(
+        null=True, blank=True, editable=False, verbose_name="Время и дата последнего отзыва"
+    )
+    reviews_changed_at = models.DateTimeField(
+        null=True, blank=True, editable=False, verbose_name="Время и дата изменения отзывов"
+    )
 
     def __str__(self):
         return self.title
@@ -34,6 +69,19 @@ class Ad(models.Model):
     class Meta:
         verbose_name = "объявление"
         verbose_name_plural = "объявления"
+        indexes = [
+            # INCLUDE: счетчики фасетов (AdFacetService) читают цену и дату создания только из индекса
+            models.Index(fields=["-created_at", "-id"], include=["price"], name="buyrate_ad_created_incl_idx"),
+            models.Index(fields=["price", "id"], include=["created_at"], name="buyrate_ad_price_incl_idx"),
+            models.Index(fields=["author", "-created_at", "-id"], name="buyrate_ad_author_created_idx"),
+            # Точное совпадение названия (AdFilter.title): триграммный индекс для равенства дорог
+            models.Index(fields=["title", "-created_at", "-id"], name="buyrate_ad_title_created_idx"),
+            models.Index(
+                fields=["author", "price", "id"], include=["created_at"], name="buyrate_ad_auth_price_incl_idx"
+            ),
+            GinIndex(fields=["search_vector"], name="buyrate_ad_search_vector_idx"),
+            GinIndex(fields=["title"], name="buyrate_ad_title_trgm_idx", opclasses=["gin_trgm_ops"]),
+        ]
 
 
 class Review(models.Model):
@@ -44,6 +92,7 @@ class Review(models.Model):
         author(ForeignKey): Пользователь, который оставил отзыв
         ad(ForeignKey): Объявление, под которым оставлен отзыв
         created_at(datetime): Время и дата создания отзыва.
+        updated_at(datetime): Время и дата последнего изменения отзыва.
     """
 
     text = models.TextField()
@@ -60,6 +109,9 @@ class Review(models.Model):
     created_at = models.DateTimeField(
         auto_now_add=True, verbose_name="Время и дата создания", help_text="Автоматическое время создания"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name="Время и дата изменения", help_text="Автоматическое время изменения"
+    )
 
     def __str__(self):
         return self.text
@@ -67,3 +119,92 @@ class Review(models.Model):
     class Meta:
         verbose_name = "отзыв"
         verbose_name_plural = "отзывы"
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="buyrate_review_created_id_idx"),
+            models.Index(fields=["ad", "-created_at", "-id"], name="buyrate_review_ad_created_idx"),
+        ]
+
+
+class AdImport(models.Model):
+    """
+    Загрузка объявлений продавца из CSV (админка), обрабатывается задачей Celery import_ads
+    Атрибуты:
+        file(FileField): CSV-файл со столбцами title, price, description
+        author(ForeignKey): Продавец - автор всех объявлений файла
+        status(str): Статус: pending, running, done, failed
+        created(int): К-во созданных объявлений
+        failed(int): К-во отклоненных строк
+        errors_file(FileField): CSV с отклоненными строками (номер строки, ошибка, исходные значения)
+        error(str): Ошибка, прервавшая импорт (нет столбцов, неверная кодировка)
+        created_at(datetime): Время и дата загрузки
+        started_at(datetime): Время и дата начала обработки (по нему забирается зависшая загрузка)
+        finished_at(datetime): Время и дата окончания обработки
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "в очереди"),
+        ("running", "выполняется"),
+        ("done", "завершен"),
+        ("failed", "ошибка"),
+    ]
+    file = models.FileField(
+        upload_to="imports/ads/", verbose_name="CSV-файл", help_text="Столбцы: title, price, description (UTF-8)"
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        models.CASCADE,
+        related_name="ad_imports",
+        verbose_name="Продавец",
+        help_text="Введите ID автора объявлений",
+    )
+    status = models.CharField(max_length=7, default="pending", choices=STATUS_CHOICES, verbose_name="Статус")
+    created = models.PositiveIntegerField(default=0, verbose_name="Создано объявлений")
+    failed = models.PositiveIntegerField(default=0, verbose_name="Отклонено строк")
+    errors_file = models.FileField(upload_to="imports/ads/errors/", blank=True, verbose_name="Файл ошибок")
+    error = models.TextField(blank=True, default="", verbose_name="Ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Время и дата загрузки")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Время и дата начала")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Время и дата окончания")
+
+    def __str__(self):
+        return f"{self.file.name} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "импорт объявлений"
+        verbose_name_plural = "импорты объявлений"
+
+
+class AuthorStats(models.Model):
+    """
+    Статистика продавца - строка материализованного представления buyrate_author_stats (только чтение).
+    Представление обновляется задачей Celery refresh_author_stats по расписанию celery beat
+    (REFRESH MATERIALIZED VIEW CONCURRENTLY), поэтому данные отстают не больше чем на AUTHOR_STATS_REFRESH_INTERVAL.
+    Атрибуты:
+        author(OneToOneField): Продавец (первичный ключ, уникальный индекс представления)
+        ads_count(int): К-во объявлений
+        reviews_count(int): К-во отзывов на объявления продавца
+        avg_price(Decimal): Средняя цена объявлений (None, если объявлений нет)
+        last_activity_at(datetime): Время и дата последнего создания или изменения объявления или отзыва продавца
+    """
+
+    author = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        models.DO_NOTHING,
+        primary_key=True,
+        db_constraint=False,
+        related_name="author_stats",
+        verbose_name="Продавец",
+    )
+    ads_count = models.PositiveIntegerField(verbose_name="К-во объявлений")
+    reviews_count = models.PositiveIntegerField(verbose_name="К-во отзывов")
+    avg_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, verbose_name="Средняя цена")
+    last_activity_at = models.DateTimeField(verbose_name="Время и дата последней активности")
+
+    def __str__(self):
+        return f"Статистика продавца {self.author_id}"
+
+    class Meta:
+        managed = False
+        db_table = "buyrate_author_stats"
+        verbose_name = "статистика продавца"
+        verbose_name_plural = "статистика продавцов"
@@ -1,12 +1,268 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class BuyRateCursorPaginator(BasePagination):
+    """
+    Курсорный (keyset) пагинатор для приложения buyrate.
+    Позиция страницы определяется парой (поле сортировки, id) последнего элемента,
+    поэтому стоимость запроса не зависит от глубины и не требует COUNT(*).
+    Атрибуты:
+        page_size - к-во элементов на странице
+        max_page_size - максимальное к-во элементов на странице
+        ordering - сортировка по умолчанию, по которой строится курсор
+        ordering_fields - поля, сортировку (поле, id) по которым курсор сохраняет из queryset
+    Методы:
+        paginate_queryset(self, queryset, request, view=None) -> list:
+            Возвращает элементы страницы, начиная с позиции курсора.
+        get_page_queryset(self, queryset, request):
+            Возвращает ленивый queryset страницы без обращения к БД.
+        get_ordering(self, queryset) -> tuple:
+            Возвращает сортировку курсора.
+        set_page(self, results: list) -> list:
+            Формирует страницу из результатов get_page_queryset.
+        get_paginated_response(self, data) -> Response:
+            Возвращает ответ со ссылками на соседние страницы.
+    """
+
+    page_size = 4
+    page_size_query_param = "page_size"
+    max_page_size = 4
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+    ordering_fields = ("created_at", "price")
+    invalid_cursor_message = "Неверный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None) -> list:
+        """Возвращает элементы страницы, начиная с позиции курсора."""
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Возвращает ленивый queryset страницы (с одним лишним элементом для признака продолжения)
+        Не обращается к БД, поэтому пригоден и для асинхронных представлений.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.current_ordering = self.get_ordering(queryset)
+        self.field = self.current_ordering[0].lstrip("-")
+        self.position, self.reverse = self.decode_cursor(request, queryset.model)
+
+        descending = self.current_ordering[0].startswith("-")
+        if self.reverse:
+            queryset = queryset.order_by(
+                *(name[1:] if name.startswith("-") else f"-{name}" for name in self.current_ordering)
+            )
+        else:
+            queryset = queryset.order_by(*self.current_ordering)
+
+        if self.position is not None:
+            value, pk = self.position
+            lookup = "lt" if descending != self.reverse else "gt"
+            queryset = queryset.filter(
+                Q(**{f"{self.field}__{lookup}e": value}),
+                Q(**{f"{self.field}__{lookup}": value}) | Q(**{f"id__{lookup}": pk}),
+            )
+
+        return queryset[: self.page_size + 1]
+
+    def get_ordering(self, queryset) -> tuple:
+        """
+        Возвращает сортировку курсора: сортировку queryset вида (поле, id) одного направления
+        по полю из ordering_fields или ordering по умолчанию (например, для сортировки по релевантности поиска)
+        """
+        order_by = tuple(queryset.query.order_by)
+        if len(order_by) == 2 and isinstance(order_by[0], str) and order_by[0].lstrip("-") in self.ordering_fields:
+            if order_by[1] == ("-id" if order_by[0].startswith("-") else "id"):
+                return order_by
+        return self.ordering
+
+    def set_page(self, results: list) -> list:
+        """Формирует страницу из результатов get_page_queryset и запоминает признаки соседних страниц"""
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request) -> int:
+        """Возвращает к-во элементов на странице с учетом параметра запроса."""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def decode_cursor(self, request, model) -> tuple:
+        """
+        Декодирует курсор из параметров запроса
+        Курсор другой сортировки (параметр ordering изменен) считается неверным.
+        :param model: Модель queryset (тип значения поля сортировки)
+        :return: Позиция (значение поля сортировки, id) или None и признак обратного направления
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")).decode("utf-8"))
+            if payload.get("o", self.ordering[0]) != self.current_ordering[0] or payload["c"] is None:
+                raise ValueError
+            position = (model._meta.get_field(self.field).to_python(payload["c"]), int(payload["i"]))
+            reverse = bool(payload.get("r", False))
+        except (TypeError, ValueError, KeyError, UnicodeError, AttributeError, FieldDoesNotExist, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, obj, reverse: bool) -> str:
+        """Кодирует позицию объекта (экземпляр модели или именованная строка values_list) в непрозрачный курсор"""
+        value = getattr(obj, self.field)
+        payload = {"c": value.isoformat() if hasattr(value, "isoformat") else value, "i": obj.id}
+        if self.current_ordering != self.ordering:
+            payload["o"] = self.current_ordering[0]
+        if reverse:
+            payload["r"] = 1
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next or not self.page:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[-1], False))
+
+    def get_previous_link(self) -> str | None:
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[0], True))
+
+    def get_paginated_response(self, data) -> Response:
+        """Возвращает ответ со ссылками на соседние страницы."""
+        return Response({"next": self.get_next_link(), "previous": self.get_previous_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema) -> dict:
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view) -> list:
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Курсор страницы",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "К-во элементов на странице",
+                "schema": {"type": "integer"},
+            },
+        ]
 
 
 class BuyRatePaginator(PageNumberPagination):
     """
     Пагинатор для приложения buyrate
     К-во элементов 4 (максимум 4) на странице
+    Курсорный режим включается параметром ?pagination=cursor или наличием ?cursor=
     """
 
     page_size = 4
     page_size_query_param = "page_size"
     max_page_size = 4
+    mode_query_param = "pagination"
+    cursor_paginator_class = BuyRateCursorPaginator
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.is_cursor_mode(request):
+            self.cursor_paginator = self.cursor_paginator_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def is_cursor_mode(self, request) -> bool:
+        """Проверяет, запрошен ли курсорный режим пагинации"""
+        params = request.query_params
+        return (
+            params.get(self.mode_query_param) == "cursor" or self.cursor_paginator_class.cursor_query_param in params
+        )
+
+
+class AsyncBuyRatePaginator(BuyRatePaginator):
+    """
+    Пагинатор BuyRatePaginator для асинхронных представлений.
+    COUNT(*) и выборка страницы выполняются асинхронным ORM, формат ответа совпадает с синхронным.
+    Методы:
+        apaginate_queryset(self, queryset, request, view=None) -> list:
+            Возвращает элементы страницы.
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None) -> list:
+        """Возвращает элементы страницы."""
+        if self.is_cursor_mode(request):
+            self.cursor_paginator = self.cursor_paginator_class()
+            page_queryset = self.cursor_paginator.get_page_queryset(queryset, request)
+            return self.cursor_paginator.set_page([obj async for obj in page_queryset])
+
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        bottom = (number - 1) * paginator.per_page
+        top = bottom + paginator.per_page
+        objects = [obj async for obj in queryset[bottom:top]]
+        self.page = Page(objects, number, paginator)
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return objects
+
+
+class AuthorStatsPaginator(PageNumberPagination):
+    """
+    Пагинатор статистики продавцов
+    К-во элементов 50 (максимум 100) на странице, без курсорного режима
+    """
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 100
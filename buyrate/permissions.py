@@ -5,11 +5,14 @@ class IsAuthor(BasePermission):
     """Право автора. Доступ, если автор объекта"""
 
     def has_object_permission(self, request, view, obj):
-        return obj.author == request.user
+        return obj.author_id == request.user.pk
 
 
 class IsAdmin(BasePermission):
     """Право администратора. Доступ, если пользователь с ролью администратора"""
 
+    def has_permission(self, request, view):
+        return getattr(request.user, "role", None) == "admin"
+
     def has_object_permission(self, request, view, obj):
         return request.user.role == "admin"
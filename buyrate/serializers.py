@@ -1,28 +1,81 @@
-from rest_framework import serializers
+from functools import partial
 
-from buyrate.models import Ad, Review
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from buyrate.models import Ad, AuthorStats, Review
 
 
 class AdSerializers(serializers.ModelSerializer):
     """
     Сериализатор для модели Ad.
-    Отображаются все поля.
+    Отображаются все поля, кроме поискового вектора и служебного времени изменения отзывов.
     """
 
     class Meta:
         model = Ad
-        fields = "__all__"
+        exclude = ["search_vector", "reviews_changed_at"]
 
 
 class AdCreateSerializers(serializers.ModelSerializer):
     """
     Сериализатор для создания модели Ad.
-    Исключены поля: автор, дата и время создания
+    Исключены поля: автор, дата и время создания и изменения, поисковый вектор, агрегаты отзывов
     """
 
     class Meta:
         model = Ad
-        exclude = ["author", "created_at"]
+        exclude = [
+            "author",
+            "created_at",
+            "updated_at",
+            "search_vector",
+            "reviews_count",
+            "last_review_at",
+            "reviews_changed_at",
+        ]
+
+
+class AdBatchUpdateSerializers(AdCreateSerializers):
+    """
+    Сериализатор элемента пакетного обновления модели Ad.
+    Обязательно поле id, остальные поля AdCreateSerializers - по выбору.
+    """
+
+    id = serializers.IntegerField(min_value=1)
+
+    class Meta(AdCreateSerializers.Meta):
+        pass
+
+    def validate(self, attrs):
+        if "id" not in attrs:
+            raise serializers.ValidationError({"id": "Обязательное поле."})
+        if len(attrs) == 1:
+            raise serializers.ValidationError("Не указаны поля для обновления.")
+        return attrs
+
+
+class AdBatchDeleteSerializers(serializers.Serializer):
+    """
+    Сериализатор пакетного удаления модели Ad.
+    Поля: ids - список ID объявлений
+    """
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000)
+
+
+class AdRepriceSerializers(serializers.Serializer):
+    """
+    Сериализатор пакетного изменения цены модели Ad.
+    Поля:
+        percent - изменение цены в процентах (-99..1000), например -10
+        ids - список ID объявлений (если не указан - все объявления пользователя)
+    """
+
+    percent = serializers.DecimalField(max_digits=6, decimal_places=2, min_value=-99, max_value=1000)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=1000
+    )
 
 
 class ReviewSerializers(serializers.ModelSerializer):
@@ -39,9 +92,172 @@ class ReviewSerializers(serializers.ModelSerializer):
 class ReviewCreateSerializers(serializers.ModelSerializer):
     """
     Сериализатор для создания модели Review.
-    Исключены поля: автор, дата и время создания, объявление
+    Исключены поля: автор, дата и время создания и изменения, объявление
     """
 
     class Meta:
         model = Review
-        exclude = ["author", "created_at", "ad"]
+        exclude = ["author", "created_at", "updated_at", "ad"]
+
+
+class AdWithReviewsSerializers(AdSerializers):
+    """
+    Сериализатор для модели Ad с последними отзывами.
+    Отображаются поля AdSerializers и latest_reviews - последние отзывы,
+    предварительно загруженные в атрибут latest_reviews.
+    """
+
+    latest_reviews = ReviewSerializers(many=True, read_only=True)
+
+
+class ReviewImportSerializers(ReviewCreateSerializers):
+    """
+    Сериализатор строки импорта модели Review.
+    Поля ReviewCreateSerializers, а также ID объявления (ad), ID автора (author)
+    и, при необходимости, время и дата создания (created_at)
+    """
+
+    ad = serializers.IntegerField(min_value=1, source="ad_id")
+    author = serializers.IntegerField(min_value=1, source="author_id")
+    created_at = serializers.DateTimeField(required=False)
+
+    class Meta(ReviewCreateSerializers.Meta):
+        exclude = ["updated_at"]
+
+
+class BuyRateExportSerializers(serializers.Serializer):
+    """
+    Сериализатор параметров выгрузки объявлений и отзывов.
+    Поля:
+        file_format - формат: ndjson, csv
+        created_from - начало диапазона даты создания (включительно)
+        created_to - конец диапазона даты создания (не включительно)
+        gzip - сжимать ли выгрузку
+    """
+
+    file_format = serializers.ChoiceField(choices=["ndjson", "csv"], default="ndjson")
+    created_from = serializers.DateTimeField(required=False)
+    created_to = serializers.DateTimeField(required=False)
+    gzip = serializers.BooleanField(default=False)
+
+
+class AuthorStatsSerializers(serializers.ModelSerializer):
+    """
+    Сериализатор для модели AuthorStats (только чтение).
+    Отображаются все поля.
+    """
+
+    class Meta:
+        model = AuthorStats
+        fields = "__all__"
+
+
+class FastReadSerializers:
+    """
+    Быстрый сериализатор только для чтения поверх ModelSerializer.
+    По полям сериализатора один раз строится план: колонки для values_list и преобразователи значений.
+    Строки выборки превращаются в словари без создания экземпляров моделей и без вызова
+    to_representation для полей, значения которых отдаются как есть. Результат совпадает с data ModelSerializer.
+    Атрибуты:
+        identity_fields - поля, значения которых из БД отдаются без преобразования
+        converted_fields - поля, значения которых преобразуются to_representation поля
+    Методы:
+        supports(serializer_class) -> bool:
+            Проверяет, поддерживаются ли все поля сериализатора.
+        get_queryset(self, queryset):
+            Возвращает queryset строк values_list с колонками плана.
+        get_converter(field):
+            Возвращает преобразователь значения поля.
+        serialize(self, rows) -> list:
+            Возвращает список словарей по строкам выборки.
+    """
+
+    identity_fields = (serializers.IntegerField, serializers.CharField, serializers.BooleanField)
+    converted_fields = (serializers.DateTimeField, serializers.DateField, serializers.DecimalField)
+    _plans = {}
+
+    def __init__(self, serializer_class):
+        plan = self.get_plan(serializer_class)
+        if plan is None:
+            raise ValueError(f"{serializer_class.__name__} не поддерживается быстрым сериализатором.")
+        self.names, self.columns, self.converters = plan
+
+    @classmethod
+    def supports(cls, serializer_class) -> bool:
+        """Проверяет, поддерживаются ли все поля сериализатора."""
+        return cls.get_plan(serializer_class) is not None
+
+    @classmethod
+    def get_plan(cls, serializer_class) -> tuple | None:
+        """Возвращает план сериализатора (имена, колонки, преобразователи), строя его при первом обращении"""
+        if serializer_class not in cls._plans:
+            cls._plans[serializer_class] = cls.compile_plan(serializer_class)
+        return cls._plans[serializer_class]
+
+    @classmethod
+    def compile_plan(cls, serializer_class) -> tuple | None:
+        """Строит план сериализатора или возвращает None, если есть неподдерживаемые поля"""
+        if not issubclass(serializer_class, serializers.ModelSerializer):
+            return None
+        model_meta = serializer_class.Meta.model._meta
+        names, columns, converters = [], [], []
+        for field in serializer_class()._readable_fields:
+            if "." in field.source or field.source == "*":
+                return None
+            if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+                column, converter = model_meta.get_field(field.source).attname, None
+            elif isinstance(field, cls.converted_fields):
+                column, converter = field.source, field
+            elif isinstance(field, cls.identity_fields):
+                column, converter = field.source, None
+            else:
+                return None
+            names.append(field.field_name)
+            columns.append(column)
+            if converter is not None:
+                converters.append((field.field_name, converter))
+        return tuple(names), tuple(columns), tuple(converters)
+
+    @classmethod
+    def get_converter(cls, field):
+        """
+        Возвращает преобразователь значения поля
+        Для DateTimeField в формате ISO 8601 часовой пояс определяется один раз, а не для каждого значения.
+        """
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        if (
+            isinstance(field, serializers.DateTimeField)
+            and isinstance(output_format, str)
+            and output_format.lower() == ISO_8601
+            and not hasattr(field, "timezone")
+        ):
+            return partial(cls.iso_datetime, tz=field.default_timezone(), fallback=field.to_representation)
+        return field.to_representation
+
+    @staticmethod
+    def iso_datetime(value, tz, fallback) -> str:
+        """Возвращает дату и время в ISO 8601 так же, как DateTimeField.to_representation"""
+        if tz is None or value.tzinfo is None:
+            return fallback(value)
+        value = value.astimezone(tz).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    def get_queryset(self, queryset):
+        """Возвращает queryset строк values_list с колонками плана."""
+        return queryset.values_list(*self.columns, named=True)
+
+    def serialize(self, rows) -> list:
+        """Возвращает список словарей по строкам выборки."""
+        names = self.names
+        converters = [(name, self.get_converter(field)) for name, field in self.converters]
+        data = []
+        for row in rows:
+            item = dict(zip(names, row))
+            for name, converter in converters:
+                value = item[name]
+                if value is not None:
+                    item[name] = converter(value)
+            data.append(item)
+        return data
@@ -0,0 +1,944 @@
+import codecs
+import csv
+import json
+import random
+import tempfile
+import time
+import zlib
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate, islice
+from typing import AsyncIterator, Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Greatest, Least, Now, Round
+from django.utils import timezone
+
+from buyrate.models import Ad, AdImport, AuthorStats, Review
+from buyrate.serializers import ReviewImportSerializers
+from users.models import User
+
+
+class ReviewStatsService:
+    """
+    Сервисный класс для поддержки агрегатов отзывов объявления (reviews_count, last_review_at)
+    Каждое изменение отзывов сдвигает вперед время изменения объявления (updated_at) и его отзывов
+    (reviews_changed_at) по часам БД, но не назад: Last-Modified объявления и списка его отзывов только растет.
+    Методы:
+        review_created(review: Review) -> None:
+            Учитывает созданный отзыв в агрегатах объявления.
+        review_updated(ad_id: int) -> None:
+            Учитывает измененный отзыв во времени изменения отзывов объявления.
+        review_deleted(ad_id: int) -> None:
+            Учитывает удаленный отзыв в агрегатах объявления.
+        refresh(ad_ids: Iterable) -> int:
+            Пересчитывает агрегаты указанных объявлений одним UPDATE.
+        reconcile(batch_size: int = 1000, dry_run: bool = False) -> int:
+            Сверяет агрегаты с таблицей отзывов и исправляет расхождения.
+    """
+
+    @staticmethod
+    def review_created(review: Review) -> None:
+        """
+        Учитывает созданный отзыв в агрегатах объявления
+        :param review: Созданный отзыв
+        """
+        Ad.objects.filter(pk=review.ad_id).update(
+            reviews_count=F("reviews_count") + 1,
+            last_review_at=Greatest(F("last_review_at"), Value(review.created_at)),
+            **ReviewStatsService.touch(),
+        )
+
+    @staticmethod
+    def review_updated(ad_id: int) -> None:
+        """
+        Учитывает измененный отзыв во времени изменения отзывов объявления (агрегаты не меняются)
+        :param ad_id: ID объявления измененного отзыва
+        """
+        Ad.objects.filter(pk=ad_id).update(reviews_changed_at=Greatest(F("reviews_changed_at"), Now()))
+
+    @staticmethod
+    def review_deleted(ad_id: int) -> None:
+        """
+        Учитывает удаленный отзыв в агрегатах объявления
+        :param ad_id: ID объявления удаленного отзыва
+        """
+        Ad.objects.filter(pk=ad_id).update(
+            reviews_count=Greatest(F("reviews_count") - 1, Value(0)),
+            last_review_at=Subquery(
+                Review.objects.filter(ad_id=OuterRef("pk")).order_by("-created_at").values("created_at")[:1]
+            ),
+            **ReviewStatsService.touch(),
+        )
+
+    @staticmethod
+    def refresh(ad_ids: Iterable) -> int:
+        """
+        Пересчитывает агрегаты указанных объявлений одним UPDATE
+        :param ad_ids: ID объявлений
+        :return: К-во обновленных объявлений
+        """
+        reviews = Review.objects.filter(ad_id=OuterRef("pk"))
+        return Ad.objects.filter(id__in=ad_ids).update(
+            reviews_count=Coalesce(
+                Subquery(
+                    reviews.values("ad_id").annotate(total=Count("id")).values("total"), output_field=IntegerField()
+                ),
+                0,
+            ),
+            last_review_at=Subquery(reviews.order_by("-created_at").values("created_at")[:1]),
+            **ReviewStatsService.touch(),
+        )
+
+    @staticmethod
+    def touch() -> dict:
+        """
+        Возвращает выражения UPDATE, сдвигающие время изменения объявления и его отзывов на текущее время БД.
+        Greatest не дает времени уйти назад при отставании часов или параллельных транзакциях.
+        """
+        return {
+            "updated_at": Greatest(F("updated_at"), Now()),
+            "reviews_changed_at": Greatest(F("reviews_changed_at"), Now()),
+        }
+
+    @staticmethod
+    def reconcile(batch_size: int = 1000, dry_run: bool = False) -> int:
+        """
+        Сверяет агрегаты с таблицей отзывов пачками по id и исправляет расхождения через refresh: агрегаты
+        пересчитываются в самом UPDATE, поэтому отзыв, записанный между сверкой и исправлением, не теряется
+        :param batch_size: Размер пачки объявлений
+        :param dry_run: Только посчитать расхождения, без исправления
+        :return: К-во объявлений с расхождениями
+        """
+        reviews = Review.objects.filter(ad_id=OuterRef("pk"))
+        queryset = Ad.objects.order_by("id").annotate(
+            actual_count=Coalesce(
+                Subquery(
+                    reviews.values("ad_id").annotate(total=Count("id")).values("total"), output_field=IntegerField()
+                ),
+                0,
+            ),
+            actual_last=Subquery(reviews.order_by("-created_at").values("created_at")[:1]),
+        )
+        drifted = 0
+        last_id = 0
+        while True:
+            batch = list(
+                queryset.filter(id__gt=last_id).values_list(
+                    "id", "reviews_count", "last_review_at", "actual_count", "actual_last"
+                )[:batch_size]
+            )
+            if not batch:
+                return drifted
+            last_id = batch[-1][0]
+            repaired = [
+                pk
+                for pk, count, last, actual_count, actual_last in batch
+                if count != actual_count or last != actual_last
+            ]
+            drifted += len(repaired)
+            if repaired and not dry_run:
+                ReviewStatsService.refresh(repaired)
+
+
+class AdBatchService:
+    """
+    Сервисный класс для пакетной записи объявлений
+    Методы:
+        create(author, items: list) -> list:
+            Создает объявления одним INSERT.
+        update(items: list) -> int:
+            Обновляет объявления через bulk_update, группируя по набору полей.
+        delete(ids: list) -> int:
+            Удаляет объявления одним запросом.
+        reprice(queryset, percent: Decimal) -> int:
+            Изменяет цены объявлений на процент одним UPDATE.
+    """
+
+    max_price = 2147483647  # верхняя граница integer в PostgreSQL
+
+    @staticmethod
+    @transaction.atomic
+    def create(author, items: list) -> list:
+        """
+        Создает объявления одним INSERT
+        :param author: Автор объявлений
+        :param items: Проверенные данные объявлений
+        :return: Созданные объявления
+        """
+        return Ad.objects.bulk_create([Ad(author=author, **item) for item in items])
+
+    @staticmethod
+    @transaction.atomic
+    def update(items: list) -> int:
+        """
+        Обновляет объявления через bulk_update, группируя элементы по набору изменяемых полей
+        :param items: Проверенные данные объявлений с полем id
+        :return: К-во обновленных объявлений
+        """
+        now = timezone.now()
+        groups = {}
+        for item in items:
+            fields = tuple(sorted(name for name in item if name != "id"))
+            groups.setdefault(fields, []).append(Ad(updated_at=now, **item))
+        updated = 0
+        for fields, ads in groups.items():
+            updated += Ad.objects.bulk_update(ads, [*fields, "updated_at"])
+        return updated
+
+    @staticmethod
+    def delete(ids: list) -> int:
+        """
+        Удаляет объявления (вместе с отзывами)
+        :param ids: Список ID объявлений
+        :return: К-во удаленных объявлений
+        """
+        _, deleted = Ad.objects.filter(id__in=ids).delete()
+        return deleted.get(Ad._meta.label, 0)
+
+    @classmethod
+    def reprice(cls, queryset, percent: Decimal) -> int:
+        """
+        Изменяет цены объявлений на процент одним UPDATE с округлением до целого.
+        Цена ограничивается сверху max_price: иначе UPDATE упадет с переполнением integer.
+        :param queryset: Объявления для изменения цены
+        :param percent: Изменение цены в процентах, например -10
+        :return: К-во обновленных объявлений
+        """
+        multiplier = Value((Decimal(100) + percent) / Decimal(100))
+        return queryset.update(
+            price=Cast(
+                Least(Round(F("price") * multiplier), Value(Decimal(cls.max_price))), output_field=IntegerField()
+            ),
+            updated_at=timezone.now(),
+        )
+
+
+class ReviewImportService:
+    """
+    Сервисный класс для потокового импорта отзывов из NDJSON (один JSON-объект на строку).
+    Строки читаются по одной, проверяются ReviewImportSerializers и вставляются пачками через bulk_create,
+    поэтому потребление памяти не зависит от размера входных данных.
+    Методы:
+        import_lines(lines: Iterable, chunk_size: int = 1000) -> dict:
+            Импортирует отзывы и возвращает отчет с ошибками по номерам строк.
+    """
+
+    max_errors = 1000
+
+    @classmethod
+    def import_lines(cls, lines: Iterable, chunk_size: int = 1000) -> dict:
+        """
+        Импортирует отзывы из NDJSON
+        :param lines: Итератор строк (str или bytes)
+        :param chunk_size: Размер пачки bulk_create
+        :return: Отчет: created, failed, errors (не более max_errors) с номерами строк
+        """
+        report = {"created": 0, "failed": 0, "errors": []}
+        chunk = []
+        for line_number, line in enumerate(lines, start=1):
+            if isinstance(line, bytes):
+                line = line.decode("utf-8", errors="replace")
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                cls._add_error(report, line_number, "Некорректный JSON.")
+                continue
+            serializer = ReviewImportSerializers(data=data)
+            if not serializer.is_valid():
+                cls._add_error(report, line_number, serializer.errors)
+                continue
+            chunk.append((line_number, serializer.validated_data))
+            if len(chunk) >= chunk_size:
+                cls._flush(chunk, report)
+                chunk = []
+        if chunk:
+            cls._flush(chunk, report)
+        return report
+
+    @classmethod
+    @transaction.atomic
+    def _flush(cls, chunk: list, report: dict) -> None:
+        """Проверяет ссылки пачки двумя запросами и вставляет отзывы одним INSERT"""
+        ad_ids = set(Ad.objects.filter(id__in={data["ad_id"] for _, data in chunk}).values_list("id", flat=True))
+        author_ids = set(
+            User.objects.filter(id__in={data["author_id"] for _, data in chunk}).values_list("id", flat=True)
+        )
+        reviews = []
+        created_at = []
+        for line_number, data in chunk:
+            errors = {}
+            if data["ad_id"] not in ad_ids:
+                errors["ad"] = "Объявление с данным ID не найдено."
+            if data["author_id"] not in author_ids:
+                errors["author"] = "Пользователь с данным ID не найден."
+            if errors:
+                cls._add_error(report, line_number, errors)
+                continue
+            reviews.append(Review(**data))
+            created_at.append(data.get("created_at"))
+        Review.objects.bulk_create(reviews)
+        dated = []
+        for review, value in zip(reviews, created_at):
+            if value is not None:
+                review.created_at = value
+                dated.append(review)
+        if dated:
+            Review.objects.bulk_update(dated, ["created_at"])
+        ReviewStatsService.refresh({review.ad_id for review in reviews})
+        report["created"] += len(reviews)
+
+    @classmethod
+    def _add_error(cls, report: dict, line_number: int, errors) -> None:
+        report["failed"] += 1
+        if len(report["errors"]) < cls.max_errors:
+            report["errors"].append({"line": line_number, "errors": errors})
+
+
+class _Echo:
+    """Псевдо-буфер для csv.writer: возвращает записанную строку вместо сохранения"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class _ExportWriter:
+    """
+    Кодирует строки выгрузки в NDJSON или CSV и собирает их в байтовые блоки не меньше buffer_size (gzip - по выбору).
+    Общий для синхронного (stream) и асинхронного (astream) чтения строк.
+    """
+
+    def __init__(self, fields: tuple, file_format: str, compress: bool, buffer_size: int):
+        self.fields = fields
+        self.buffer_size = buffer_size
+        self.compressor = zlib.compressobj(wbits=31) if compress else None
+        self.buffer = []
+        self.size = 0
+        if file_format == "csv":
+            self.csv_writer = csv.writer(_Echo())
+            self.encode = self._csv_line
+            self._append(self.csv_writer.writerow(fields))
+        else:
+            self.json_encoder = DjangoJSONEncoder(ensure_ascii=False)
+            self.encode = self._ndjson_line
+
+    def write(self, row: tuple) -> bytes:
+        """Добавляет строку, возвращает блок, если буфер заполнен (иначе b"")"""
+        self._append(self.encode(row))
+        if self.size < self.buffer_size:
+            return b""
+        block = b"".join(self.buffer)
+        self.buffer, self.size = [], 0
+        return self.compressor.compress(block) if self.compressor else block
+
+    def close(self) -> bytes:
+        """Возвращает последний блок"""
+        block = b"".join(self.buffer)
+        self.buffer, self.size = [], 0
+        if self.compressor:
+            block = self.compressor.compress(block) + self.compressor.flush()
+        return block
+
+    def _append(self, line: str) -> None:
+        data = line.encode("utf-8")
+        self.buffer.append(data)
+        self.size += len(data)
+
+    def _ndjson_line(self, row: tuple) -> str:
+        return self.json_encoder.encode(dict(zip(self.fields, row))) + "\n"
+
+    def _csv_line(self, row: tuple) -> str:
+        return self.csv_writer.writerow([value.isoformat() if hasattr(value, "isoformat") else value for value in row])
+
+
+class BuyRateExportService:
+    """
+    Сервисный класс для потоковой выгрузки объявлений и отзывов в NDJSON или CSV.
+    Строки читаются через values_list().iterator(chunk_size) - на PostgreSQL это серверный курсор,
+    поэтому потребление памяти не зависит от размера таблицы. Под ASGI используется astream:
+    синхронный итератор StreamingHttpResponse под ASGI вычитывается в память целиком до отправки ответа.
+    Методы:
+        get_queryset(table: str, created_from=None, created_to=None):
+            Возвращает строки таблицы в порядке id с фильтром по дате создания.
+        stream(table: str, file_format: str, created_from=None, created_to=None, compress=False, chunk_size=2000):
+            Возвращает итератор байтовых блоков выгрузки.
+        astream(table: str, file_format: str, created_from=None, created_to=None, compress=False, chunk_size=2000):
+            Возвращает асинхронный итератор байтовых блоков выгрузки.
+    """
+
+    tables = {
+        "ads": (
+            Ad,
+            (
+                "id",
+                "title",
+                "price",
+                "description",
+                "author_id",
+                "created_at",
+                "updated_at",
+                "reviews_count",
+                "last_review_at",
+            ),
+        ),
+        "reviews": (Review, ("id", "ad_id", "author_id", "text", "created_at", "updated_at")),
+    }
+    formats = ("ndjson", "csv")
+    buffer_size = 64 * 1024
+
+    @classmethod
+    def get_queryset(cls, table: str, created_from=None, created_to=None):
+        """Возвращает строки таблицы (values_list) в порядке id с фильтром по дате создания"""
+        model, fields = cls.tables[table]
+        queryset = model.objects.order_by("id")
+        if created_from is not None:
+            queryset = queryset.filter(created_at__gte=created_from)
+        if created_to is not None:
+            queryset = queryset.filter(created_at__lt=created_to)
+        return queryset.values_list(*fields)
+
+    @classmethod
+    def stream(
+        cls,
+        table: str,
+        file_format: str,
+        created_from=None,
+        created_to=None,
+        compress: bool = False,
+        chunk_size: int = 2000,
+    ) -> Iterator[bytes]:
+        """
+        Возвращает итератор байтовых блоков выгрузки
+        :param table: Таблица: ads, reviews
+        :param file_format: Формат: ndjson, csv
+        :param created_from: Начало диапазона даты создания (включительно)
+        :param created_to: Конец диапазона даты создания (не включительно)
+        :param compress: Сжимать ли выгрузку в gzip
+        :param chunk_size: К-во строк, читаемых из курсора за раз
+        """
+        writer = _ExportWriter(cls.tables[table][1], file_format, compress, cls.buffer_size)
+        for row in cls.get_queryset(table, created_from, created_to).iterator(chunk_size=chunk_size):
+            block = writer.write(row)
+            if block:
+                yield block
+        block = writer.close()
+        if block:
+            yield block
+
+    @classmethod
+    async def astream(
+        cls,
+        table: str,
+        file_format: str,
+        created_from=None,
+        created_to=None,
+        compress: bool = False,
+        chunk_size: int = 2000,
+    ) -> AsyncIterator[bytes]:
+        """
+        Возвращает асинхронный итератор байтовых блоков выгрузки (параметры - как у stream).
+        Пачки по chunk_size читаются с серверного курсора iterator() в потоке синхронного кода запроса
+        (QuerySet.aiterator для values_list выполняет запрос прямо в цикле событий).
+        """
+        writer = _ExportWriter(cls.tables[table][1], file_format, compress, cls.buffer_size)
+        rows = cls.get_queryset(table, created_from, created_to).iterator(chunk_size=chunk_size)
+        next_chunk = sync_to_async(lambda: list(islice(rows, chunk_size)))
+        while chunk := await next_chunk():
+            for row in chunk:
+                block = writer.write(row)
+                if block:
+                    yield block
+        block = writer.close()
+        if block:
+            yield block
+
+
+class AdFacetService:
+    """
+    Сервисный класс счетчиков фасетов объявлений: ценовые диапазоны и периоды создания.
+    Все счетчики считаются одним агрегатным запросом с условными Count(filter=...). Без полнотекстового поиска
+    запрос читает только индекс (Index Only Scan): индексы списка содержат цену и дату создания (INCLUDE).
+    Методы:
+        count(queryset, now=None) -> dict:
+            Возвращает общее к-во объявлений и счетчики фасетов.
+    """
+
+    price_buckets = ((0, 1000), (1000, 5000), (5000, 20000), (20000, 100000), (100000, None))
+    created_periods = (("day", 1), ("week", 7), ("month", 30), ("year", 365))
+
+    @classmethod
+    def count(cls, queryset, now=None) -> dict:
+        """
+        Возвращает общее к-во объявлений и счетчики фасетов одним запросом
+        :param queryset: Объявления с примененными поиском и фильтрами
+        :param now: Момент отсчета периодов создания (по умолчанию - текущий)
+        :return: count, price (min включительно, max не включительно, count), created_at (period, days, count)
+        """
+        now = now or timezone.now()
+        aggregates = {"count": Count("pk")}
+        for low, high in cls.price_buckets:
+            condition = Q(price__gte=low) if high is None else Q(price__gte=low, price__lt=high)
+            aggregates[f"price_{low}"] = Count("pk", filter=condition)
+        for period, days in cls.created_periods:
+            aggregates[f"created_{period}"] = Count("pk", filter=Q(created_at__gte=now - timedelta(days=days)))
+        result = queryset.order_by().aggregate(**aggregates)
+        return {
+            "count": result["count"],
+            "price": [{"min": low, "max": high, "count": result[f"price_{low}"]} for low, high in cls.price_buckets],
+            "created_at": [
+                {"period": period, "days": days, "count": result[f"created_{period}"]}
+                for period, days in cls.created_periods
+            ],
+        }
+
+
+class AuthorStatsService:
+    """
+    Сервисный класс материализованной статистики продавцов (AuthorStats, представление buyrate_author_stats).
+    Обновление CONCURRENTLY сравнивает пересчитанный результат с текущим по уникальному индексу и меняет только
+    отличающиеся строки, поэтому чтение статистики на время пересчета не блокируется.
+    Методы:
+        refresh(concurrently: bool = True) -> float:
+            Пересчитывает представление.
+    """
+
+    view = AuthorStats._meta.db_table
+
+    @classmethod
+    def refresh(cls, concurrently: bool = True) -> float:
+        """
+        Пересчитывает представление статистики продавцов
+        :param concurrently: Без блокировки чтения (медленнее); False - для начального заполнения после загрузки данных
+        :return: Длительность пересчета, секунды
+        """
+        start = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}{cls.view}")
+        return time.perf_counter() - start
+
+
+class BuyRateSeedService:
+    """
+    Сервисный класс генерации синтетических пользователей, объявлений и отзывов для нагрузочных замеров.
+    Строки записываются через COPY пачками по chunk_size объявлений, ID резервируются в последовательностях
+    заранее, поэтому связи и агрегаты отзывов объявлений (reviews_count, last_review_at) известны до записи.
+    Распределения:
+        - объявления по авторам и отзывы по объявлениям - закон Ципфа (немного продавцов и объявлений
+          с большим к-вом записей и длинный хвост);
+        - цена - логнормальное распределение;
+        - даты - экспоненциальное распределение от текущего момента (свежих записей больше),
+          отзыв объявления - между его созданием и текущим моментом.
+    Пароль всех созданных пользователей - password.
+    Методы:
+        seed(users: int, ads: int, reviews: int, chunk_size: int = 10000, seed=None) -> dict:
+            Генерирует данные и возвращает к-во созданных записей.
+        reserve_ids(model, count: int) -> int:
+            Резервирует ID в последовательности таблицы модели и возвращает первый.
+        copy_rows(model, columns: tuple, rows: list) -> int:
+            Записывает строки в таблицу модели через двоичный COPY.
+        zipf_weights(count: int, exponent: float) -> list:
+            Возвращает накопленные веса закона Ципфа для random.choices.
+    """
+
+    password = "seed-password"
+    zipf_exponent = 0.8
+    mean_age_days = 120
+    max_age_days = 3 * 365
+    admin_share = 0.001
+    texts_count = 1000
+    user_columns = (
+        "id",
+        "password",
+        "is_superuser",
+        "first_name",
+        "last_name",
+        "is_staff",
+        "is_active",
+        "date_joined",
+        "email",
+        "phone",
+        "role",
+        "avatar_variants",
+    )
+    ad_columns = (
+        "id",
+        "title",
+        "price",
+        "description",
+        "author_id",
+        "created_at",
+        "updated_at",
+        "reviews_count",
+        "last_review_at",
+        "reviews_changed_at",
+    )
+    review_columns = ("id", "text", "author_id", "ad_id", "created_at", "updated_at")
+    first_names = ("Алексей", "Мария", "Иван", "Анна", "Дмитрий", "Елена", "Сергей", "Ольга", "John", "Kate")
+    last_names = ("Иванов", "Смирнова", "Кузнецов", "Попова", "Соколов", "Лебедева", "Smith", "Brown")
+    words = (
+        "велосипед",
+        "телефон",
+        "диван",
+        "ноутбук",
+        "куртка",
+        "коляска",
+        "холодильник",
+        "гитара",
+        "палатка",
+        "монитор",
+        "новый",
+        "б/у",
+        "отличное",
+        "состояние",
+        "доставка",
+        "торг",
+        "гарантия",
+        "оригинал",
+        "срочно",
+        "продам",
+        "bike",
+        "phone",
+        "laptop",
+        "camera",
+        "vintage",
+        "warranty",
+        "original",
+        "mint",
+        "condition",
+        "delivery",
+    )
+
+    @classmethod
+    def seed(cls, users: int, ads: int, reviews: int, chunk_size: int = 10000, seed=None) -> dict:
+        """
+        Генерирует пользователей, объявления и отзывы
+        Без новых пользователей авторы объявлений и отзывов выбираются из существующих,
+        отзывы создаются только для новых объявлений
+        :param users: К-во пользователей
+        :param ads: К-во объявлений
+        :param reviews: К-во отзывов
+        :param chunk_size: Размер пачки COPY (пользователей или объявлений с их отзывами)
+        :param seed: Начальное значение генератора случайных чисел (для воспроизводимых данных)
+        :return: К-во созданных записей: users, ads, reviews
+        """
+        if reviews and not ads:
+            raise ValueError("Отзывы создаются только для новых объявлений, укажите к-во объявлений.")
+        rng = random.Random(seed)
+        now = timezone.now()
+        # Тексты выбираются из заранее сгенерированных наборов: генерация текста на строку дороже COPY
+        titles = [cls._text(rng, 2, 6).capitalize() for _ in range(cls.texts_count)]
+        descriptions = [cls._text(rng, 10, 80) for _ in range(cls.texts_count)]
+        review_texts = [cls._text(rng, 5, 40) for _ in range(cls.texts_count)]
+        result = {"users": 0, "ads": 0, "reviews": 0}
+
+        if users:
+            first_user = cls.reserve_ids(User, users)
+            password = make_password(cls.password)
+            for start in range(0, users, chunk_size):
+                rows = [
+                    cls._user_row(rng, first_user + index, password, now)
+                    for index in range(start, min(start + chunk_size, users))
+                ]
+                with transaction.atomic():
+                    result["users"] += cls.copy_rows(User, cls.user_columns, rows)
+            author_ids = range(first_user, first_user + users)
+        else:
+            author_ids = list(User.objects.order_by("id").values_list("id", flat=True)) if ads else []
+        if ads and not author_ids:
+            raise ValueError("Нет пользователей для объявлений, укажите к-во пользователей.")
+
+        if ads:
+            author_weights = cls.zipf_weights(len(author_ids), cls.zipf_exponent)
+            reviews_counts = [0] * ads
+            ad_weights = cls.zipf_weights(ads, cls.zipf_exponent)
+            for start in range(0, reviews, chunk_size):
+                for index in rng.choices(range(ads), cum_weights=ad_weights, k=min(chunk_size, reviews - start)):
+                    reviews_counts[index] += 1
+            first_ad = cls.reserve_ids(Ad, ads)
+            review_id = cls.reserve_ids(Review, reviews) if reviews else None
+            for start in range(0, ads, chunk_size):
+                stop = min(start + chunk_size, ads)
+                ad_rows, review_rows = [], []
+                for index, author_id in zip(
+                    range(start, stop), rng.choices(author_ids, cum_weights=author_weights, k=stop - start)
+                ):
+                    created_at = cls._past(rng, now)
+                    last_review_at = None
+                    for _ in range(reviews_counts[index]):
+                        review_created_at = created_at + (now - created_at) * rng.random()
+                        last_review_at = max(last_review_at or review_created_at, review_created_at)
+                        review_rows.append(
+                            (
+                                review_id,
+                                rng.choice(review_texts),
+                                rng.choice(author_ids),
+                                first_ad + index,
+                                review_created_at,
+                                review_created_at,
+                            )
+                        )
+                        review_id += 1
+                    ad_rows.append(
+                        (
+                            first_ad + index,
+                            rng.choice(titles),
+                            min(max(1, round(rng.lognormvariate(8, 1.3))), 10**8),
+                            rng.choice(descriptions),
+                            author_id,
+                            created_at,
+                            created_at,
+                            reviews_counts[index],
+                            last_review_at,
+                            last_review_at,
+                        )
+                    )
+                with transaction.atomic():
+                    result["ads"] += cls.copy_rows(Ad, cls.ad_columns, ad_rows)
+                    result["reviews"] += cls.copy_rows(Review, cls.review_columns, review_rows)
+
+        # Статистика планировщика по новым данным
+        with connection.cursor() as cursor:
+            for model in (User, Ad, Review):
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+        return result
+
+    @staticmethod
+    def reserve_ids(model, count: int) -> int:
+        """
+        Резервирует count ID в последовательности таблицы модели одним запросом
+        :param model: Модель
+        :param count: К-во ID
+        :return: Первый зарезервированный ID
+        """
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), nextval(pg_get_serial_sequence(%s, 'id')) + %s - 1)",
+                [table, table, count],
+            )
+            return cursor.fetchone()[0] - count + 1
+
+    @staticmethod
+    def copy_rows(model, columns: tuple, rows: list) -> int:
+        """
+        Записывает строки в таблицу модели через двоичный COPY (psycopg 3)
+        :param model: Модель
+        :param columns: Столбцы таблицы
+        :param rows: Строки - кортежи значений столбцов
+        :return: К-во записанных строк
+        """
+        if not rows:
+            return 0
+        table = model._meta.db_table
+        quote_name = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            # Двоичный формат с типами столбцов таблицы: Python-объекты не преобразуются в текст
+            cursor.execute(
+                "SELECT attname, atttypid FROM pg_attribute WHERE attrelid = %s::regclass AND attname = ANY(%s)",
+                [quote_name(table), list(columns)],
+            )
+            types = dict(cursor.fetchall())
+            sql = f"COPY {quote_name(table)} ({', '.join(map(quote_name, columns))}) FROM STDIN (FORMAT BINARY)"
+            with cursor.copy(sql) as copy:
+                copy.set_types([types[column] for column in columns])
+                for row in rows:
+                    copy.write_row(row)
+        return len(rows)
+
+    @staticmethod
+    def zipf_weights(count: int, exponent: float) -> list:
+        """Возвращает накопленные веса закона Ципфа (вес i-го элемента 1 / i ** exponent) для random.choices"""
+        return list(accumulate(1 / rank**exponent for rank in range(1, count + 1)))
+
+    @classmethod
+    def _user_row(cls, rng: random.Random, user_id: int, password: str, now) -> tuple:
+        return (
+            user_id,
+            password,
+            False,
+            rng.choice(cls.first_names),
+            rng.choice(cls.last_names),
+            False,
+            True,
+            cls._past(rng, now),
+            f"seed{user_id}@example.com",
+            f"+7{rng.randrange(10**9, 10**10)}",
+            "admin" if rng.random() < cls.admin_share else "user",
+            {},
+        )
+
+    @classmethod
+    def _past(cls, rng: random.Random, now):
+        return now - timedelta(days=min(rng.expovariate(1 / cls.mean_age_days), cls.max_age_days))
+
+    @classmethod
+    def _text(cls, rng: random.Random, min_words: int, max_words: int) -> str:
+        return " ".join(rng.choices(cls.words, k=rng.randint(min_words, max_words)))
+
+
+class AdImportService:
+    """
+    Сервисный класс для массового импорта объявлений продавца из CSV (столбцы title, price, description).
+    Файл читается одним потоковым проходом: строки проверяются по ограничениям полей Ad (без сериализатора -
+    он на порядок медленнее), допустимые сразу пишутся двоичным COPY FROM STDIN во временную таблицу,
+    отклоненные (в том числе строки, которые не удалось разобрать) - в файл ошибок. Затем объявления переносятся
+    в buyrate_ad одним INSERT ... SELECT в той же транзакции: импорт загружает либо все допустимые строки, либо ничего.
+    Поисковый вектор заполняет триггер БД.
+    Методы:
+        import_csv(lines: Iterable, author_id: int, errors=None) -> dict:
+            Импортирует объявления и возвращает к-во созданных объявлений и отклоненных строк.
+        run(import_id: int) -> AdImport | None:
+            Выполняет загрузку из админки (AdImport): импорт, файл ошибок, статус.
+    """
+
+    columns = ("title", "price", "description")
+    staging_table = "buyrate_ad_import"
+    max_title_length = Ad._meta.get_field("title").max_length
+    max_price = AdBatchService.max_price
+    max_field_size = 2147483647
+
+    @classmethod
+    def import_csv(cls, lines: Iterable, author_id: int, errors=None) -> dict:
+        """
+        Импортирует объявления из CSV с заголовком (порядок столбцов любой, лишние столбцы пропускаются)
+        :param lines: Итератор строк CSV (str)
+        :param author_id: ID автора объявлений
+        :param errors: Текстовый файл для отклоненных строк: line, error и исходные значения строки
+        :return: Отчет: created, failed
+        """
+        # Лимит поля модуля csv по умолчанию - 128 КБ, длинные описания допустимы
+        csv.field_size_limit(cls.max_field_size)
+        reader = csv.reader(lines)
+        header = [name.strip().lower() for name in next(reader, None) or []]
+        missing = [column for column in cls.columns if column not in header]
+        if missing:
+            raise ValueError(f"В файле нет столбцов: {', '.join(missing)}.")
+        indexes = [header.index(column) for column in cls.columns]
+        writer = csv.writer(errors) if errors is not None else None
+        if writer:
+            writer.writerow(["line", "error", *header])
+
+        report = {"created": 0, "failed": 0}
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {cls.staging_table} "
+                f"(line integer, title varchar({cls.max_title_length}), price integer, description text)"
+            )
+            with cursor.copy(
+                f"COPY {cls.staging_table} (line, title, price, description) FROM STDIN (FORMAT BINARY)"
+            ) as copy:
+                copy.set_types(["int4", "varchar", "int4", "text"])
+                while True:
+                    try:
+                        row = next(reader)
+                    except StopIteration:
+                        break
+                    except csv.Error as error:
+                        # Строка не разобрана: в файл ошибок пишется только номер строки и ошибка
+                        report["failed"] += 1
+                        if writer:
+                            writer.writerow([reader.line_num, f"CSV: {error}."])
+                        continue
+                    if not row:
+                        continue
+                    try:
+                        values = cls._validate(row, indexes, len(header))
+                    except ValueError as error:
+                        report["failed"] += 1
+                        if writer:
+                            writer.writerow([reader.line_num, str(error), *row])
+                        continue
+                    copy.write_row((reader.line_num, *values))
+            now = timezone.now()
+            cursor.execute(
+                f"INSERT INTO {Ad._meta.db_table} "
+                "(title, price, description, author_id, created_at, updated_at, reviews_count) "
+                f"SELECT title, price, description, %s, %s, %s, 0 FROM {cls.staging_table} ORDER BY line",
+                [author_id, now, now],
+            )
+            report["created"] = cursor.rowcount
+            # Таблица удаляется явно: во вложенной транзакции (savepoint) фиксации соединения еще нет
+            cursor.execute(f"DROP TABLE {cls.staging_table}")
+        return report
+
+    @classmethod
+    def run(cls, import_id: int) -> AdImport | None:
+        """
+        Выполняет загрузку из админки: импортирует файл, сохраняет файл ошибок и статус.
+        Загрузка выполняется один раз: повторная доставка задачи не найдет ее в статусе pending.
+        Загрузку в статусе running дольше AD_IMPORT_STALE_TIMEOUT секунд (воркер завершился аварийно)
+        забирает повторная доставка задачи. Объявления и статус done фиксируются одной транзакцией,
+        поэтому прерванный импорт не оставляет объявлений и повторяется с начала.
+        Непредвиденная ошибка записывается в загрузку (статус failed) и пробрасывается дальше.
+        :param import_id: ID загрузки
+        :return: Загрузка или None, если она уже обработана или выполняется
+        """
+        stale = timezone.now() - timedelta(seconds=settings.AD_IMPORT_STALE_TIMEOUT)
+        claimed = AdImport.objects.filter(
+            Q(status="pending") | Q(status="running", started_at__lt=stale), pk=import_id
+        ).update(status="running", started_at=Now())
+        if not claimed:
+            return None
+        ad_import = AdImport.objects.get(pk=import_id)
+        with tempfile.TemporaryFile("w+", encoding="utf-8", newline="") as errors:
+            try:
+                with transaction.atomic():
+                    with ad_import.file.open("rb") as file:
+                        report = cls.import_csv(codecs.iterdecode(file, "utf-8-sig"), ad_import.author_id, errors)
+                    ad_import.status, ad_import.created, ad_import.failed = "done", report["created"], report["failed"]
+                    if report["failed"]:
+                        errors.seek(0)
+                        ad_import.errors_file.save(f"{ad_import.pk}-errors.csv", File(errors), save=False)
+                    cls._finish(ad_import)
+            except UnicodeDecodeError:
+                cls._fail(ad_import, "Файл должен быть в кодировке UTF-8.")
+            except (ValueError, csv.Error) as error:
+                cls._fail(ad_import, str(error))
+            except Exception as error:
+                cls._fail(ad_import, f"{type(error).__name__}: {error}")
+                raise
+        return ad_import
+
+    @staticmethod
+    def _fail(ad_import: AdImport, error: str) -> None:
+        """Отмечает загрузку как завершенную с ошибкой (объявления импорта откатаны)"""
+        ad_import.status, ad_import.error = "failed", error
+        ad_import.created = ad_import.failed = 0
+        ad_import.errors_file = None
+        AdImportService._finish(ad_import)
+
+    @staticmethod
+    def _finish(ad_import: AdImport) -> None:
+        ad_import.finished_at = timezone.now()
+        ad_import.save(update_fields=["status", "created", "failed", "errors_file", "error", "finished_at"])
+
+    @classmethod
+    def _validate(cls, row: list, indexes: list, size: int) -> tuple:
+        """Проверяет строку CSV и возвращает (title, price, description) или вызывает ValueError с ошибками полей"""
+        if len(row) != size:
+            raise ValueError(f"Ожидается значений: {size}, получено: {len(row)}.")
+        title, price, description = (row[index].strip() for index in indexes)
+        errors = []
+        if not title:
+            errors.append("title: Обязательное поле.")
+        elif len(title) > cls.max_title_length:
+            errors.append(f"title: Не более {cls.max_title_length} символов.")
+        if not price.isascii() or not price.isdigit():
+            errors.append("price: Требуется целое неотрицательное число.")
+        elif int(price) > cls.max_price:
+            errors.append(f"price: Не больше {cls.max_price}.")
+        if not description:
+            errors.append("description: Обязательное поле.")
+        if "\x00" in title or "\x00" in description:
+            errors.append("Недопустимый символ NUL.")
+        if errors:
+            raise ValueError(" ".join(errors))
+        return title, int(price), description
@@ -0,0 +1,75 @@
+import urllib.request
+
+from celery import shared_task
+from django.conf import settings
+
+from buyrate.models import Ad, AdSearchVector
+from buyrate.services import AdImportService, AuthorStatsService
+from users.outbox import OutboxTask
+
+
+@shared_task
+def backfill_ad_search_vectors(last_id: int = 0, batch_size: int = 1000) -> int:
+    """
+    Заполняет поисковый вектор у объявлений, созданных до появления триггера.
+    Обрабатывает одну пачку по возрастанию id и ставит в очередь следующую, пока есть строки.
+    :param last_id: id последнего обработанного объявления
+    :param batch_size: Размер пачки
+    :return: К-во обновленных объявлений
+    """
+    ids = list(
+        Ad.objects.filter(id__gt=last_id, search_vector__isnull=True)
+        .order_by("id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0
+    updated = Ad.objects.filter(id__in=ids).update(search_vector=AdSearchVector())
+    if len(ids) == batch_size:
+        backfill_ad_search_vectors.delay(ids[-1], batch_size)
+    return updated
+
+
+@shared_task(base=OutboxTask, autoretry_for=(OSError,), retry_backoff=True, max_retries=5)
+def purge_edge_cache(keys: list) -> int:
+    """
+    Очищает пограничный кэш по суррогатным ключам: POST на EDGE_PURGE_URL с заголовком Surrogate-Key.
+    Ошибки сети и HTTP (URLError, HTTPError) повторяются с экспоненциальной задержкой.
+    :param keys: Суррогатные ключи
+    :return: HTTP-статус ответа сервиса очистки
+    """
+    request = urllib.request.Request(
+        settings.EDGE_PURGE_URL, data=b"", method="POST", headers={"Surrogate-Key": " ".join(keys)}
+    )
+    with urllib.request.urlopen(request, timeout=settings.EDGE_PURGE_TIMEOUT) as response:
+        return response.status
+
+
+@shared_task(base=OutboxTask, acks_late=True, reject_on_worker_lost=True)
+def import_ads(import_id: int) -> dict:
+    """
+    Импортирует объявления загрузки из админки (AdImport) и сбрасывает кэш списка объявлений.
+    Задача подтверждается после выполнения: при аварийном завершении воркера брокер доставит ее повторно,
+    и она заберет зависшую загрузку (AdImportService.run).
+    :param import_id: ID загрузки
+    :return: Статус и к-во созданных объявлений и отклоненных строк (пусто, если загрузка уже обработана)
+    """
+    from buyrate.cache import AdFacetsCache, AdsListCache, EdgeCache  # buyrate.cache импортирует задачи этого модуля
+
+    ad_import = AdImportService.run(import_id)
+    if ad_import is None:
+        return {}
+    if ad_import.created:
+        AdsListCache.bump_generation()
+        AdFacetsCache.bump_generation()
+        EdgeCache.purge("ads-list")
+    return {"status": ad_import.status, "created": ad_import.created, "failed": ad_import.failed}
+
+
+@shared_task
+def refresh_author_stats() -> float:
+    """
+    Обновляет материализованную статистику продавцов без блокировки чтения (запускается celery beat).
+    :return: Длительность пересчета, секунды
+    """
+    return AuthorStatsService.refresh()
@@ -1,10 +1,58 @@
+import csv
+import gzip
+import io
+import json
+import threading
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
 import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.postgres.search import SearchQuery
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from django.utils.translation import gettext_lazy as _
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
 
-from buyrate.models import Ad, Review
-from users.models import User
+from buyrate import urls as buyrate_urls
+from buyrate.async_views import AsyncAdRetrieveView, AsyncAdsListView, AsyncAllReviewsListView, AsyncReviewsListView
+from buyrate.cache import AdFacetsCache, AdsListCache, EdgeCache
+from buyrate.management.commands.bench_urls import Command as BenchUrlsCommand
+from buyrate.management.commands.edge_purge_stub import Command as EdgePurgeStubCommand
+from buyrate.models import Ad, AdImport, AuthorStats, Review
+from buyrate.paginators import BuyRatePaginator
+from buyrate.serializers import AdSerializers, AdWithReviewsSerializers, FastReadSerializers, ReviewSerializers
+from buyrate.services import (
+    AdBatchService,
+    AdImportService,
+    AuthorStatsService,
+    BuyRateExportService,
+    BuyRateSeedService,
+    ReviewStatsService,
+)
+from buyrate.tasks import backfill_ad_search_vectors, import_ads, purge_edge_cache, refresh_author_stats
+from buyrate.views import AdRetrieveAPIView
+from config.parsers import ORJSONParser
+from config.query_budget import QueryBudgetExceeded, QueryBudgetMiddleware, QueryRecorder
+from config.renderers import ORJSONRenderer
+from config.replicas import ReplicaLag, ReplicaMiddleware, ReplicaRouter, WriteFence
+from users.models import TaskOutbox, User
 
 
 @pytest.mark.django_db
@@ -21,6 +69,8 @@ from users.models import User
         ("buyrate:ad-review-update", {"ad_id": 1, "pk": 1}, "put", status.HTTP_401_UNAUTHORIZED),
         ("buyrate:ad-review-delete", {"ad_id": 1, "pk": 1}, "delete", status.HTTP_401_UNAUTHORIZED),
         ("buyrate:all-reviews", None, "get", status.HTTP_401_UNAUTHORIZED),
+        ("buyrate:author-stats", None, "get", status.HTTP_401_UNAUTHORIZED),
+        ("buyrate:author-stats-detail", {"pk": 1}, "get", status.HTTP_401_UNAUTHORIZED),
     ],
 )
 def test_not_authenticated(
@@ -71,6 +121,33 @@ def test_filters_list_ads(api_client: APIClient, ad_one: Ad, ad_two: Ad) -> None
     assert response.data["count"] == 1
 
 
+@pytest.mark.django_db
+def test_filters_range_and_ordering_ads(api_client: APIClient, ad_one: Ad, ad_two: Ad, user: User) -> None:
+    """Тестирование фильтров объявлений по цене, автору, дате создания и сортировки по разрешенным полям"""
+    ad_three = Ad.objects.create(title="Планшет", price=45000, description="Планшет", author=user)
+    url = reverse("buyrate:ads")
+
+    def ids(params: dict) -> list:
+        response = api_client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return [item["id"] for item in response.data["results"]]
+
+    assert ids({"price_min": 50000}) == [ad_one.pk]
+    assert ids({"price_max": 45000, "ordering": "created_at"}) == [ad_two.pk, ad_three.pk]
+    assert ids({"author": user.pk, "ordering": "price"}) == [ad_three.pk, ad_one.pk]
+    # Равные цены упорядочены по id того же направления
+    assert ids({"ordering": "-price"}) == [ad_one.pk, ad_three.pk, ad_two.pk]
+    assert ids({"ordering": "price"}) == [ad_two.pk, ad_three.pk, ad_one.pk]
+    assert ids({"created_at_after": ad_two.created_at.isoformat(), "ordering": "created_at"}) == [
+        ad_two.pk,
+        ad_three.pk,
+    ]
+    assert ids({"created_at_before": ad_one.created_at.isoformat()}) == [ad_one.pk]
+
+    for params in ({"ordering": "description"}, {"price_min": -1}, {"created_at_after": "вчера"}):
+        assert api_client.get(url, params).status_code == status.HTTP_400_BAD_REQUEST
+
+
 @pytest.mark.django_db
 def test_search_ads_by_title(api_client: APIClient, ad_one: Ad, ad_two: Ad) -> None:
     """Тестирование поиск объявлений по названию"""
@@ -79,6 +156,38 @@ def test_search_ads_by_title(api_client: APIClient, ad_one: Ad, ad_two: Ad) -> N
     assert response.data["count"] == 1
 
 
+@pytest.mark.django_db
+def test_search_ads_by_description(api_client: APIClient, ad_one: Ad, ad_two: Ad) -> None:
+    """Тестирование полнотекстового поиска объявлений по описанию с учетом морфологии"""
+    response = api_client.get(f"{reverse('buyrate:ads')}?search=ноутбуки")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["count"] == 1
+    assert response.data["results"][0]["id"] == ad_two.pk
+    assert "search_vector" not in response.data["results"][0]
+
+
+@pytest.mark.django_db
+def test_search_ads_with_typo(api_client: APIClient, ad_one: Ad, ad_two: Ad) -> None:
+    """Тестирование триграммного поиска объявлений с опечаткой"""
+    response = api_client.get(f"{reverse('buyrate:ads')}?search=Galaxyy")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["count"] == 1
+    assert response.data["results"][0]["id"] == ad_one.pk
+
+
+@pytest.mark.django_db
+@patch("buyrate.tasks.backfill_ad_search_vectors.delay")
+def test_backfill_ad_search_vectors(mock_delay: MagicMock, ad_one: Ad, ad_two: Ad) -> None:
+    """Тестирование отложенной задачи заполнения поисковых векторов пачками"""
+    Ad.objects.update(search_vector=None)
+    first_id = min(ad_one.pk, ad_two.pk)
+
+    assert backfill_ad_search_vectors(batch_size=1) == 1
+    mock_delay.assert_called_once_with(first_id, 1)
+    assert backfill_ad_search_vectors(last_id=first_id, batch_size=1) == 1
+    assert not Ad.objects.filter(search_vector__isnull=True).exists()
+
+
 @pytest.mark.django_db
 def test_create_ad(user_api_client: APIClient, user: User) -> None:
     """Тестирование создания объявления"""
@@ -333,3 +442,1290 @@ def test_destroy_review_by_ad_admin(admin_api_client: APIClient, ad_two: Ad, rev
     )
     assert response.status_code == status.HTTP_204_NO_CONTENT
     assert Review.objects.count() == initial_count - 1
+
+
+@pytest.mark.django_db
+def test_list_ads_cursor_pagination(api_client: APIClient, user: User) -> None:
+    """Тестирование курсорной пагинации списка объявлений вперед и назад"""
+    ads = [Ad.objects.create(title=f"Товар {i}", price=100 + i, description="Описание", author=user) for i in range(6)]
+    expected = [ad.pk for ad in sorted(ads, key=lambda ad: (ad.created_at, ad.pk), reverse=True)]
+
+    response = api_client.get(reverse("buyrate:ads"), {"pagination": "cursor"})
+    assert response.status_code == status.HTTP_200_OK
+    assert "count" not in response.data
+    assert response.data["previous"] is None
+    first_page = [item["id"] for item in response.data["results"]]
+    assert first_page == expected[:4]
+
+    response = api_client.get(response.data["next"])
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["id"] for item in response.data["results"]] == expected[4:]
+    assert response.data["next"] is None
+
+    response = api_client.get(response.data["previous"])
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["id"] for item in response.data["results"]] == first_page
+    assert response.data["previous"] is None
+
+
+@pytest.mark.django_db
+def test_list_reviews_cursor_pagination(user_api_client: APIClient, ad_one: Ad, user_two: User) -> None:
+    """Тестирование курсорной пагинации отзывов по объявлению"""
+    for i in range(5):
+        Review.objects.create(text=f"Отзыв {i}", author=user_two, ad=ad_one)
+    url = reverse("buyrate:ad-reviews", kwargs={"ad_id": ad_one.pk})
+
+    response = user_api_client.get(url, {"pagination": "cursor", "page_size": 2})
+    assert response.status_code == status.HTTP_200_OK
+    seen = [item["id"] for item in response.data["results"]]
+    while response.data["next"]:
+        response = user_api_client.get(response.data["next"])
+        seen.extend(item["id"] for item in response.data["results"])
+    assert len(seen) == len(set(seen)) == 5
+
+
+@pytest.mark.django_db
+def test_list_ads_cursor_pagination_price_ordering(api_client: APIClient, user: User) -> None:
+    """Тестирование курсорной пагинации по сортировке ordering: позиция (цена, id), курсор другой сортировки"""
+    ads = [
+        Ad.objects.create(title=f"Товар {i}", price=100 * (i % 3), description="Описание", author=user)
+        for i in range(7)
+    ]
+    expected = [ad.pk for ad in sorted(ads, key=lambda ad: (ad.price, ad.pk), reverse=True)]
+    url = reverse("buyrate:ads")
+
+    response = api_client.get(url, {"pagination": "cursor", "ordering": "-price", "page_size": 3})
+    seen = [item["id"] for item in response.data["results"]]
+    while response.data["next"]:
+        response = api_client.get(response.data["next"])
+        seen.extend(item["id"] for item in response.data["results"])
+    assert seen == expected
+
+    response = api_client.get(response.data["previous"])
+    assert [item["id"] for item in response.data["results"]] == expected[3:6]
+    cursor = response.data["next"].split("cursor=")[1].split("&")[0]
+    response = api_client.get(url, {"cursor": cursor, "ordering": "price"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_list_ads_invalid_cursor(api_client: APIClient) -> None:
+    """Тестирование обработки некорректного курсора"""
+    response = api_client.get(reverse("buyrate:ads"), {"cursor": "invalid"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.data["detail"] == "Неверный курсор."
+
+
+@pytest.mark.django_db
+def test_review_stats_on_create_and_destroy(user_api_client: APIClient, ad_one: Ad) -> None:
+    """Тестирование обновления агрегатов отзывов объявления при создании и удалении отзыва"""
+    url = reverse("buyrate:ad-review-create", kwargs={"ad_id": ad_one.pk})
+    first = user_api_client.post(url, data={"text": "Первый отзыв"}).data
+    second = user_api_client.post(url, data={"text": "Второй отзыв"}).data
+
+    ad_one.refresh_from_db()
+    assert ad_one.reviews_count == 2
+    assert ad_one.last_review_at == Review.objects.get(pk=second["id"]).created_at
+
+    response = user_api_client.get(reverse("buyrate:ad-detail", kwargs={"pk": ad_one.pk}))
+    assert response.data["reviews_count"] == 2
+    assert response.data["last_review_at"] is not None
+
+    user_api_client.delete(reverse("buyrate:ad-review-delete", kwargs={"ad_id": ad_one.pk, "pk": second["id"]}))
+    ad_one.refresh_from_db()
+    assert ad_one.reviews_count == 1
+    assert ad_one.last_review_at == Review.objects.get(pk=first["id"]).created_at
+
+    user_api_client.delete(reverse("buyrate:ad-review-delete", kwargs={"ad_id": ad_one.pk, "pk": first["id"]}))
+    ad_one.refresh_from_db()
+    assert ad_one.reviews_count == 0
+    assert ad_one.last_review_at is None
+
+
+@pytest.mark.django_db
+def test_review_stats_in_admin(
+    client, django_capture_on_commit_callbacks, user: User, ad_one: Ad, ad_two: Ad, review_one: Review
+) -> None:
+    """Тестирование обновления агрегатов отзывов и кэша списка объявлений при изменении отзывов в админке"""
+    client.force_login(User.objects.create(email="superuser@example.com", is_staff=True, is_superuser=True))
+    ReviewStatsService.refresh([ad_one.pk])
+    generation = AdsListCache.get_generation()
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            reverse("admin:buyrate_review_add"), {"text": "Отзыв из админки", "author": user.pk, "ad": ad_one.pk}
+        )
+    assert response.status_code == status.HTTP_302_FOUND
+    assert AdsListCache.get_generation() != generation
+    ad_one.refresh_from_db()
+    assert ad_one.reviews_count == 2
+    review = Review.objects.get(text="Отзыв из админки")
+    assert ad_one.last_review_at == review.created_at
+
+    client.post(
+        reverse("admin:buyrate_review_change", args=[review.pk]),
+        {"text": review.text, "author": user.pk, "ad": ad_two.pk},
+    )
+    assert Ad.objects.get(pk=ad_one.pk).reviews_count == 1
+    assert Ad.objects.get(pk=ad_two.pk).reviews_count == 1
+
+    client.post(reverse("admin:buyrate_review_delete", args=[review.pk]), {"post": "yes"})
+    assert Ad.objects.get(pk=ad_two.pk).reviews_count == 0
+
+    client.post(
+        reverse("admin:buyrate_review_changelist"),
+        {"action": "delete_selected", "_selected_action": [review_one.pk], "post": "yes"},
+    )
+    ad_one.refresh_from_db()
+    assert ad_one.reviews_count == 0
+    assert ad_one.last_review_at is None
+
+
+@pytest.mark.django_db
+def test_reconcile_review_stats(capsys: pytest.CaptureFixture, review_one: Review, review_two: Review) -> None:
+    """Тестирование команды сверки и исправления агрегатов отзывов"""
+    Ad.objects.update(reviews_count=5, last_review_at=None)
+
+    call_command("reconcile_review_stats", "--dry-run")
+    assert "Найдено расхождений: 2" in capsys.readouterr().out
+    assert Ad.objects.filter(reviews_count=5).count() == 2
+
+    call_command("reconcile_review_stats", "--batch-size", "1")
+    assert "Исправлено расхождений: 2" in capsys.readouterr().out
+    ad = Ad.objects.get(pk=review_one.ad_id)
+    assert ad.reviews_count == 1
+    assert ad.last_review_at == review_one.created_at
+
+    call_command("reconcile_review_stats")
+    assert "Расхождений не найдено." in capsys.readouterr().out
+
+
+@pytest.mark.django_db
+def test_author_stats_refresh(settings, user: User, user_two: User, review_one: Review, review_two: Review) -> None:
+    """Тестирование материализованной статистики продавцов: данные появляются после обновления задачей beat"""
+    second_ad = Ad.objects.create(title="Чехол", price=1001, description="Чехол для смартфона", author=user)
+    buyer = User.objects.create(email="buyer@example.com")
+    last_review = Review.objects.create(text="Хороший чехол", author=buyer, ad=second_ad)
+    ReviewStatsService.refresh(Ad.objects.values_list("id", flat=True))
+    assert not AuthorStats.objects.exists()
+    assert settings.CELERY_BEAT_SCHEDULE["refresh-author-stats"]["task"] == refresh_author_stats.name
+
+    refresh_author_stats()
+    second_ad.refresh_from_db()  # отзывы сдвигают время изменения объявления
+    stats = {row.author_id: row for row in AuthorStats.objects.all()}
+    assert stats.keys() == {user.pk, user_two.pk, buyer.pk}
+    assert (stats[user.pk].ads_count, stats[user.pk].reviews_count) == (2, 2)
+    assert stats[user.pk].avg_price == Decimal("30500.50")
+    assert stats[user.pk].last_activity_at == max(second_ad.updated_at, review_two.updated_at)
+    assert (stats[user_two.pk].ads_count, stats[user_two.pk].reviews_count) == (1, 1)
+    assert (stats[buyer.pk].ads_count, stats[buyer.pk].reviews_count, stats[buyer.pk].avg_price) == (0, 0, None)
+    assert stats[buyer.pk].last_activity_at == last_review.updated_at
+
+    second_ad.delete()
+    AuthorStatsService.refresh(concurrently=False)
+    assert AuthorStats.objects.get(pk=user.pk).ads_count == 1
+    assert not AuthorStats.objects.filter(pk=buyer.pk).exists()
+
+
+@pytest.mark.django_db
+def test_author_stats_api(
+    api_client: APIClient, user: User, user_two: User, admin: User, review_one: Review, ad_two: Ad
+) -> None:
+    """Тестирование API статистики продавцов: список для администратора, статистика продавца - ему и администратору"""
+    Ad.objects.create(title="Чехол", price=1000, description="Чехол для смартфона", author=user)
+    ReviewStatsService.refresh(Ad.objects.values_list("id", flat=True))
+    AuthorStatsService.refresh()
+    url = reverse("buyrate:author-stats")
+
+    api_client.force_authenticate(user)
+    assert api_client.get(url).status_code == status.HTTP_403_FORBIDDEN
+    response = api_client.get(reverse("buyrate:author-stats-detail", kwargs={"pk": user.pk}))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == {
+        "author": user.pk,
+        "ads_count": 2,
+        "reviews_count": 1,
+        "avg_price": "30500.00",
+        "last_activity_at": response.data["last_activity_at"],
+    }
+    response = api_client.get(reverse("buyrate:author-stats-detail", kwargs={"pk": user_two.pk}))
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    api_client.force_authenticate(admin)
+    response = api_client.get(url)
+    assert [row["author"] for row in response.data["results"]] == [user.pk, user_two.pk]
+    response = api_client.get(url, {"ordering": "reviews_count", "ads_count_min": 1})
+    assert [row["author"] for row in response.data["results"]] == [user_two.pk, user.pk]
+    assert api_client.get(url, {"ads_count_min": 2}).data["count"] == 1
+    response = api_client.get(reverse("buyrate:author-stats-detail", kwargs={"pk": user_two.pk}))
+    assert response.data["ads_count"] == 1
+    response = api_client.get(reverse("buyrate:author-stats-detail", kwargs={"pk": admin.pk}))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db(transaction=True)
+def test_list_ads_cache(user_api_client: APIClient, ad_one: Ad) -> None:
+    """Тестирование кэша списка объявлений: попадание, отказ от кэша и сброс поколения при изменении"""
+    url = reverse("buyrate:ads")
+    anonymous_client = APIClient()
+
+    assert anonymous_client.get(url)["X-Cache"] == "MISS"
+    response = anonymous_client.get(url)
+    assert response["X-Cache"] == "HIT"
+    assert response.data["count"] == 1
+    assert "X-Cache" not in anonymous_client.get(url, {"nocache": 1})
+    assert AdsListCache.stats() == {"hits": 1, "misses": 1}
+
+    data = {"title": "Велосипед", "price": 10000, "description": "Продаю велосипед."}
+    user_api_client.post(reverse("buyrate:ad-create"), data=data)
+    response = anonymous_client.get(url)
+    assert response["X-Cache"] == "MISS"
+    assert response.data["count"] == 2
+
+
+@pytest.mark.django_db
+def test_list_ads_cache_key_normalized(api_client: APIClient, ad_one: Ad) -> None:
+    """Тестирование нормализации параметров запроса в ключе кэша"""
+    url = reverse("buyrate:ads")
+    api_client.get(url, {"search": "Смартфон", "page": 1})
+    assert api_client.get(f"{url}?page=1&search=Смартфон")["X-Cache"] == "HIT"
+
+
+@pytest.mark.django_db
+def test_ad_facets(api_client: APIClient, user: User, user_two: User) -> None:
+    """Тестирование счетчиков фасетов: ценовые диапазоны и периоды создания одним запросом с поиском и фильтрами"""
+    for price, author in ((500, user), (1500, user), (4999, user_two), (25000, user), (200000, user_two)):
+        Ad.objects.create(title=f"Велосипед {price}", price=price, description="Описание", author=author)
+    Ad.objects.filter(price=25000).update(created_at=timezone.now() - timedelta(days=400))
+    Ad.objects.create(title="Ноутбук", price=1000, description="Описание", author=user)
+    url = reverse("buyrate:ad-facets")
+
+    response = api_client.get(url, {"search": "велосипед"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["count"] == 5
+    assert [bucket["count"] for bucket in response.data["price"]] == [1, 2, 0, 1, 1]
+    assert response.data["price"][0] == {"min": 0, "max": 1000, "count": 1}
+    assert response.data["price"][-1]["max"] is None
+    assert [bucket["count"] for bucket in response.data["created_at"]] == [4, 4, 4, 4]
+    assert response.data["created_at"][0] == {"period": "day", "days": 1, "count": 4}
+
+    response = api_client.get(url, {"author": user.pk, "price_min": 1000})
+    assert response.data["count"] == 3
+    assert [bucket["count"] for bucket in response.data["price"]] == [0, 2, 0, 1, 0]
+    assert [bucket["count"] for bucket in response.data["created_at"]] == [2, 2, 2, 2]
+    assert api_client.get(url, {"price_max": "дорого"}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_ad_facets_cache(user_api_client: APIClient, ad_one: Ad, django_capture_on_commit_callbacks) -> None:
+    """Тестирование кэша фасетов: нормализация параметров, авторизованные запросы, сброс поколения при записи"""
+    url = reverse("buyrate:ad-facets")
+    anonymous_client = APIClient()
+
+    assert anonymous_client.get(url, {"search": "Смартфон  Samsung", "price_min": 100})["X-Cache"] == "MISS"
+    response = user_api_client.get(f"{url}?page=2&price_min=100&ordering=price&author=&search=смартфон samsung")
+    assert response["X-Cache"] == "HIT"
+    assert response.data["count"] == 1
+    assert "X-Cache" not in anonymous_client.get(url, {"nocache": 1})
+    assert anonymous_client.get(url, {"price_min": 100})["X-Cache"] == "MISS"
+
+    # Нормализуется только поисковый запрос
+    assert anonymous_client.get(url, {"title": "Смартфон"})["X-Cache"] == "MISS"
+    assert anonymous_client.get(url, {"title": "смартфон"})["X-Cache"] == "MISS"
+    assert anonymous_client.get(url, {"title": "Смартфон"})["X-Cache"] == "HIT"
+
+    # Отзывы на счетчики не влияют и сбрасывают только поколение списка
+    list_generation = AdsListCache.get_generation()
+    with django_capture_on_commit_callbacks(execute=True):
+        user_api_client.post(reverse("buyrate:ad-review-create", kwargs={"ad_id": ad_one.pk}), data={"text": "Отзыв"})
+    assert AdsListCache.get_generation() != list_generation
+    assert anonymous_client.get(url, {"price_min": 100})["X-Cache"] == "HIT"
+
+    data = {"title": "Смартфон Samsung A52", "price": 10000, "description": "Продаю смартфон."}
+    with django_capture_on_commit_callbacks(execute=True):
+        user_api_client.post(reverse("buyrate:ad-create"), data=data)
+    response = anonymous_client.get(url, {"search": "смартфон samsung", "price_min": 100})
+    assert response["X-Cache"] == "MISS"
+    assert response.data["count"] == 2
+
+
+def test_ad_facets_cache_single_flight(settings) -> None:
+    """Тестирование защиты кэша фасетов от одновременного пересчета: счетчики считает один запрос"""
+    settings.ADS_FACETS_LOCK_TIMEOUT = 5
+    request = Request(APIRequestFactory().get(reverse("buyrate:ad-facets"), {"search": "велосипед"}))
+    started = threading.Event()
+    calls = []
+
+    def compute() -> dict:
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {"count": 1}
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(AdFacetsCache.get_or_set(request, compute)))
+    first.start()
+    started.wait(5)
+    others = [
+        threading.Thread(target=lambda: results.append(AdFacetsCache.get_or_set(request, compute))) for _ in range(3)
+    ]
+    for thread in others:
+        thread.start()
+    for thread in (first, *others):
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(hit for _, hit in results) == [False, True, True, True]
+    assert all(data == {"count": 1} for data, _ in results)
+
+    # Зависшая блокировка (упавший запрос) задерживает ждущих не дольше ADS_FACETS_LOCK_TIMEOUT
+    AdFacetsCache._bump()
+    lock_key = f"{AdFacetsCache.make_key(request)}:lock"
+    cache.add(lock_key, "stuck", 60)
+    settings.ADS_FACETS_LOCK_TIMEOUT = 0.1
+    assert AdFacetsCache.get_or_set(request, lambda: {"count": 2}) == ({"count": 2}, False)
+    assert cache.get(lock_key) == "stuck"  # ждущий не владеет блокировкой и не снимает ее
+
+    # Владелец, чья блокировка истекла и перешла другому запросу, не снимает чужую блокировку
+    AdFacetsCache._bump()
+    lock_key = f"{AdFacetsCache.make_key(request)}:lock"
+
+    def overrun() -> dict:
+        cache.set(lock_key, "other", 60)
+        return {"count": 3}
+
+    assert AdFacetsCache.get_or_set(request, overrun) == ({"count": 3}, False)
+    assert cache.get(lock_key) == "other"
+    AdFacetsCache._bump()
+    assert AdFacetsCache.get_or_set(request, lambda: {"count": 4}) == ({"count": 4}, False)
+    assert cache.get(f"{AdFacetsCache.make_key(request)}:lock") is None  # свою блокировку владелец снимает
+
+
+@pytest.mark.django_db
+def test_read_ad_conditional_get(user_api_client: APIClient, ad_one: Ad) -> None:
+    """Тестирование условного GET объявления: 304 по ETag и Last-Modified, 200 после изменения"""
+    url = reverse("buyrate:ad-detail", kwargs={"pk": ad_one.pk})
+    response = user_api_client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    etag = response["ETag"]
+
+    response = user_api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response["ETag"] == etag
+    assert not response.content
+
+    last_modified = user_api_client.get(url)["Last-Modified"]
+    response = user_api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    user_api_client.patch(reverse("buyrate:ad-update", kwargs={"pk": ad_one.pk}), data={"price": 1})
+    response = user_api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_list_reviews_conditional_get(user_api_client: APIClient, ad_two: Ad, review_two: Review) -> None:
+    """Тестирование условного GET списка отзывов объявления"""
+    url = reverse("buyrate:ad-reviews", kwargs={"ad_id": ad_two.pk})
+    etag = user_api_client.get(url)["ETag"]
+    assert user_api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+    user_api_client.patch(
+        reverse("buyrate:ad-review-update", kwargs={"ad_id": ad_two.pk, "pk": review_two.pk}), data={"text": "Новый"}
+    )
+    response = user_api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["results"][0]["text"] == "Новый"
+
+
+@pytest.mark.django_db
+def test_last_modified_moves_forward(admin_api_client: APIClient, ad_one: Ad, review_one: Review) -> None:
+    """Тестирование Last-Modified: удаление последнего отзыва не сдвигает время изменения назад"""
+    hour_ago = timezone.now() - timedelta(hours=1)
+    Review.objects.create(text="Старый отзыв", author=review_one.author, ad=ad_one)
+    Review.objects.filter(ad=ad_one).exclude(pk=review_one.pk).update(created_at=hour_ago, updated_at=hour_ago)
+    ReviewStatsService.refresh([ad_one.pk])
+    Ad.objects.filter(pk=ad_one.pk).update(updated_at=hour_ago, reviews_changed_at=hour_ago)
+
+    urls = [
+        reverse("buyrate:ad-detail", kwargs={"pk": ad_one.pk}),
+        reverse("buyrate:ad-reviews", kwargs={"ad_id": ad_one.pk}),
+    ]
+    before = [admin_api_client.get(url)["Last-Modified"] for url in urls]
+    admin_api_client.delete(reverse("buyrate:ad-review-delete", kwargs={"ad_id": ad_one.pk, "pk": review_one.pk}))
+    for url, last_modified in zip(urls, before):
+        response = admin_api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == status.HTTP_200_OK
+        assert parse_http_date(response["Last-Modified"]) > parse_http_date(last_modified)
+
+
+@pytest.mark.django_db
+def test_conditional_get_after_admin_review_change(
+    client, user_api_client: APIClient, user: User, ad_two: Ad, review_two: Review
+) -> None:
+    """Тестирование условного GET после изменения и удаления отзыва в админке: ETag и Last-Modified обновляются"""
+    hour_ago = timezone.now() - timedelta(hours=1)
+    ReviewStatsService.refresh([ad_two.pk])
+    Ad.objects.filter(pk=ad_two.pk).update(updated_at=hour_ago, reviews_changed_at=hour_ago)
+    client.force_login(User.objects.create(email="superuser@example.com", is_staff=True, is_superuser=True))
+    ad_url = reverse("buyrate:ad-detail", kwargs={"pk": ad_two.pk})
+    reviews_url = reverse("buyrate:ad-reviews", kwargs={"ad_id": ad_two.pk})
+
+    response = user_api_client.get(reviews_url)
+    etag, last_modified = response["ETag"], response["Last-Modified"]
+    client.post(
+        reverse("admin:buyrate_review_change", args=[review_two.pk]),
+        {"text": "Новый", "author": user.pk, "ad": ad_two.pk},
+    )
+    response = user_api_client.get(reviews_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["results"][0]["text"] == "Новый"
+    response = user_api_client.get(reviews_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == status.HTTP_200_OK
+
+    response = user_api_client.get(ad_url)
+    etag, last_modified = response["ETag"], response["Last-Modified"]
+    client.post(reverse("admin:buyrate_review_delete", args=[review_two.pk]), {"post": "yes"})
+    response = user_api_client.get(ad_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["reviews_count"] == 0
+    assert parse_http_date(response["Last-Modified"]) > parse_http_date(last_modified)
+
+
+@pytest.mark.django_db
+def test_edge_cache_headers(user_api_client: APIClient, ad_one: Ad, settings) -> None:
+    """Тестирование заголовков пограничного кэша: public для анонимных, private с Authorization, без кэша ошибок"""
+    settings.EDGE_CACHE_TIMEOUT = 120
+    response = APIClient().get(reverse("buyrate:ads"))
+    assert response["Cache-Control"] == "public, max-age=0, s-maxage=120"
+    assert response["Vary"] == "Accept, Authorization"
+    assert response["Surrogate-Key"] == "ads ads-list"
+
+    url = reverse("buyrate:ad-detail", kwargs={"pk": ad_one.pk})
+    response = user_api_client.get(url)
+    assert response["Cache-Control"] == "private, no-cache"
+    assert response["Surrogate-Key"] == f"ads ad-{ad_one.pk}"
+    response = user_api_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response["Cache-Control"] == "private, no-cache"
+
+    response = user_api_client.get(reverse("buyrate:ad-review-detail", kwargs={"ad_id": ad_one.pk, "pk": 0}))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response["Vary"] == "Accept, Authorization"
+    assert "Cache-Control" not in response
+    assert "Surrogate-Key" not in response
+
+    response = user_api_client.get(reverse("buyrate:ad-reviews", kwargs={"ad_id": ad_one.pk}))
+    assert response["Surrogate-Key"] == f"reviews ad-{ad_one.pk}-reviews"
+
+
+@pytest.mark.django_db
+def test_edge_cache_purge_on_write(user_api_client: APIClient, ad_one: Ad, settings) -> None:
+    """Тестирование постановки очистки пограничного кэша в исходящую очередь при записи"""
+    user_api_client.patch(reverse("buyrate:ad-update", kwargs={"pk": ad_one.pk}), data={"price": 1})
+    assert not TaskOutbox.objects.exists()
+
+    settings.EDGE_PURGE_URL = "http://edge-purge.test/"
+    user_api_client.patch(reverse("buyrate:ad-update", kwargs={"pk": ad_one.pk}), data={"price": 2})
+    user_api_client.post(reverse("buyrate:ad-review-create", kwargs={"ad_id": ad_one.pk}), data={"text": "Отзыв"})
+    user_api_client.delete(reverse("buyrate:ad-delete", kwargs={"pk": ad_one.pk}))
+    purges = [outbox.args for outbox in TaskOutbox.objects.order_by("id")]
+    assert {outbox.task_name for outbox in TaskOutbox.objects.all()} == {purge_edge_cache.name}
+    ad_keys, review_keys = [f"ad-{ad_one.pk}"], [f"ad-{ad_one.pk}", f"ad-{ad_one.pk}-reviews"]
+    assert purges == [
+        [sorted(["ads-list", *ad_keys])],
+        [sorted(["ads-list", "reviews-list", *review_keys])],
+        [sorted(["ads-list", "reviews-list", *review_keys])],
+    ]
+    assert EdgeCache.ad_keys([1, 2], reviews=True) == ["ad-1", "ad-2", "ad-1-reviews", "ad-2-reviews"]
+
+
+def test_edge_purge_stub(tmp_path, settings) -> None:
+    """Тестирование очистки файлов кэша nginx по Surrogate-Key задачей purge_edge_cache и edge_purge_stub"""
+
+    def write_cache_file(name: str, keys: str) -> None:
+        path = tmp_path / name[-1] / name[-3:-1] / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(
+            b"\x05\x00\x00\x00\r\n\r\n\nKEY: httplocalhost/ads/\n"
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            + f"Surrogate-Key: {keys}\r\n\r\n".encode()
+            + b'{"detail": "Surrogate-Key: ad-1"}'
+        )
+
+    write_cache_file("a1b", "ads ad-1")
+    write_cache_file("c2d", "ads-list")
+    write_cache_file("e3f", "reviews ad-1-reviews")
+    (tmp_path / "broken").write_bytes(b"Surrogate-Key: ad-1")
+
+    server = EdgePurgeStubCommand.make_server("127.0.0.1", 0, str(tmp_path))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        settings.EDGE_PURGE_URL = f"http://127.0.0.1:{server.server_address[1]}/"
+        assert purge_edge_cache(["ad-1", "reviews-list"]) == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    remaining = sorted(path.name for path in tmp_path.rglob("*") if path.is_file())
+    assert remaining == ["broken", "c2d", "e3f"]
+    assert EdgePurgeStubCommand.purge(str(tmp_path), ["ads-list", "ad-1-reviews"]) == 2
+
+
+@pytest.mark.django_db
+def test_list_ads_embed_reviews(
+    api_client: APIClient, ad_one: Ad, ad_two: Ad, user: User, django_assert_num_queries
+) -> None:
+    """Тестирование встраивания последних отзывов в список объявлений одним оконным запросом"""
+    for ad in (ad_one, ad_two):
+        for i in range(3):
+            Review.objects.create(text=f"Отзыв {i} к {ad.pk}", author=user, ad=ad)
+
+    with django_assert_num_queries(3):
+        response = api_client.get(reverse("buyrate:ads"), {"embed_reviews": 2})
+    assert response.status_code == status.HTTP_200_OK
+    for item in response.data["results"]:
+        expected = list(Review.objects.filter(ad_id=item["id"]).order_by("-created_at", "-id")[:2])
+        assert [review["id"] for review in item["latest_reviews"]] == [review.pk for review in expected]
+
+    response = api_client.get(reverse("buyrate:ads"))
+    assert "latest_reviews" not in response.data["results"][0]
+
+
+@pytest.mark.django_db
+def test_list_ads_embed_reviews_after_review_update(
+    user_api_client: APIClient, ad_two: Ad, review_two: Review, django_capture_on_commit_callbacks
+) -> None:
+    """Тестирование сброса кэша списка объявлений со встроенными отзывами при изменении отзыва"""
+    url = reverse("buyrate:ads")
+    anonymous_client = APIClient()
+    assert anonymous_client.get(url, {"embed_reviews": 1})["X-Cache"] == "MISS"
+    assert anonymous_client.get(url, {"embed_reviews": 1})["X-Cache"] == "HIT"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_api_client.patch(
+            reverse("buyrate:ad-review-update", kwargs={"ad_id": ad_two.pk, "pk": review_two.pk}),
+            data={"text": "Новый"},
+        )
+    assert response.status_code == status.HTTP_200_OK
+    response = anonymous_client.get(url, {"embed_reviews": 1})
+    assert response["X-Cache"] == "MISS"
+    item = next(item for item in response.data["results"] if item["id"] == ad_two.pk)
+    assert item["latest_reviews"][0]["text"] == "Новый"
+
+
+@pytest.mark.django_db
+def test_list_ads_embed_reviews_invalid(api_client: APIClient) -> None:
+    """Тестирование проверки параметра embed_reviews"""
+    response = api_client.get(reverse("buyrate:ads"), {"embed_reviews": 100})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_batch_create_ads(user_api_client: APIClient, user: User, django_assert_num_queries) -> None:
+    """Тестирование пакетного создания объявлений одним INSERT"""
+    data = [{"title": f"Товар {i}", "price": 100 * i, "description": "Описание"} for i in range(1, 4)]
+    # пользователь по токену, SAVEPOINT, INSERT, RELEASE SAVEPOINT
+    with django_assert_num_queries(4):
+        response = user_api_client.post(reverse("buyrate:ad-batch-create"), data=data, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+    assert [item["title"] for item in response.data] == [item["title"] for item in data]
+    assert Ad.objects.filter(author=user).count() == 3
+
+    response = user_api_client.post(reverse("buyrate:ad-batch-create"), data=[{"title": "Без цены"}], format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert Ad.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_batch_update_ads(user_api_client: APIClient, ad_one: Ad, ad_two: Ad, user: User) -> None:
+    """Тестирование пакетного обновления объявлений и проверки прав на весь пакет"""
+    ad_three = Ad.objects.create(title="Планшет", price=30000, description="Планшет", author=user)
+    data = [{"id": ad_one.pk, "price": 1}, {"id": ad_three.pk, "title": "Планшет Apple"}]
+    response = user_api_client.patch(reverse("buyrate:ad-batch-update"), data=data, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == {"updated": 2}
+    ad_one.refresh_from_db()
+    ad_three.refresh_from_db()
+    assert ad_one.price == 1
+    assert ad_one.title == "Смартфон Samsung Galaxy S21"
+    assert ad_three.title == "Планшет Apple"
+    assert Ad.objects.filter(search_vector=SearchQuery("Apple", config="english")).get() == ad_three
+
+    data = [{"id": ad_one.pk, "price": 2}, {"id": ad_two.pk, "price": 2}]
+    response = user_api_client.patch(reverse("buyrate:ad-batch-update"), data=data, format="json")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    ad_one.refresh_from_db()
+    assert ad_one.price == 1
+
+
+@pytest.mark.django_db
+def test_batch_delete_ads(user_api_client: APIClient, admin_api_client: APIClient, ad_one: Ad, ad_two: Ad) -> None:
+    """Тестирование пакетного удаления объявлений"""
+    url = reverse("buyrate:ad-batch-delete")
+    response = admin_api_client.delete(url, data={"ids": [ad_one.pk, ad_two.pk, 0]}, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = admin_api_client.delete(url, data={"ids": [ad_one.pk, ad_two.pk]}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == {"deleted": 2}
+    assert not Ad.objects.exists()
+
+
+@pytest.mark.django_db
+def test_batch_reprice_ads(user_api_client: APIClient, ad_one: Ad, ad_two: Ad) -> None:
+    """Тестирование изменения цен всех объявлений пользователя одним UPDATE"""
+    response = user_api_client.post(reverse("buyrate:ad-batch-reprice"), data={"percent": "-10"}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == {"updated": 1}
+    ad_one.refresh_from_db()
+    ad_two.refresh_from_db()
+    assert ad_one.price == 54000
+    assert ad_two.price == 45000
+
+    data = {"percent": "-10", "ids": [ad_two.pk]}
+    response = user_api_client.post(reverse("buyrate:ad-batch-reprice"), data=data, format="json")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    # Цена ограничивается верхней границей integer, а не роняет UPDATE
+    Ad.objects.filter(pk=ad_one.pk).update(price=2000000000)
+    response = user_api_client.post(reverse("buyrate:ad-batch-reprice"), data={"percent": "100"}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    ad_one.refresh_from_db()
+    assert ad_one.price == AdBatchService.max_price == 2147483647
+
+
+@pytest.mark.django_db
+def test_import_reviews(admin_api_client: APIClient, ad_one: Ad, user_two: User) -> None:
+    """Тестирование потокового импорта отзывов из NDJSON пачками с отчетом об ошибках"""
+    rows = [
+        json.dumps({"ad": ad_one.pk, "author": user_two.pk, "text": "Первый", "created_at": "2020-01-01T10:00:00Z"}),
+        "не json",
+        json.dumps({"ad": 0, "author": user_two.pk, "text": "Нет объявления"}),
+        "",
+        json.dumps({"ad": ad_one.pk, "author": user_two.pk, "text": "Второй"}),
+        json.dumps({"ad": ad_one.pk, "author": user_two.pk}),
+    ]
+    response = admin_api_client.generic(
+        "POST",
+        f"{reverse('buyrate:reviews-import')}?chunk_size=1",
+        "\n".join(rows).encode("utf-8"),
+        content_type="application/x-ndjson",
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["created"] == 2
+    assert response.data["failed"] == 3
+    assert [error["line"] for error in response.data["errors"]] == [2, 3, 6]
+    assert Review.objects.get(text="Первый").created_at.year == 2020
+    ad_one.refresh_from_db()
+    assert ad_one.reviews_count == 2
+
+
+@pytest.mark.django_db
+def test_import_reviews_not_admin(user_api_client: APIClient) -> None:
+    """Тестирование запрета импорта отзывов не администратором"""
+    url = reverse("buyrate:reviews-import")
+    response = user_api_client.generic("POST", url, b"", content_type="application/x-ndjson")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_import_reviews_command(capsys: pytest.CaptureFixture, tmp_path, ad_one: Ad, user_two: User) -> None:
+    """Тестирование команды импорта отзывов из NDJSON-файла"""
+    path = tmp_path / "reviews.ndjson"
+    rows = [{"ad": ad_one.pk, "author": user_two.pk, "text": f"Отзыв {i}"} for i in range(5)]
+    path.write_text("\n".join(json.dumps(row) for row in rows), encoding="utf-8")
+
+    call_command("import_reviews", str(path), "--chunk-size", "2")
+    assert "Импортировано отзывов: 5" in capsys.readouterr().out
+    assert Review.objects.filter(ad=ad_one).count() == 5
+
+
+AD_IMPORT_CSV = (
+    "price,Title,description,sku\n"
+    "1500,Велосипед,Горный велосипед,A1\n"
+    ",Без цены,Описание,A2\n"
+    "-5,Отрицательная цена,Описание,A3\n"
+    "3000000000,Дорогой,Описание,A4\n"
+    "\n"
+    '200,"Диван, угловой","Две строки\nописания",A5\n'
+    "100,,Описание,A6\n"
+    "100,Лишний столбец,Описание,A7,X\n"
+    "0,Бесплатно,Отдам даром,A8\n"
+)
+
+
+@pytest.mark.django_db
+def test_ad_import_csv(user: User) -> None:
+    """Тестирование импорта объявлений из CSV через COPY: порядок строк, поисковый вектор, файл ошибок"""
+    errors = io.StringIO()
+    report = AdImportService.import_csv(io.StringIO(AD_IMPORT_CSV), user.pk, errors)
+    assert report == {"created": 3, "failed": 5}
+
+    ads = list(Ad.objects.filter(author=user).order_by("id"))
+    assert [(ad.title, ad.price) for ad in ads] == [("Велосипед", 1500), ("Диван, угловой", 200), ("Бесплатно", 0)]
+    assert ads[1].description == "Две строки\nописания"
+    assert all(ad.search_vector and ad.reviews_count == 0 for ad in ads)
+    assert Ad.objects.filter(search_vector=SearchQuery("велосипед", config="russian")).get() == ads[0]
+
+    rows = list(csv.reader(io.StringIO(errors.getvalue())))
+    assert rows[0] == ["line", "error", "price", "title", "description", "sku"]
+    assert [row[0] for row in rows[1:]] == ["3", "4", "5", "9", "10"]
+    assert rows[1][1].startswith("price:") and rows[1][2:] == ["", "Без цены", "Описание", "A2"]
+    assert rows[4][1].startswith("title:")
+    assert "получено: 5" in rows[5][1]
+
+    with pytest.raises(ValueError, match="description"):
+        AdImportService.import_csv(io.StringIO("title,price\nТовар,10\n"), user.pk)
+    # Повторный импорт в той же транзакции: временная таблица удалена
+    assert AdImportService.import_csv(io.StringIO(AD_IMPORT_CSV), user.pk)["created"] == 3
+
+
+@pytest.mark.django_db
+def test_ad_import_admin(client, settings, tmp_path, user: User) -> None:
+    """Тестирование загрузки CSV в админке: задача в исходящей очереди, однократная обработка, файл ошибок"""
+    settings.MEDIA_ROOT = tmp_path
+    admin_user = User.objects.create(email="superuser@example.com", is_staff=True, is_superuser=True)
+    client.force_login(admin_user)
+    file = SimpleUploadedFile("ads.csv", ("\ufeff" + AD_IMPORT_CSV).encode("utf-8"), content_type="text/csv")
+    response = client.post(reverse("admin:buyrate_adimport_add"), {"file": file, "author": user.pk})
+    assert response.status_code == status.HTTP_302_FOUND
+
+    ad_import = AdImport.objects.get()
+    assert ad_import.status == "pending"
+    outbox = TaskOutbox.objects.get(task_name="buyrate.tasks.import_ads")
+    assert outbox.args == [ad_import.pk]
+
+    assert import_ads(ad_import.pk) == {"status": "done", "created": 3, "failed": 5}
+    assert import_ads(ad_import.pk) == {}
+    assert Ad.objects.filter(author=user).count() == 3
+
+    response = client.get(reverse("admin:buyrate_adimport_errors", args=[ad_import.pk]))
+    assert response.status_code == status.HTTP_200_OK
+    rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode("utf-8"))))
+    assert [row[0] for row in rows] == ["line", "3", "4", "5", "9", "10"]
+    response = client.get(reverse("admin:buyrate_adimport_changelist"))
+    assert reverse("admin:buyrate_adimport_errors", args=[ad_import.pk]) in response.content.decode("utf-8")
+
+    broken = AdImport.objects.create(
+        author=user, file=SimpleUploadedFile("broken.csv", b"title,price,description\n\xff\n")
+    )
+    assert import_ads(broken.pk)["status"] == "failed"
+    broken.refresh_from_db()
+    assert "UTF-8" in broken.error and not broken.errors_file
+
+
+@pytest.mark.django_db
+def test_ad_import_run_failures(settings, tmp_path, user: User) -> None:
+    """Тестирование загрузки: длинные поля, неразобранные строки, непредвиденная ошибка, зависшая загрузка"""
+    settings.MEDIA_ROOT = tmp_path
+    description = "Описание " * 20000
+    content = f'title,price,description\nДлинное,10,"{description}"\nКороткое,20,Описание\n'
+    ad_import = AdImport.objects.create(author=user, file=SimpleUploadedFile("long.csv", content.encode("utf-8")))
+    assert AdImportService.run(ad_import.pk).status == "done"
+    assert Ad.objects.get(author=user, title="Длинное").description == description.strip()
+
+    # Строка, которую не удалось разобрать, попадает в файл ошибок, остальные импортируются
+    errors = io.StringIO()
+    with patch.object(AdImportService, "max_field_size", 100):
+        report = AdImportService.import_csv(io.StringIO(content), user.pk, errors)
+    csv.field_size_limit(AdImportService.max_field_size)
+    assert report == {"created": 1, "failed": 1}
+    rows = list(csv.reader(io.StringIO(errors.getvalue())))
+    assert rows[1][0] == "2" and "field limit" in rows[1][1]
+
+    # Непредвиденная ошибка откатывает объявления, отмечает загрузку и пробрасывается
+    broken = AdImport.objects.create(author=user, file=SimpleUploadedFile("ads.csv", AD_IMPORT_CSV.encode("utf-8")))
+    import_csv = AdImportService.import_csv
+
+    def import_and_fail(*args) -> dict:
+        import_csv(*args)
+        raise RuntimeError("disk full")
+
+    with patch.object(AdImportService, "import_csv", side_effect=import_and_fail):
+        with pytest.raises(RuntimeError):
+            AdImportService.run(broken.pk)
+    broken.refresh_from_db()
+    assert (broken.status, broken.finished_at is not None) == ("failed", True)
+    assert broken.error == "RuntimeError: disk full"
+    assert not Ad.objects.filter(author=user, title="Велосипед").exists()
+
+    # Загрузка в статусе running забирается повторно только после AD_IMPORT_STALE_TIMEOUT
+    stuck = AdImport.objects.create(
+        author=user, file=SimpleUploadedFile("ads.csv", AD_IMPORT_CSV.encode("utf-8")), status="running"
+    )
+    AdImport.objects.filter(pk=stuck.pk).update(started_at=timezone.now())
+    assert AdImportService.run(stuck.pk) is None
+    AdImport.objects.filter(pk=stuck.pk).update(
+        started_at=timezone.now() - timedelta(seconds=settings.AD_IMPORT_STALE_TIMEOUT + 1)
+    )
+    assert AdImportService.run(stuck.pk).status == "done"
+    assert AdImportService.run(stuck.pk) is None
+
+
+@pytest.mark.django_db
+def test_import_ads_command(capsys: pytest.CaptureFixture, tmp_path, user: User) -> None:
+    """Тестирование команды импорта объявлений из CSV-файла"""
+    path = tmp_path / "ads.csv"
+    path.write_text(AD_IMPORT_CSV, encoding="utf-8")
+    errors = tmp_path / "errors.csv"
+
+    call_command("import_ads", str(path), "--author", user.email, "--errors", str(errors))
+    output = capsys.readouterr().out
+    assert "Импортировано объявлений: 3" in output
+    assert "Строк с ошибками: 5" in output
+    assert len(errors.read_text(encoding="utf-8").splitlines()) == 6
+
+    with pytest.raises(CommandError, match="не найден"):
+        call_command("import_ads", str(path), "--author", "nobody@example.com")
+    path.write_text("title,price\n", encoding="utf-8")
+    with pytest.raises(CommandError, match="description"):
+        call_command("import_ads", str(path), "--author", str(user.pk), "--errors", str(errors))
+    assert not errors.exists()
+
+
+@pytest.mark.django_db
+def test_export_ads_ndjson(user_api_client: APIClient, ad_one: Ad, ad_two: Ad) -> None:
+    """Тестирование потоковой выгрузки объявлений в NDJSON"""
+    response = user_api_client.get(reverse("buyrate:export", kwargs={"table": "ads"}))
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in b"".join(response.streaming_content).decode("utf-8").splitlines()]
+    assert [row["id"] for row in rows] == sorted([ad_one.pk, ad_two.pk])
+    assert rows[0]["title"]
+
+
+@pytest.mark.django_db
+def test_export_reviews_csv_gzip(user_api_client: APIClient, review_one: Review, review_two: Review) -> None:
+    """Тестирование потоковой выгрузки отзывов в CSV с gzip и фильтром по дате"""
+    url = reverse("buyrate:export", kwargs={"table": "reviews"})
+    response = user_api_client.get(url, {"file_format": "csv", "gzip": "true"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Disposition"] == 'attachment; filename="reviews.csv.gz"'
+    content = gzip.decompress(b"".join(response.streaming_content)).decode("utf-8")
+    rows = list(csv.reader(io.StringIO(content)))
+    assert rows[0] == ["id", "ad_id", "author_id", "text", "created_at", "updated_at"]
+    assert len(rows) == 3
+
+    response = user_api_client.get(url, {"created_from": "2100-01-01T00:00:00Z"})
+    assert b"".join(response.streaming_content) == b""
+
+
+@pytest.mark.django_db
+def test_export_asgi_streams_async(user: User, review_one: Review, review_two: Review) -> None:
+    """Тестирование выгрузки под ASGI: ответ отдается асинхронным итератором (astream), а не синхронным stream"""
+    url = reverse("buyrate:export", kwargs={"table": "reviews"})
+    headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+    async def export() -> tuple:
+        response = await AsyncClient().get(url, {"file_format": "csv", "gzip": "true"}, headers=headers)
+        return response, b"".join([block async for block in response.streaming_content])
+
+    with patch.object(BuyRateExportService, "stream", side_effect=AssertionError("sync stream under ASGI")):
+        with patch.object(BuyRateExportService, "buffer_size", 1):
+            response, content = async_to_sync(export)()
+    assert response.status_code == status.HTTP_200_OK
+    assert response.is_async
+    rows = list(csv.reader(io.StringIO(gzip.decompress(content).decode("utf-8"))))
+    assert rows[0] == ["id", "ad_id", "author_id", "text", "created_at", "updated_at"]
+    assert sorted(int(row[0]) for row in rows[1:]) == sorted([review_one.pk, review_two.pk])
+
+
+@pytest.mark.django_db
+def test_export_unknown_table(user_api_client: APIClient) -> None:
+    """Тестирование выгрузки несуществующей таблицы"""
+    response = user_api_client.get(reverse("buyrate:export", kwargs={"table": "users"}))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_export_buyrate_command(tmp_path, ad_one: Ad) -> None:
+    """Тестирование команды потоковой выгрузки в файл"""
+    path = tmp_path / "ads.ndjson"
+    call_command("export_buyrate", "ads", "--output", str(path))
+    assert json.loads(path.read_text(encoding="utf-8"))["id"] == ad_one.pk
+
+
+def call_async_view(view_class, url: str, token: str | None = None, view_kwargs: dict | None = None, **headers):
+    """Вызывает асинхронное представление так же, как это делает ASGI-обработчик"""
+    if token:
+        headers["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    request = RequestFactory().get(url, **headers)
+    return async_to_sync(view_class.as_view())(request, **(view_kwargs or {}))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url_name, view_class, query",
+    [
+        ("buyrate:ads", AsyncAdsListView, ""),
+        ("buyrate:ads", AsyncAdsListView, "?search=смартфон&embed_reviews=2"),
+        ("buyrate:ads", AsyncAdsListView, "?pagination=cursor&page_size=1"),
+        ("buyrate:all-reviews", AsyncAllReviewsListView, "?page=1"),
+        ("buyrate:ad-detail", AsyncAdRetrieveView, ""),
+        ("buyrate:ad-reviews", AsyncReviewsListView, ""),
+    ],
+)
+def test_async_read_views_match_sync(
+    api_client: APIClient, user: User, review_one: Review, review_two: Review, url_name: str, view_class, query: str
+) -> None:
+    """Тестирование совпадения ответов асинхронных и синхронных представлений чтения"""
+    token = str(AccessToken.for_user(user))
+    view_kwargs = {}
+    if url_name == "buyrate:ad-detail":
+        view_kwargs = {"pk": review_one.ad_id}
+    elif url_name == "buyrate:ad-reviews":
+        view_kwargs = {"ad_id": review_one.ad_id}
+    url = reverse(url_name, kwargs=view_kwargs or None) + query
+
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+    expected = api_client.get(url, HTTP_ACCEPT="application/json")
+    response = call_async_view(view_class, url, token, view_kwargs)
+    assert response.status_code == expected.status_code == status.HTTP_200_OK
+    assert response.content == expected.content
+    for header in ("ETag", "Cache-Control", "Vary", "Surrogate-Key"):
+        assert response.get(header) == expected.get(header), header
+
+
+@pytest.mark.django_db
+def test_async_ads_list_author_filter(api_client: APIClient, user: User, ad_one: Ad, ad_two: Ad) -> None:
+    """Тестирование фильтра по автору в асинхронном списке объявлений: проверка фильтров не блокирует цикл событий"""
+    url = f"{reverse('buyrate:ads')}?author={user.pk}&nocache=1"
+    expected = api_client.get(url, HTTP_ACCEPT="application/json")
+    response = call_async_view(AsyncAdsListView, url)
+    assert response.status_code == expected.status_code == status.HTTP_200_OK
+    assert response.content == expected.content
+    assert [ad["id"] for ad in json.loads(response.content)["results"]] == [ad_one.pk]
+
+    response = call_async_view(AsyncAdsListView, f"{reverse('buyrate:ads')}?author=abc&nocache=1")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_async_read_views_auth(user: User, ad_one: Ad) -> None:
+    """Тестирование JWT-аутентификации, 404 и условного GET в асинхронных представлениях"""
+    url = reverse("buyrate:ad-detail", kwargs={"pk": ad_one.pk})
+    response = call_async_view(AsyncAdRetrieveView, url, view_kwargs={"pk": ad_one.pk})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response["WWW-Authenticate"] == 'Bearer realm="api"'
+
+    response = call_async_view(AsyncAdRetrieveView, url, "invalid", {"pk": ad_one.pk})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert json.loads(response.content)["code"] == "token_not_valid"
+
+    token = str(AccessToken.for_user(user))
+    response = call_async_view(AsyncAdRetrieveView, url, token, {"pk": ad_one.pk})
+    assert response.status_code == status.HTTP_200_OK
+    response = call_async_view(AsyncAdRetrieveView, url, token, {"pk": ad_one.pk}, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    response = call_async_view(AsyncReviewsListView, url, token, {"ad_id": 0})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert json.loads(response.content) == {"detail": "Объявление с данным ID не найдено."}
+
+    response = call_async_view(AsyncAdsListView, reverse("buyrate:ads"))
+    assert response.status_code == status.HTTP_200_OK
+    assert response["X-Cache"] == "MISS"
+    assert call_async_view(AsyncAdsListView, reverse("buyrate:ads"))["X-Cache"] == "HIT"
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("serializer_class", [AdSerializers, ReviewSerializers])
+def test_fast_read_serializer_matches_model_serializer(review_one: Review, ad_two: Ad, serializer_class) -> None:
+    """Тестирование совпадения быстрого сериализатора с ModelSerializer"""
+    queryset = serializer_class.Meta.model.objects.order_by("id")
+    fast_serializer = FastReadSerializers(serializer_class)
+    data = fast_serializer.serialize(fast_serializer.get_queryset(queryset))
+    expected = serializer_class(queryset, many=True).data
+    assert data == expected
+    assert [list(item) for item in data] == [list(item) for item in expected]
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(expected)
+    assert not FastReadSerializers.supports(AdWithReviewsSerializers)
+
+
+def test_orjson_renderer_matches_json_renderer() -> None:
+    """Тестирование побайтной совместимости ORJSONRenderer с JSONRenderer"""
+    data = {
+        "text": 'Отзыв \u2028 \u2029 \x00 \t "кавычки" / \\',
+        "created_at": timezone.now(),
+        "price": Decimal("10.50"),
+        "detail": _("Not found."),
+        1: [None, True, 1.5, {"nested": []}],
+    }
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+    indented = ORJSONRenderer().render(data, "application/json; indent=4")
+    assert indented == JSONRenderer().render(data, "application/json; indent=4")
+    assert ORJSONRenderer().render({"big": 2**70}) == JSONRenderer().render({"big": 2**70})
+
+
+def test_orjson_parser() -> None:
+    """Тестирование ORJSONParser"""
+    parser = ORJSONParser()
+    assert parser.parse(io.BytesIO('{"text": "Отзыв"}'.encode("utf-8"))) == {"text": "Отзыв"}
+    with pytest.raises(ParseError):
+        parser.parse(io.BytesIO(b"{invalid"))
+
+
+@pytest.mark.django_db
+def test_query_budget_report(user_api_client: APIClient, ad_one: Ad, query_budget: list) -> None:
+    """Тестирование отчета и превышения бюджета SQL-запросов представления"""
+    response = user_api_client.get(reverse("buyrate:ad-detail", kwargs={"pk": ad_one.pk}))
+    assert response["X-Query-Count"] == "2"
+    assert query_budget[-1] == {
+        "view": "AdRetrieveAPIView",
+        "path": f"/ads/{ad_one.pk}/",
+        "queries": 2,
+        "budget": AdRetrieveAPIView.query_budget,
+        "repeated": {},
+    }
+
+    # Повторный запрос берет пользователя из UserAuthCache и выполняет один запрос
+    with patch.object(AdRetrieveAPIView, "query_budget", 0):
+        with pytest.raises(QueryBudgetExceeded, match="1 запросов при бюджете 0"):
+            user_api_client.get(reverse("buyrate:ad-detail", kwargs={"pk": ad_one.pk}))
+
+
+@pytest.mark.django_db
+def test_query_budget_detects_n_plus_one(ad_one: Ad, ad_two: Ad, user: User) -> None:
+    """Тестирование обнаружения повторяющихся запросов (N+1)"""
+    Ad.objects.create(title="Третье", price=1, description="Описание", author=user)
+
+    def get_response(request):
+        return HttpResponse(", ".join(ad.author.email for ad in Ad.objects.all()))
+
+    with pytest.raises(QueryBudgetExceeded, match=r"повторен 3 раз \(N\+1\)"):
+        QueryBudgetMiddleware(get_response)(RequestFactory().get("/"))
+
+    assert QueryRecorder.normalize("SELECT 1 WHERE id IN (%s, %s, %s)") == "SELECT 1 WHERE id IN (...)"
+
+
+def test_query_budget_declared() -> None:
+    """Тестирование объявления бюджета SQL-запросов для всех представлений buyrate"""
+    for pattern in buyrate_urls.urlpatterns:
+        view_class = pattern.callback.view_class
+        view_class = getattr(view_class, "sync_view_class", None) or view_class
+        assert "query_budget" in vars(view_class), view_class.__name__
+
+
+def record_queries(*aliases) -> tuple:
+    """Возвращает ExitStack и счетчики запросов (QueryRecorder) соединений aliases"""
+    stack = ExitStack()
+    recorders = [QueryRecorder() for _ in aliases]
+    for alias, recorder in zip(aliases, recorders):
+        stack.enter_context(connections[alias].execute_wrapper(recorder))
+    return stack, recorders
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", "replica1"])
+def test_replica_routing(user_api_client: APIClient, user_two: User, ad_one: Ad, replica: str) -> None:
+    """Тестирование чтения с реплики, закрепления за основной БД после записи и отказа от отстающей реплики"""
+    other_client = APIClient()
+    other_client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user_two)}")
+    url = reverse("buyrate:ads")
+
+    stack, (primary, replica_queries) = record_queries("default", replica)
+    with stack:
+        assert user_api_client.get(url).data["count"] == 1
+    assert primary.count == 0
+    assert replica_queries.count > 0
+
+    data = {"title": "Велосипед", "price": 10000, "description": "Продаю велосипед."}
+    stack, (primary, replica_queries) = record_queries("default", replica)
+    with stack:
+        assert user_api_client.post(reverse("buyrate:ad-create"), data=data).status_code == status.HTTP_201_CREATED
+        assert user_api_client.get(url).data["count"] == 2
+    assert primary.count > 0
+    assert replica_queries.count == 0
+
+    stack, (primary, replica_queries) = record_queries("default", replica)
+    with stack:
+        assert other_client.get(url).data["count"] == 2
+    assert primary.count == 0
+
+    ReplicaLag.clear()
+    with patch.object(ReplicaLag, "measure", return_value=(30.0, 0)):
+        stack, (primary, replica_queries) = record_queries("default", replica)
+        with stack:
+            assert other_client.get(url).status_code == status.HTTP_200_OK
+    assert replica_queries.count == 0
+    assert primary.count > 0
+
+
+@pytest.mark.django_db(databases=["default", "replica1"])
+def test_replica_lag_and_router(replica: str) -> None:
+    """Тестирование измерения отставания реплики и выбора БД роутером вне запроса"""
+    lag, lsn = ReplicaLag.measure(replica)
+    assert lag == 0.0 and lsn > 0
+    assert ReplicaLag.get(replica) == 0.0
+    router = ReplicaRouter()
+    assert router.db_for_read(Ad) is None
+    assert router.db_for_write(Ad) == "default"
+
+    request = RequestFactory().get(reverse("buyrate:ads"))
+    assert ReplicaMiddleware.choose_replica(request) == replica
+    assert ReplicaMiddleware.choose_replica(RequestFactory().get("/docs/")) is None
+    assert ReplicaMiddleware.choose_replica(RequestFactory().post(reverse("buyrate:ads"))) is None
+
+
+@pytest.mark.django_db(databases=["default", "replica1"])
+def test_replica_write_fence(replica: str, settings, django_capture_on_commit_callbacks) -> None:
+    """Тестирование границы записи: после сброса кэшей чтение идет с основной БД, пока реплика не применит WAL"""
+    settings.EDGE_PURGE_URL = "http://edge-purge.test/"
+    request = RequestFactory().get(reverse("buyrate:ads"))
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        AdsListCache.bump_generation()
+        EdgeCache.purge("ads-list")
+    # Граница записывается один раз на транзакцию и до смены поколения
+    assert [callback for callback in callbacks if callback == WriteFence.record] == [callbacks[0]]
+    fence = WriteFence.get()
+    assert fence > 0
+
+    ReplicaLag.clear()
+    with patch.object(ReplicaLag, "measure", return_value=(0.0, fence - 1)) as measure:
+        assert ReplicaMiddleware.choose_replica(request) is None
+        assert ReplicaMiddleware.choose_replica(request) is None
+    assert measure.call_count == 3  # отставание и LSN, затем повторная проверка LSN отстающей реплики
+
+    with patch.object(ReplicaLag, "measure", return_value=(0.0, fence)) as measure:
+        assert ReplicaMiddleware.choose_replica(request) == replica
+        assert ReplicaMiddleware.choose_replica(request) == replica
+    assert measure.call_count == 1  # реплика прошла границу - сохраненный LSN больше не перепроверяется
+
+    WriteFence.record()
+    assert WriteFence.get() >= fence
+
+
+@pytest.mark.django_db
+def test_pool_prepared_statements(ad_one: Ad) -> None:
+    """Тестирование пула соединений psycopg 3: частый запрос подготавливается сервером (DB_POOL=True)"""
+    settings_dict = {
+        **connections["default"].settings_dict,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {"pool": {"min_size": 1, "max_size": 1}, "server_side_binding": True, "prepare_threshold": 2},
+    }
+    # Отдельное соединение с настройками пула под псевдонимом тестовой БД (соединения с ней разрешены тесту)
+    pooled = connections["default"].__class__(settings_dict, alias="default")
+    sql, params = Ad.objects.filter(pk=ad_one.pk).query.sql_with_params()
+    try:
+        assert pooled.pool is not None
+        with pooled.cursor() as cursor:
+            for _attempt in range(3):
+                cursor.execute(sql, params)
+            cursor.execute("SELECT statement FROM pg_prepared_statements")
+            assert any('"buyrate_ad"' in statement for statement, in cursor.fetchall())
+    finally:
+        pooled.close()
+        pooled.close_pool()
+
+
+@pytest.mark.django_db
+def test_seed_buyrate(settings) -> None:
+    """Тестирование генерации данных через COPY: связи, агрегаты отзывов, поисковые векторы, последовательности"""
+    settings.PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+    call_command("seed_buyrate", users=5, ads=20, reviews=100, chunk_size=7, seed=1)
+
+    assert User.objects.filter(email__startswith="seed").count() == 5
+    assert Ad.objects.count() == 20
+    assert Review.objects.count() == 100
+    assert ReviewStatsService.reconcile(dry_run=True) == 0
+    assert not Ad.objects.filter(search_vector__isnull=True).exists()
+    assert User.objects.filter(email__startswith="seed").first().check_password(BuyRateSeedService.password)
+    # Закон Ципфа: у первого объявления отзывов больше, чем в среднем
+    assert Ad.objects.order_by("id").first().reviews_count > 100 / 20
+    # ID зарезервированы в последовательностях: новые записи не конфликтуют с созданными
+    assert Ad.objects.create(title="Новое", price=1, description="", author=User.objects.first()).pk > max(
+        Ad.objects.exclude(title="Новое").values_list("id", flat=True)
+    )
+
+    with pytest.raises(CommandError):
+        call_command("seed_buyrate", users=0, ads=0, reviews=10)
+
+
+@pytest.mark.django_db
+def test_ads_filter_index_scans(settings) -> None:
+    """
+    Тестирование планов запросов списка объявлений: каждое сочетание фильтра и сортировки читает индекс.
+    Проверяются запросы, которые выполняет само представление: страница и COUNT пагинатора.
+    """
+    settings.PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+    call_command("seed_buyrate", users=50, ads=20000, reviews=0, seed=3)
+    # Автор и название самого нового объявления: каждое сочетание находит объявления и запрашивает страницу
+    author_id, title = Ad.objects.values_list("author_id", "title").order_by("-created_at").first()
+    since = (timezone.now() - timedelta(days=2)).isoformat()
+    filters = {
+        "": {},
+        "price": {"price_min": 1000, "price_max": 1200},
+        "author": {"author": author_id},
+        "title": {"title": title},
+        "created_at": {"created_at_after": since},
+        "author+price": {"author": author_id, "price_min": 1000},
+        "author+created_at": {"author": author_id, "created_at_after": since},
+        "title+price": {"title": title, "price_min": 1000},
+        "title+created_at": {"title": title, "created_at_after": since},
+    }
+    url = reverse("buyrate:ads")
+    for name, params in filters.items():
+        for ordering in ("-created_at", "created_at", "price", "-price"):
+            with CaptureQueriesContext(connection) as queries:
+                response = APIClient().get(url, {**params, "ordering": ordering, "nocache": 1})
+            assert response.status_code == status.HTTP_200_OK
+            ad_queries = [query["sql"] for query in queries if '"buyrate_ad"' in query["sql"]]
+            assert len(ad_queries) == 2 and "COUNT(*)" in ad_queries[0], ad_queries
+            # Страница пагинатора: LIMIT не больше размера страницы (меньше, если объявлений меньше страницы)
+            assert 0 < int(ad_queries[1].rsplit("LIMIT", 1)[1]) <= BuyRatePaginator.page_size, ad_queries[1]
+            for sql in ad_queries:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"EXPLAIN {sql}")
+                    plan = "\n".join(row[0] for row in cursor.fetchall())
+                # COUNT без фильтров считает всю таблицу и может читать ее целиком
+                if not params and sql is ad_queries[0]:
+                    continue
+                assert "Seq Scan" not in plan and "Index" in plan, f"{name} {ordering}: {sql}\n{plan}"
+                # Равенство названия - по B-дереву, а не по триграммному индексу поиска
+                if "title" in params:
+                    assert "buyrate_ad_title_created_idx" in plan, f"{name} {ordering}: {sql}\n{plan}"
+
+
+@pytest.mark.django_db
+def test_bench_urls(settings, tmp_path) -> None:
+    """Тестирование замера всех URL buyrate и users: статистика по каждому URL, откат записи, сравнение с базой"""
+    settings.PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+    settings.QUERY_BUDGET_RAISE = False  # откат записи добавляет SAVEPOINT/RELEASE к транзакциям представлений
+    call_command("seed_buyrate", users=3, ads=5, reviews=20, seed=2)
+    counts = (Ad.objects.count(), Review.objects.count())
+    output = tmp_path / "bench.json"
+    call_command("bench_urls", iterations=2, warmup=0, output=str(output), stdout=io.StringIO())
+
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert report["skipped"] == []
+    assert list(report["urls"]) == BenchUrlsCommand.get_url_names()
+    for result in report["urls"].values():
+        assert result["status"] < 500
+        assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+        assert result["queries"] <= result["queries_max"]
+    assert report["urls"]["buyrate:ad-delete"]["status"] == status.HTTP_204_NO_CONTENT
+    assert (Ad.objects.count(), Review.objects.count()) == counts
+
+    baseline = json.loads(output.read_text(encoding="utf-8"))
+    baseline["urls"]["buyrate:ads"]["queries_max"] -= 1
+    baseline["urls"]["buyrate:ads"]["p95_ms"] = report["urls"]["buyrate:ads"]["p95_ms"] / 2
+    assert BenchUrlsCommand.compare(report, baseline, 1.2) == [
+        f"buyrate:ads: p95 {report['urls']['buyrate:ads']['p95_ms']:.2f} мс "
+        f"(было {baseline['urls']['buyrate:ads']['p95_ms']:.2f} мс)",
+        f"buyrate:ads: запросов {report['urls']['buyrate:ads']['queries_max']} "
+        f"(было {baseline['urls']['buyrate:ads']['queries_max']})",
+    ]
+    baseline_path = tmp_path / "baseline.json"
+    baseline_path.write_text(json.dumps(baseline), encoding="utf-8")
+    with pytest.raises(CommandError):
+        call_command(
+            "bench_urls",
+            iterations=2,
+            warmup=0,
+            only=["buyrate:ads"],
+            output=str(tmp_path / "current.json"),
+            baseline=str(baseline_path),
+            fail_on_regression=True,
+            stdout=io.StringIO(),
+        )
@@ -1,25 +1,64 @@
+from django.conf import settings
 from django.urls import path
 
 from buyrate.apps import BuyrateConfig
-from buyrate.views import (AdCreateAPIView, AdDestroyAPIView, AdRetrieveAPIView, AdsListAPIView, AdUpdateAPIView,
-                           AllReviewsListAPIView, ReviewCreateAPIView, ReviewDestroyAPIView, ReviewRetrieveAPIView,
-                           ReviewsListAPIView, ReviewUpdateAPIView)
+from buyrate.async_views import AsyncAdRetrieveView, AsyncAdsListView, AsyncAllReviewsListView, AsyncReviewsListView
+from buyrate.views import (
+    AdBatchCreateAPIView,
+    AdBatchDestroyAPIView,
+    AdBatchUpdateAPIView,
+    AdCreateAPIView,
+    AdDestroyAPIView,
+    AdFacetsAPIView,
+    AdRepriceAPIView,
+    AdRetrieveAPIView,
+    AdsListAPIView,
+    AdUpdateAPIView,
+    AllReviewsListAPIView,
+    AuthorStatsListAPIView,
+    AuthorStatsRetrieveAPIView,
+    BuyRateExportAPIView,
+    ReviewCreateAPIView,
+    ReviewDestroyAPIView,
+    ReviewImportAPIView,
+    ReviewRetrieveAPIView,
+    ReviewsListAPIView,
+    ReviewUpdateAPIView,
+)
 
 app_name = BuyrateConfig.name
 
+
+def read_view(sync_view, async_view):
+    """Возвращает асинхронное представление чтения, если включен ASYNC_READ_VIEWS, иначе синхронное"""
+    return (async_view if settings.ASYNC_READ_VIEWS else sync_view).as_view()
+
+
 urlpatterns = [
     # CRUD Ad
-    path("ads/", AdsListAPIView.as_view(), name="ads"),
+    path("ads/", read_view(AdsListAPIView, AsyncAdsListView), name="ads"),
+    path("ads/facets/", AdFacetsAPIView.as_view(), name="ad-facets"),
     path("ads/create/", AdCreateAPIView.as_view(), name="ad-create"),
-    path("ads/<int:pk>/", AdRetrieveAPIView.as_view(), name="ad-detail"),
+    path("ads/<int:pk>/", read_view(AdRetrieveAPIView, AsyncAdRetrieveView), name="ad-detail"),
     path("ads/<int:pk>/update/", AdUpdateAPIView.as_view(), name="ad-update"),
     path("ads/<int:pk>/delete/", AdDestroyAPIView.as_view(), name="ad-delete"),
+    # Batch Ad
+    path("ads/batch/create/", AdBatchCreateAPIView.as_view(), name="ad-batch-create"),
+    path("ads/batch/update/", AdBatchUpdateAPIView.as_view(), name="ad-batch-update"),
+    path("ads/batch/delete/", AdBatchDestroyAPIView.as_view(), name="ad-batch-delete"),
+    path("ads/batch/reprice/", AdRepriceAPIView.as_view(), name="ad-batch-reprice"),
     # CRUD Review
-    path("ads/<int:ad_id>/reviews/", ReviewsListAPIView.as_view(), name="ad-reviews"),
+    path("ads/<int:ad_id>/reviews/", read_view(ReviewsListAPIView, AsyncReviewsListView), name="ad-reviews"),
     path("ads/<int:ad_id>/reviews/create/", ReviewCreateAPIView.as_view(), name="ad-review-create"),
     path("ads/<int:ad_id>/reviews/<int:pk>/", ReviewRetrieveAPIView.as_view(), name="ad-review-detail"),
     path("ads/<int:ad_id>/reviews/<int:pk>/update/", ReviewUpdateAPIView.as_view(), name="ad-review-update"),
     path("ads/<int:ad_id>/reviews/<int:pk>/delete/", ReviewDestroyAPIView.as_view(), name="ad-review-delete"),
     # All Review
-    path("reviews/", AllReviewsListAPIView.as_view(), name="all-reviews"),
+    path("reviews/", read_view(AllReviewsListAPIView, AsyncAllReviewsListView), name="all-reviews"),
+    path("reviews/import/", ReviewImportAPIView.as_view(), name="reviews-import"),
+    # Author stats
+    path("stats/authors/", AuthorStatsListAPIView.as_view(), name="author-stats"),
+    path("stats/authors/<int:pk>/", AuthorStatsRetrieveAPIView.as_view(), name="author-stats-detail"),
+    # Export
+    path("export/<str:table>/", BuyRateExportAPIView.as_view(), name="export"),
 ]
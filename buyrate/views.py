@@ -1,43 +1,183 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
+from django.http import Http404, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework.exceptions import NotFound
-from rest_framework.filters import SearchFilter
-from rest_framework.generics import CreateAPIView, DestroyAPIView, ListAPIView, RetrieveAPIView, UpdateAPIView
+from rest_framework import status
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.generics import (
+    CreateAPIView,
+    DestroyAPIView,
+    GenericAPIView,
+    ListAPIView,
+    RetrieveAPIView,
+    UpdateAPIView,
+)
 from rest_framework.permissions import AllowAny, IsAuthenticated
-
-from buyrate.models import Ad, Review
-from buyrate.paginators import BuyRatePaginator
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from buyrate.cache import AdFacetsCache, AdsListCache, EdgeCache
+from buyrate.filters import AdFilter, AdSearchFilter, AuthorStatsFilter
+from buyrate.mixins import ConditionalGetMixin, EdgeCacheMixin, FastReadListMixin
+from buyrate.models import Ad, AuthorStats, Review
+from buyrate.paginators import AuthorStatsPaginator, BuyRatePaginator
 from buyrate.permissions import IsAdmin, IsAuthor
-from buyrate.serializers import AdCreateSerializers, AdSerializers, ReviewCreateSerializers, ReviewSerializers
-
-
-class AdsListAPIView(ListAPIView):
+from buyrate.serializers import (
+    AdBatchDeleteSerializers,
+    AdBatchUpdateSerializers,
+    AdCreateSerializers,
+    AdRepriceSerializers,
+    AdSerializers,
+    AdWithReviewsSerializers,
+    AuthorStatsSerializers,
+    BuyRateExportSerializers,
+    ReviewCreateSerializers,
+    ReviewSerializers,
+)
+from buyrate.services import (
+    AdBatchService,
+    AdFacetService,
+    BuyRateExportService,
+    ReviewImportService,
+    ReviewStatsService,
+)
+
+
+class AdsListAPIView(EdgeCacheMixin, FastReadListMixin, ListAPIView):
     """
     Представление для получения списка всех объявлений (GET)
+    Ответы анонимным пользователям кэшируются (AdsListCache), отключить кэш: ?nocache=1
+    Суррогатные ключи пограничного кэша: ads, ads-list
+    ?embed_reviews=N добавляет к каждому объявлению N последних отзывов (не более max_embed_reviews)
+    Фильтры и сортировка (AdFilter): price_min, price_max, author, created_at_after, created_at_before, ordering
+    Методы:
+        list(self, request, *args, **kwargs) -> Response:
+            Возвращает список объявлений из кэша или формирует и кэширует его.
+        get_embed_reviews(self) -> int:
+            Возвращает к-во встраиваемых отзывов из параметра запроса.
+        get_queryset(self):
+            Добавляет предзагрузку последних отзывов одним оконным запросом.
+        get_serializer_class(self):
+            Возвращает сериализатор с отзывами, если они запрошены.
     """
 
-    queryset = Ad.objects.order_by("-created_at")
+    query_budget = 4  # пользователь, COUNT, страница, последние отзывы (?embed_reviews)
+    queryset = Ad.objects.order_by("-created_at", "-id")
     pagination_class = BuyRatePaginator
     permission_classes = (AllowAny,)
     serializer_class = AdSerializers
-    filter_backends = [SearchFilter, DjangoFilterBackend]
-    filterset_fields = ["title"]
-    search_fields = ["title"]
+    filter_backends = [AdSearchFilter, DjangoFilterBackend]
+    filterset_class = AdFilter
+    surrogate_keys = ("ads", "ads-list")
+    embed_reviews_query_param = "embed_reviews"
+    max_embed_reviews = 10
 
     @swagger_auto_schema(security=[])
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
+    def list(self, request, *args, **kwargs) -> Response:
+        """Возвращает список объявлений из кэша или формирует и кэширует его."""
+        if not AdsListCache.is_cacheable(request):
+            return super().list(request, *args, **kwargs)
+        data = AdsListCache.get(request)
+        if data is not None:
+            return Response(data, headers={"X-Cache": "HIT"})
+        response = super().list(request, *args, **kwargs)
+        AdsListCache.set(request, response.data)
+        response["X-Cache"] = "MISS"
+        return response
+
+    def get_embed_reviews(self) -> int:
+        """Возвращает к-во встраиваемых отзывов из параметра запроса."""
+        value = self.request.query_params.get(self.embed_reviews_query_param)
+        if not value:
+            return 0
+        try:
+            count = int(value)
+        except ValueError:
+            count = -1
+        if not 0 <= count <= self.max_embed_reviews:
+            raise ValidationError(
+                {self.embed_reviews_query_param: f"Ожидается целое число от 0 до {self.max_embed_reviews}."}
+            )
+        return count
+
+    def get_queryset(self):
+        """Добавляет предзагрузку последних отзывов одним оконным запросом."""
+        queryset = super().get_queryset()
+        if getattr(self, "swagger_fake_view", False):
+            return queryset
+        count = self.get_embed_reviews()
+        if not count:
+            return queryset
+        latest_reviews = (
+            Review.objects.annotate(
+                row_number=Window(
+                    RowNumber(), partition_by=F("ad_id"), order_by=[F("created_at").desc(), F("id").desc()]
+                )
+            )
+            .filter(row_number__lte=count)
+            .order_by("-created_at", "-id")
+        )
+        return queryset.prefetch_related(Prefetch("reviews", queryset=latest_reviews, to_attr="latest_reviews"))
+
+    def get_serializer_class(self):
+        """Возвращает сериализатор с отзывами, если они запрошены."""
+        if getattr(self, "swagger_fake_view", False) or not self.get_embed_reviews():
+            return AdSerializers
+        return AdWithReviewsSerializers
+
+
+class AdFacetsAPIView(EdgeCacheMixin, GenericAPIView):
+    """
+    Представление счетчиков фасетов результатов поиска объявлений (GET)
+    Принимает те же параметры поиска и фильтров, что и список объявлений (search, AdFilter), и считает
+    ценовые диапазоны и периоды создания одним агрегатным запросом (AdFacetService).
+    Ответы кэшируются по нормализованным параметрам (AdFacetsCache), отключить кэш: ?nocache=1
+    Суррогатные ключи пограничного кэша: ads, ads-list
+    Методы:
+        get(self, request, *args, **kwargs) -> Response:
+            Возвращает счетчики фасетов из кэша или считает и кэширует их.
+        get_facets(self) -> dict:
+            Считает счетчики фасетов по отфильтрованным объявлениям.
+    """
+
+    query_budget = 2  # пользователь, агрегат
+    queryset = Ad.objects.all()
+    permission_classes = (AllowAny,)
+    filter_backends = [AdSearchFilter, DjangoFilterBackend]
+    filterset_class = AdFilter
+    pagination_class = None
+    surrogate_keys = ("ads", "ads-list")
+
+    @swagger_auto_schema(security=[], responses={200: openapi.Response("Счетчики фасетов")})
+    def get(self, request, *args, **kwargs) -> Response:
+        """Возвращает счетчики фасетов из кэша или считает и кэширует их."""
+        if not AdFacetsCache.is_cacheable(request):
+            return Response(self.get_facets())
+        data, hit = AdFacetsCache.get_or_set(request, self.get_facets)
+        return Response(data, headers={"X-Cache": "HIT" if hit else "MISS"})
+
+    def get_facets(self) -> dict:
+        """Считает счетчики фасетов по отфильтрованным объявлениям."""
+        return AdFacetService.count(self.filter_queryset(self.get_queryset()))
+
 
 class AdCreateAPIView(CreateAPIView):
     """
     Представление для создания объявления (POST)
     Методы:
         perform_create(self, serializer) -> None:
-            Сохраняет объявление с текущим пользователем как автором.
+            Сохраняет объявление с текущим пользователем как автором и сбрасывает кэши списка.
     """
 
+    query_budget = 3  # пользователь, INSERT, очистка пограничного кэша
     serializer_class = AdCreateSerializers
 
     @swagger_auto_schema(operation_id="ad_create")
@@ -45,24 +185,61 @@ class AdCreateAPIView(CreateAPIView):
         return super().post(request, *args, **kwargs)
 
     def perform_create(self, serializer) -> None:
-        """Сохраняет объявление с текущим пользователем как автором."""
+        """Сохраняет объявление с текущим пользователем как автором и сбрасывает кэши списка."""
         serializer.save(author=self.request.user)
+        AdsListCache.bump_generation()
+        AdFacetsCache.bump_generation()
+        EdgeCache.purge("ads-list")
 
 
-class AdRetrieveAPIView(RetrieveAPIView):
-    """Представление для получения объявления по идентификатору (GET)"""
+class AdRetrieveAPIView(EdgeCacheMixin, ConditionalGetMixin, RetrieveAPIView):
+    """
+    Представление для получения объявления по идентификатору (GET)
+    Поддерживает условный GET: ETag по времени изменения и агрегатам отзывов, Last-Modified по времени изменения
+    (ReviewStatsService сдвигает его при изменении отзывов)
+    Суррогатные ключи пограничного кэша: ads, ad-<id>
+    Методы:
+        get_object(self) -> Ad:
+            Возвращает объявление, загружая его один раз за запрос.
+        get_validators(self) -> tuple:
+            Возвращает валидаторы объявления.
+        get_surrogate_keys(self) -> list:
+            Возвращает суррогатные ключи объявления.
+    """
 
+    query_budget = 2
     queryset = Ad.objects.all()
     serializer_class = AdSerializers
 
     @swagger_auto_schema(operation_id="ad_read")
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        return self.conditional_get(super().get, request, *args, **kwargs)
+
+    def get_object(self) -> Ad:
+        """Возвращает объявление, загружая его один раз за запрос."""
+        if not hasattr(self, "_object"):
+            self._object = super().get_object()
+        return self._object
+
+    def get_validators(self) -> tuple:
+        """Возвращает валидаторы объявления."""
+        ad = self.get_object()
+        return (ad.pk, ad.updated_at.isoformat(), ad.reviews_count, ad.last_review_at), ad.updated_at
+
+    def get_surrogate_keys(self) -> list:
+        """Возвращает суррогатные ключи объявления."""
+        return ["ads", *EdgeCache.ad_keys([self.kwargs["pk"]])]
 
 
 class AdUpdateAPIView(UpdateAPIView):
-    """Представление для обновления объявления по идентификатору (PUT/PATH)"""
+    """
+    Представление для обновления объявления по идентификатору (PUT/PATH)
+    Методы:
+        perform_update(self, serializer) -> None:
+            Сохраняет объявление и сбрасывает кэши списка и объявления.
+    """
 
+    query_budget = 4  # пользователь, объявление, UPDATE, очистка пограничного кэша
     queryset = Ad.objects.all()
     serializer_class = AdCreateSerializers
     permission_classes = (
@@ -78,10 +255,23 @@ class AdUpdateAPIView(UpdateAPIView):
     def patch(self, request, *args, **kwargs):
         return super().patch(request, *args, **kwargs)
 
+    def perform_update(self, serializer) -> None:
+        """Сохраняет объявление и сбрасывает кэши списка и объявления."""
+        serializer.save()
+        AdsListCache.bump_generation()
+        AdFacetsCache.bump_generation()
+        EdgeCache.purge("ads-list", *EdgeCache.ad_keys([serializer.instance.pk]))
+
 
 class AdDestroyAPIView(DestroyAPIView):
-    """Представление для удаления объявления по идентификатору (DELETE)"""
+    """
+    Представление для удаления объявления по идентификатору (DELETE)
+    Методы:
+        perform_destroy(self, instance) -> None:
+            Удаляет объявление и сбрасывает кэши списка, объявления и его отзывов.
+    """
 
+    query_budget = 5  # пользователь, объявление, отзывы (каскад), DELETE, очистка пограничного кэша
     queryset = Ad.objects.all()
     permission_classes = (IsAuthenticated, IsAuthor | IsAdmin)
 
@@ -89,13 +279,170 @@ class AdDestroyAPIView(DestroyAPIView):
     def delete(self, request, *args, **kwargs):
         return super().delete(request, *args, **kwargs)
 
+    def perform_destroy(self, instance) -> None:
+        """Удаляет объявление и сбрасывает кэши списка, объявления и его отзывов."""
+        keys = EdgeCache.ad_keys([instance.pk], reviews=True)
+        instance.delete()
+        AdsListCache.bump_generation()
+        AdFacetsCache.bump_generation()
+        EdgeCache.purge("ads-list", "reviews-list", *keys)
 
-class AllReviewsListAPIView(ListAPIView):
-    """Представление для получения списка всех отзывов(GET)"""
 
-    queryset = Review.objects.all().order_by("-created_at")
+class BaseAdBatchAPIView(APIView):
+    """
+    Базовый класс представления пакетной записи объявлений
+    Методы:
+        check_batch_permissions(self, ids: list) -> None:
+            Проверяет права IsAuthor | IsAdmin на все объявления пакета одним запросом.
+        validate_batch(self, serializer) -> list:
+            Проверяет размер пакета и данные сериализатора.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    max_batch_size = 1000
+
+    def check_batch_permissions(self, ids: list) -> None:
+        """Проверяет права IsAuthor | IsAdmin на все объявления пакета одним запросом."""
+        if len(set(ids)) != len(ids):
+            raise ValidationError({"ids": "ID объявлений в пакете не должны повторяться."})
+        authors = dict(Ad.objects.filter(id__in=ids).values_list("id", "author_id"))
+        missing = sorted(set(ids) - authors.keys())
+        if missing:
+            raise NotFound(f"Объявления не найдены: {missing}")
+        user = self.request.user
+        if user.role != "admin" and any(author_id != user.pk for author_id in authors.values()):
+            raise PermissionDenied("Нет прав на изменение всех объявлений пакета.")
+
+    def validate_batch(self, serializer) -> list:
+        """Проверяет размер пакета и данные сериализатора, возвращает проверенные данные"""
+        if not isinstance(self.request.data, list) or not self.request.data:
+            raise ValidationError("Ожидается непустой список объектов.")
+        if len(self.request.data) > self.max_batch_size:
+            raise ValidationError(f"Размер пакета не должен превышать {self.max_batch_size}.")
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+
+class AdBatchCreateAPIView(BaseAdBatchAPIView):
+    """Представление для пакетного создания объявлений одним INSERT (POST)"""
+
+    query_budget = 5
+
+    @swagger_auto_schema(
+        operation_id="ad_batch_create",
+        request_body=AdCreateSerializers(many=True),
+        responses={201: AdSerializers(many=True)},
+    )
+    def post(self, request: Request) -> Response:
+        """
+        Создает объявления текущего пользователя в одной транзакции
+        :param request: HTTP запрос со списком объявлений
+        :return: Список созданных объявлений
+        """
+        items = self.validate_batch(AdCreateSerializers(data=request.data, many=True))
+        ads = AdBatchService.create(request.user, items)
+        AdsListCache.bump_generation()
+        AdFacetsCache.bump_generation()
+        EdgeCache.purge("ads-list")
+        return Response(AdSerializers(ads, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class AdBatchUpdateAPIView(BaseAdBatchAPIView):
+    """Представление для пакетного частичного обновления объявлений через bulk_update (PATCH)"""
+
+    query_budget = 3 + 3 * 7  # пользователь, права, очистка кэша и SAVEPOINT/UPDATE/RELEASE на набор полей (до 7)
+
+    @swagger_auto_schema(
+        operation_id="ad_batch_update",
+        request_body=AdBatchUpdateSerializers(many=True),
+        responses={200: openapi.Response("К-во обновленных объявлений")},
+    )
+    def patch(self, request: Request) -> Response:
+        """
+        Обновляет объявления в одной транзакции
+        :param request: HTTP запрос со списком объявлений с полем id
+        :return: К-во обновленных объявлений
+        """
+        items = self.validate_batch(AdBatchUpdateSerializers(data=request.data, many=True, partial=True))
+        self.check_batch_permissions([item["id"] for item in items])
+        updated = AdBatchService.update(items)
+        AdsListCache.bump_generation()
+        AdFacetsCache.bump_generation()
+        EdgeCache.purge("ads-list", *EdgeCache.ad_keys([item["id"] for item in items]))
+        return Response({"updated": updated}, status=status.HTTP_200_OK)
+
+
+class AdBatchDestroyAPIView(BaseAdBatchAPIView):
+    """Представление для пакетного удаления объявлений (DELETE)"""
+
+    query_budget = 6
+
+    @swagger_auto_schema(
+        operation_id="ad_batch_delete",
+        request_body=AdBatchDeleteSerializers,
+        responses={200: openapi.Response("К-во удаленных объявлений")},
+    )
+    def delete(self, request: Request) -> Response:
+        """
+        Удаляет объявления одним запросом
+        :param request: HTTP запрос со списком ID объявлений
+        :return: К-во удаленных объявлений
+        """
+        serializer = AdBatchDeleteSerializers(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+        self.check_batch_permissions(ids)
+        deleted = AdBatchService.delete(ids)
+        AdsListCache.bump_generation()
+        AdFacetsCache.bump_generation()
+        EdgeCache.purge("ads-list", "reviews-list", *EdgeCache.ad_keys(ids, reviews=True))
+        return Response({"deleted": deleted}, status=status.HTTP_200_OK)
+
+
+class AdRepriceAPIView(BaseAdBatchAPIView):
+    """Представление для изменения цен объявлений на процент одним UPDATE (POST)"""
+
+    query_budget = 3
+
+    @swagger_auto_schema(
+        operation_id="ad_batch_reprice",
+        request_body=AdRepriceSerializers,
+        responses={200: openapi.Response("К-во обновленных объявлений")},
+    )
+    def post(self, request: Request) -> Response:
+        """
+        Изменяет цены указанных объявлений или всех объявлений пользователя
+        :param request: HTTP запрос с процентом изменения цены и, при необходимости, списком ID
+        :return: К-во обновленных объявлений
+        """
+        serializer = AdRepriceSerializers(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data.get("ids")
+        if ids:
+            self.check_batch_permissions(ids)
+            queryset = Ad.objects.filter(id__in=ids)
+            keys = EdgeCache.ad_keys(ids)
+        else:
+            queryset = Ad.objects.filter(author=request.user)
+            keys = ["ads"]  # id объявлений неизвестны без лишнего запроса
+        updated = AdBatchService.reprice(queryset, serializer.validated_data["percent"])
+        AdsListCache.bump_generation()
+        AdFacetsCache.bump_generation()
+        EdgeCache.purge("ads-list", *keys)
+        return Response({"updated": updated}, status=status.HTTP_200_OK)
+
+
+class AllReviewsListAPIView(EdgeCacheMixin, FastReadListMixin, ListAPIView):
+    """
+    Представление для получения списка всех отзывов(GET)
+    Суррогатные ключи пограничного кэша: reviews, reviews-list
+    """
+
+    query_budget = 3
+    queryset = Review.objects.all().order_by("-created_at", "-id")
     pagination_class = BuyRatePaginator
     serializer_class = ReviewSerializers
+    surrogate_keys = ("reviews", "reviews-list")
 
     @swagger_auto_schema(operation_id="all_review_list")
     def get(self, request, *args, **kwargs):
@@ -103,9 +450,23 @@ class AllReviewsListAPIView(ListAPIView):
 
 
 class BaseReviewByAdAPIView:
-    """Базовый класс представления отзыва от объявления"""
+    """
+    Базовый класс представления отзыва от объявления
+    Для списка существование объявления проверяется до запроса отзывов,
+    для отдельного отзыва - только если отзыв не найден (без лишнего запроса в успешном случае).
+    Методы:
+        ad_exists(self, ad_id) -> bool:
+            Проверяет существование объявления.
+        get_object(self) -> Review:
+            Возвращает отзыв объявления или 404 с причиной.
+        get_surrogate_keys(self) -> list:
+            Возвращает суррогатные ключи отзывов объявления.
+        purge_edge_cache(self) -> None:
+            Очищает пограничный кэш отзывов объявления и списков.
+    """
 
     queryset = Review.objects.all()
+    ad_not_found_message = "Объявление с данным ID не найдено."
 
     def get_queryset(self):
         if getattr(self, "swagger_fake_view", False):
@@ -113,16 +474,53 @@ class BaseReviewByAdAPIView:
 
         ad_id = self.kwargs.get("ad_id")
 
-        if ad_id is None or not Ad.objects.filter(id=ad_id).exists():
-            raise NotFound("Объявление с данным ID не найдено.")
+        if ad_id is None or (self.lookup_field not in self.kwargs and not self.ad_exists(ad_id)):
+            raise NotFound(self.ad_not_found_message)
 
-        queryset = Review.objects.filter(ad_id=ad_id).order_by("-created_at")
+        queryset = Review.objects.filter(ad_id=ad_id).order_by("-created_at", "-id")
         return queryset
 
+    def ad_exists(self, ad_id) -> bool:
+        """Проверяет существование объявления"""
+        return Ad.objects.filter(id=ad_id).exists()
+
+    def get_object(self) -> Review:
+        """Возвращает отзыв объявления или 404 с причиной"""
+        try:
+            return super().get_object()
+        except Http404:
+            if not self.ad_exists(self.kwargs.get("ad_id")):
+                raise NotFound(self.ad_not_found_message)
+            raise
 
-class ReviewsListAPIView(BaseReviewByAdAPIView, ListAPIView):
-    """Представление для получения списка отзывов конкретного объявления (GET)"""
+    def get_surrogate_keys(self) -> list:
+        """Возвращает суррогатные ключи отзывов объявления"""
+        return ["reviews", f"ad-{self.kwargs['ad_id']}-reviews"]
 
+    def purge_edge_cache(self) -> None:
+        """Очищает пограничный кэш отзывов объявления, самого объявления (агрегаты отзывов) и списков"""
+        ad_id = self.kwargs["ad_id"]
+        EdgeCache.purge("ads-list", "reviews-list", *EdgeCache.ad_keys([ad_id], reviews=True))
+
+
+class ReviewsListAPIView(ConditionalGetMixin, FastReadListMixin, BaseReviewByAdAPIView, EdgeCacheMixin, ListAPIView):
+    """
+    Представление для получения списка отзывов конкретного объявления (GET)
+    Поддерживает условный GET: ETag и Last-Modified по к-ву отзывов и времени их последнего изменения
+    (агрегаты объявления reviews_count и reviews_changed_at, поддерживаются ReviewStatsService)
+    Суррогатные ключи пограничного кэша: reviews, ad-<ad_id>-reviews
+    Методы:
+        get_validators(self) -> tuple:
+            Возвращает валидаторы списка отзывов одним агрегирующим запросом.
+        get_validators_queryset(self):
+            Возвращает запрос к-ва отзывов и времени их последнего изменения.
+        make_list_validators(self, row) -> tuple:
+            Возвращает валидаторы по строке агрегирующего запроса.
+        ad_exists(self, ad_id) -> bool:
+            Проверяет существование объявления по результату запроса валидаторов.
+    """
+
+    query_budget = 4  # пользователь, валидаторы, COUNT, страница
     pagination_class = BuyRatePaginator
     serializer_class = ReviewSerializers
 
@@ -139,7 +537,29 @@ class ReviewsListAPIView(BaseReviewByAdAPIView, ListAPIView):
         ],
     )
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        return self.conditional_get(super().get, request, *args, **kwargs)
+
+    def get_validators(self) -> tuple:
+        """Возвращает валидаторы списка отзывов одним агрегирующим запросом."""
+        self.validators_row = self.get_validators_queryset().first()
+        return self.make_list_validators(self.validators_row)
+
+    def ad_exists(self, ad_id) -> bool:
+        """Проверяет существование объявления по результату запроса валидаторов, если он уже выполнен."""
+        if hasattr(self, "validators_row"):
+            return self.validators_row is not None
+        return super().ad_exists(ad_id)
+
+    def get_validators_queryset(self):
+        """Возвращает запрос к-ва отзывов и времени их последнего изменения."""
+        return Ad.objects.filter(pk=self.kwargs.get("ad_id")).values_list("reviews_count", "reviews_changed_at")
+
+    def make_list_validators(self, row) -> tuple:
+        """Возвращает валидаторы по строке (к-во, время последнего изменения) или (None, None)."""
+        if row is None:
+            return None, None
+        total, last = row
+        return (self.kwargs.get("ad_id"), total, last), last
 
 
 class ReviewCreateAPIView(BaseReviewByAdAPIView, CreateAPIView):
@@ -147,9 +567,11 @@ class ReviewCreateAPIView(BaseReviewByAdAPIView, CreateAPIView):
     Представление для создания отзыва (POST)
     Методы:
         perform_create(self, serializer) -> None:
-            Сохраняет отзыв с текущим пользователем как автором и устанавливает ad_id
+            Сохраняет отзыв с текущим пользователем как автором и устанавливает ad_id,
+            обновляет агрегаты отзывов объявления и сбрасывает кэши списков, объявления и его отзывов
     """
 
+    query_budget = 6
     serializer_class = ReviewCreateSerializers
 
     @swagger_auto_schema(
@@ -170,12 +592,20 @@ class ReviewCreateAPIView(BaseReviewByAdAPIView, CreateAPIView):
     def perform_create(self, serializer) -> None:
         """Сохраняет объявление с текущим пользователем как автором и устанавливает ad_id"""
         ad_id = self.kwargs.get("ad_id")
-        serializer.save(author=self.request.user, ad_id=ad_id)
+        with transaction.atomic():
+            review = serializer.save(author=self.request.user, ad_id=ad_id)
+            ReviewStatsService.review_created(review)
+            AdsListCache.bump_generation()
+            self.purge_edge_cache()
 
 
-class ReviewRetrieveAPIView(BaseReviewByAdAPIView, RetrieveAPIView):
-    """Представление для получения отзыва по идентификатору (GET)"""
+class ReviewRetrieveAPIView(BaseReviewByAdAPIView, EdgeCacheMixin, RetrieveAPIView):
+    """
+    Представление для получения отзыва по идентификатору (GET)
+    Суррогатные ключи пограничного кэша: reviews, ad-<ad_id>-reviews
+    """
 
+    query_budget = 2
     serializer_class = ReviewSerializers
 
     @swagger_auto_schema(
@@ -202,8 +632,14 @@ class ReviewRetrieveAPIView(BaseReviewByAdAPIView, RetrieveAPIView):
 
 
 class ReviewUpdateAPIView(BaseReviewByAdAPIView, UpdateAPIView):
-    """Представление для обновления отзыва по идентификатору (PUT/PATH)"""
+    """
+    Представление для обновления отзыва по идентификатору (PUT/PATH)
+    Методы:
+        perform_update(self, serializer) -> None:
+            Сохраняет отзыв, сдвигает время изменения отзывов объявления и сбрасывает кэши списков и отзывов.
+    """
 
+    query_budget = 6  # пользователь, отзыв, SAVEPOINT/RELEASE, UPDATE отзыва и объявления (очистка кэша без SAVEPOINT)
     serializer_class = ReviewCreateSerializers
     permission_classes = (
         IsAuthenticated,
@@ -256,10 +692,24 @@ class ReviewUpdateAPIView(BaseReviewByAdAPIView, UpdateAPIView):
     def patch(self, request, *args, **kwargs):
         return super().patch(request, *args, **kwargs)
 
+    def perform_update(self, serializer) -> None:
+        """Сохраняет отзыв, сдвигает время изменения отзывов объявления и сбрасывает кэши списков и отзывов"""
+        with transaction.atomic():
+            review = serializer.save()
+            ReviewStatsService.review_updated(review.ad_id)
+            AdsListCache.bump_generation()  # список объявлений встраивает последние отзывы (?embed_reviews)
+            self.purge_edge_cache()
+
 
 class ReviewDestroyAPIView(BaseReviewByAdAPIView, DestroyAPIView):
-    """Представление для удаления отзыва по идентификатору (DELETE)"""
+    """
+    Представление для удаления отзыва по идентификатору (DELETE)
+    Методы:
+        perform_destroy(self, instance) -> None:
+            Удаляет отзыв, обновляет агрегаты отзывов объявления и сбрасывает кэши списков, объявления и его отзывов
+    """
 
+    query_budget = 7
     serializer_class = ReviewSerializers
     permission_classes = (
         IsAuthenticated,
@@ -287,3 +737,147 @@ class ReviewDestroyAPIView(BaseReviewByAdAPIView, DestroyAPIView):
     )
     def delete(self, request, *args, **kwargs):
         return super().delete(request, *args, **kwargs)
+
+    def perform_destroy(self, instance) -> None:
+        """Удаляет отзыв, обновляет агрегаты отзывов объявления и сбрасывает кэш списка объявлений"""
+        with transaction.atomic():
+            instance.delete()
+            ReviewStatsService.review_deleted(instance.ad_id)
+            AdsListCache.bump_generation()
+            self.purge_edge_cache()
+
+
+class ReviewImportAPIView(APIView):
+    """
+    Представление для потокового импорта отзывов из NDJSON (POST)
+    Тело запроса читается построчно, отзывы вставляются пачками (?chunk_size=, по умолчанию 1000)
+    Методы:
+        post(self, request: Request) -> Response:
+            Импортирует отзывы и возвращает отчет с ошибками по номерам строк.
+    """
+
+    query_budget = None  # растет с к-вом пачек, ограничивается chunk_size
+    query_repeat_limit = None
+    permission_classes = (IsAuthenticated, IsAdmin)
+    default_chunk_size = 1000
+    max_chunk_size = 10000
+
+    @swagger_auto_schema(
+        operation_id="review_import",
+        manual_parameters=[
+            openapi.Parameter(
+                "chunk_size",
+                openapi.IN_QUERY,
+                description="Размер пачки bulk_create",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+            ),
+        ],
+        responses={200: openapi.Response("Отчет импорта: created, failed, errors")},
+    )
+    def post(self, request: Request) -> Response:
+        """
+        Импортирует отзывы и возвращает отчет с ошибками по номерам строк
+        Тело запроса: по одному JSON-объекту на строку с полями ad, author, text, created_at (необязательно)
+        :param request: HTTP запрос с NDJSON в теле
+        :return: Отчет импорта
+        """
+        try:
+            chunk_size = int(request.query_params.get("chunk_size", self.default_chunk_size))
+        except ValueError:
+            raise ValidationError({"chunk_size": "Ожидается целое число."})
+        if not 1 <= chunk_size <= self.max_chunk_size:
+            raise ValidationError({"chunk_size": f"Ожидается целое число от 1 до {self.max_chunk_size}."})
+        stream = request.stream or []
+        report = ReviewImportService.import_lines(stream, chunk_size=chunk_size)
+        if report["created"]:
+            AdsListCache.bump_generation()
+            EdgeCache.purge("ads", "reviews")
+        return Response(report, status=status.HTTP_200_OK)
+
+
+class BuyRateExportAPIView(APIView):
+    """
+    Представление для потоковой выгрузки объявлений или отзывов в NDJSON/CSV (GET)
+    Строки читаются серверным курсором и отдаются через StreamingHttpResponse (под ASGI - асинхронным итератором)
+    Методы:
+        get(self, request: Request, table: str) -> StreamingHttpResponse:
+            Возвращает потоковую выгрузку таблицы.
+    """
+
+    query_budget = 1  # запросы выгрузки выполняются при отдаче потока
+    content_types = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+    @swagger_auto_schema(
+        operation_id="buyrate_export",
+        query_serializer=BuyRateExportSerializers,
+        manual_parameters=[
+            openapi.Parameter(
+                "table",
+                openapi.IN_PATH,
+                description="Таблица выгрузки: ads, reviews",
+                type=openapi.TYPE_STRING,
+                required=True,
+            ),
+        ],
+        responses={200: openapi.Response("Файл выгрузки")},
+    )
+    def get(self, request: Request, table: str) -> StreamingHttpResponse:
+        """
+        Возвращает потоковую выгрузку таблицы
+        :param request: HTTP запрос с параметрами выгрузки
+        :param table: Таблица выгрузки: ads, reviews
+        :return: Потоковый ответ с файлом выгрузки
+        """
+        if table not in BuyRateExportService.tables:
+            raise NotFound("Таблица выгрузки не найдена.")
+        serializer = BuyRateExportSerializers(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        file_format = params["file_format"]
+        compress = params["gzip"]
+
+        # Под ASGI синхронный итератор вычитывается в память целиком до отправки, поэтому нужен асинхронный
+        is_asgi = isinstance(request._request, ASGIRequest)
+        stream = BuyRateExportService.astream if is_asgi else BuyRateExportService.stream
+        response = StreamingHttpResponse(
+            stream(
+                table,
+                file_format,
+                created_from=params.get("created_from"),
+                created_to=params.get("created_to"),
+                compress=compress,
+            ),
+            content_type="application/gzip" if compress else self.content_types[file_format],
+        )
+        filename = f"{table}.{file_format}{'.gz' if compress else ''}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class AuthorStatsListAPIView(ListAPIView):
+    """
+    Представление для получения статистики всех продавцов (GET, администратор)
+    Статистика читается из материализованного представления и обновляется задачей refresh_author_stats
+    Фильтры и сортировка (AuthorStatsFilter): ads_count_min, ordering
+    """
+
+    query_budget = 3  # пользователь, COUNT, страница
+    queryset = AuthorStats.objects.order_by("-ads_count", "-author_id")
+    pagination_class = AuthorStatsPaginator
+    permission_classes = (IsAuthenticated, IsAdmin)
+    serializer_class = AuthorStatsSerializers
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = AuthorStatsFilter
+
+
+class AuthorStatsRetrieveAPIView(RetrieveAPIView):
+    """
+    Представление для получения статистики продавца по его ID (GET, сам продавец или администратор)
+    Продавец без объявлений и отзывов (или появившийся после последнего обновления статистики) - 404
+    """
+
+    query_budget = 2
+    queryset = AuthorStats.objects.all()
+    permission_classes = (IsAuthenticated, IsAuthor | IsAdmin)
+    serializer_class = AuthorStatsSerializers
@@ -0,0 +1,27 @@
+"""
+Конфигурация gunicorn (gunicorn -c config/gunicorn.conf.py config.wsgi:application).
+Класс воркеров выбирается GUNICORN_WORKER_CLASS:
+    sync - процесс на запрос (по умолчанию);
+    gthread - потоки в процессе (GUNICORN_THREADS);
+    eventlet - кооперативные зеленые потоки (GUNICORN_WORKER_CONNECTIONS на процесс).
+Вместе с eventlet включается пул соединений БД (DB_POOL=True): зеленых потоков больше, чем соединений,
+и запросы ждут свободное соединение пула, а не открывают свое.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 1))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 100))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 2))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))  # Перезапуск воркера после N запросов, 0 - отключен
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 0))
+accesslog = os.getenv("GUNICORN_ACCESSLOG") or None
+
+if worker_class == "eventlet":
+    # psycopg 3 сам распознает только gevent; ожидание через select() eventlet делает кооперативным
+    os.environ.setdefault("PSYCOPG_WAIT_FUNC", "wait_select")
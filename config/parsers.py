@@ -0,0 +1,24 @@
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSON-парсер на orjson.
+    Тело запроса в кодировке, отличной от UTF-8, разбирается JSONParser.
+    Методы:
+        parse(self, stream, media_type=None, parser_context=None):
+            Возвращает разобранные данные запроса.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Возвращает разобранные данные запроса"""
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", "utf-8")
+        if encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
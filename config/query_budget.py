@@ -0,0 +1,127 @@
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Исключение превышения бюджета SQL-запросов представления или повторяющихся запросов (N+1)"""
+
+
+class QueryRecorder:
+    """
+    Обертка выполнения запросов (connection.execute_wrapper), которая считает запросы по шаблонам.
+    Шаблон - SQL с плейсхолдерами, в котором списки IN (...) и VALUES (...) схлопнуты,
+    поэтому одинаковые запросы с разными параметрами попадают в один шаблон.
+    Методы:
+        normalize(sql) -> str:
+            Возвращает шаблон запроса.
+        repeated(self, limit) -> dict:
+            Возвращает шаблоны, выполненные больше limit раз.
+    """
+
+    in_list = re.compile(r"IN \((?:%s, )*%s\)")
+    values_list = re.compile(r"VALUES \((?:%s, )*%s\)(?:, \((?:%s, )*%s\))*")
+
+    def __init__(self):
+        self.templates = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.templates[self.normalize(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self) -> int:
+        return sum(self.templates.values())
+
+    @classmethod
+    def normalize(cls, sql: str) -> str:
+        """Возвращает шаблон запроса"""
+        sql = cls.in_list.sub("IN (...)", sql)
+        return cls.values_list.sub("VALUES (...)", sql)
+
+    def repeated(self, limit: int | None) -> dict:
+        """Возвращает шаблоны, выполненные больше limit раз"""
+        if limit is None:
+            return {}
+        return {template: count for template, count in self.templates.items() if count > limit}
+
+
+class QueryBudgetMiddleware:
+    """
+    Middleware бюджетов SQL-запросов.
+    Считает запросы за время обработки запроса и сравнивает их к-во с бюджетом представления
+    (атрибут query_budget), а также ищет шаблоны, повторенные больше query_repeat_limit раз (N+1).
+    Нарушения пишутся в лог, а при QUERY_BUDGET_RAISE = True вызывают QueryBudgetExceeded (для тестов).
+    Включается настройкой QUERY_BUDGET_ENABLED, иначе исключается из цепочки middleware.
+    Атрибуты:
+        observers - функции, которым передается отчет по каждому запросу (используются фикстурами pytest)
+    Методы:
+        get_budget(request) -> tuple:
+            Возвращает имя представления, бюджет и предел повторов.
+        check(report) -> None:
+            Проверяет отчет и сообщает о нарушениях.
+    """
+
+    observers = []
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        view, budget, repeat_limit = self.get_budget(request)
+        report = {
+            "view": view,
+            "path": request.path,
+            "queries": recorder.count,
+            "budget": budget,
+            "repeated": recorder.repeated(repeat_limit),
+        }
+        response["X-Query-Count"] = str(recorder.count)
+        for observer in self.observers:
+            observer(report)
+        self.check(report)
+        return response
+
+    @staticmethod
+    def get_budget(request) -> tuple:
+        """Возвращает имя представления, бюджет и предел повторов"""
+        resolver_match = getattr(request, "resolver_match", None)
+        view_class = getattr(getattr(resolver_match, "func", None), "view_class", None)
+        if view_class is None:
+            return None, None, settings.QUERY_BUDGET_REPEAT_LIMIT
+        view_class = getattr(view_class, "sync_view_class", None) or view_class
+        return (
+            view_class.__name__,
+            getattr(view_class, "query_budget", None),
+            getattr(view_class, "query_repeat_limit", settings.QUERY_BUDGET_REPEAT_LIMIT),
+        )
+
+    @staticmethod
+    def check(report: dict) -> None:
+        """Проверяет отчет и сообщает о нарушениях"""
+        errors = []
+        if report["budget"] is not None and report["queries"] > report["budget"]:
+            errors.append(f"{report['queries']} запросов при бюджете {report['budget']}")
+        for template, count in report["repeated"].items():
+            errors.append(f"запрос повторен {count} раз (N+1): {template}")
+        if not errors:
+            return
+        message = f"{report['view']} {report['path']}: " + "; ".join(errors)
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,31 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson.
+    Вывод совпадает с JSONRenderer DRF побайтно: компактные разделители, UTF-8 без экранирования,
+    даты и время форматируются кодировщиком DRF, U+2028/U+2029 экранируются.
+    Для ответов с отступами (Accept: application/json; indent=N) и значений,
+    которые orjson не поддерживает, используется JSONRenderer.
+    Методы:
+        render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+            Возвращает данные в формате JSON.
+    """
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        """Возвращает данные в формате JSON"""
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, default=self.default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
@@ -0,0 +1,245 @@
+import hashlib
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+# Реплика, выбранная ReplicaMiddleware для текущего запроса (None - основная БД)
+replica_alias = ContextVar("replica_alias", default=None)
+
+
+class ReplicaRouter:
+    """
+    Роутер БД: чтение в запросе, для которого ReplicaMiddleware выбрала реплику, идет на нее,
+    остальное чтение (запросы записи, задачи Celery, команды) и вся запись - на основную БД.
+    Методы:
+        db_for_read(self, model, **hints) -> str | None:
+            Возвращает реплику текущего запроса или None (основная БД).
+        db_for_write(self, model, **hints) -> str:
+            Возвращает основную БД.
+        allow_relation(self, obj1, obj2, **hints) -> bool:
+            Разрешает связи между объектами основной БД и реплик.
+    """
+
+    def db_for_read(self, model, **hints) -> str | None:
+        """Возвращает реплику текущего запроса или None (основная БД)"""
+        return replica_alias.get()
+
+    def db_for_write(self, model, **hints) -> str:
+        """Возвращает основную БД"""
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        """Разрешает связи между объектами основной БД и реплик (данные в них одинаковые)"""
+        return True
+
+
+class ReplicaLag:
+    """
+    Отставание реплик от основной БД с проверкой не чаще REPLICA_LAG_CHECK_INTERVAL секунд на процесс.
+    Отставание 0, если реплика применила весь полученный WAL и приемник WAL (pg_stat_wal_receiver) подключен
+    к основной БД, или если БД не является репликой; иначе - время с последней примененной транзакции
+    (бесконечность, если транзакций еще не было). Реплика с разорванной репликацией поэтому быстро перестает
+    считаться свежей. Недоступная реплика считается бесконечно отстающей.
+    Вместе с отставанием запоминается примененный реплики LSN для сравнения с границей записи (WriteFence).
+    Методы:
+        get(alias) -> float:
+            Возвращает отставание реплики, секунды.
+        caught_up(alias, lsn: int) -> bool:
+            Проверяет, применила ли реплика WAL до указанного LSN.
+        measure(alias) -> tuple:
+            Измеряет отставание и примененный LSN реплики запросом к ней.
+        clear() -> None:
+            Очищает сохраненные значения.
+    """
+
+    sql = (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+        "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+        "AND EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status IS NULL OR status = 'streaming') THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8, 'Infinity') END, "
+        "CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() ELSE pg_current_wal_lsn() END - '0/0'"
+    )
+    _values = {}
+
+    @classmethod
+    def get(cls, alias: str) -> float:
+        """Возвращает отставание реплики, секунды (из значения процесса, если оно не устарело)"""
+        checked_at, lag, _ = cls._values.get(alias, (None, None, None))
+        if checked_at is None or time.monotonic() - checked_at > settings.REPLICA_LAG_CHECK_INTERVAL:
+            lag, _ = cls._update(alias)
+        return lag
+
+    @classmethod
+    def caught_up(cls, alias: str, lsn: int) -> bool:
+        """Проверяет, применила ли реплика WAL до LSN (сохраненное значение отстает - измеряет заново)"""
+        _, _, replay_lsn = cls._values.get(alias, (None, None, None))
+        if replay_lsn is None or replay_lsn < lsn:
+            _, replay_lsn = cls._update(alias)
+        return replay_lsn >= lsn
+
+    @classmethod
+    def measure(cls, alias: str) -> tuple:
+        """Измеряет отставание (секунды) и примененный LSN реплики запросом к ней"""
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(cls.sql)
+                lag, lsn = cursor.fetchone()
+                return float(lag), int(lsn)
+        except DatabaseError:
+            logger.warning("Реплика %s недоступна", alias, exc_info=True)
+            return float("inf"), 0
+
+    @classmethod
+    def clear(cls) -> None:
+        """Очищает сохраненные значения"""
+        cls._values.clear()
+
+    @classmethod
+    def _update(cls, alias: str) -> tuple:
+        lag, lsn = cls.measure(alias)
+        cls._values[alias] = (time.monotonic(), lag, lsn)
+        return lag, lsn
+
+
+class WriteFence:
+    """
+    Граница записи для реплик: LSN основной БД после последней записи, которая сбрасывает общие кэши
+    (поколение AdsListCache, очистка EdgeCache, UserAuthCache). Пока реплика не применила WAL до границы,
+    чтение идет с основной БД: иначе запрос другого клиента сразу после сброса заполнил бы кэш
+    устаревшими строками реплики на весь TTL кэша. Без реплик (DATABASE_REPLICAS) граница не записывается.
+    Методы:
+        record_on_commit() -> None:
+            Записывает границу после фиксации текущей транзакции (один раз на транзакцию).
+        record() -> None:
+            Записывает текущий LSN основной БД в общий кэш.
+        get() -> int | None:
+            Возвращает границу записи.
+    """
+
+    key = "db:write-lsn"
+    sql = "SELECT pg_current_wal_lsn() - '0/0'"
+
+    @classmethod
+    def record_on_commit(cls) -> None:
+        """Записывает границу после фиксации текущей транзакции (один раз на транзакцию)"""
+        if not settings.DATABASE_REPLICAS:
+            return
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.in_atomic_block and any(func == cls.record for _, func, _ in connection.run_on_commit):
+            return
+        transaction.on_commit(cls.record)
+
+    @classmethod
+    def record(cls) -> None:
+        """Записывает текущий LSN основной БД в общий кэш, если он больше сохраненного"""
+        try:
+            with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                cursor.execute(cls.sql)
+                lsn = int(cursor.fetchone()[0])
+        except DatabaseError:
+            logger.warning("Не удалось записать границу записи для реплик", exc_info=True)
+            return
+        if lsn > (cache.get(cls.key) or 0):
+            cache.set(cls.key, lsn, timeout=None)
+
+    @classmethod
+    def get(cls) -> int | None:
+        """Возвращает границу записи (LSN) или None"""
+        return cache.get(cls.key)
+
+
+class ReplicaMiddleware:
+    """
+    Middleware выбора реплики БД для чтения (ReplicaRouter).
+    GET/HEAD-запросы к представлениям пространств имен REPLICA_READ_NAMESPACES читают со случайной реплики
+    из DATABASE_REPLICAS, отставание которой не больше REPLICA_MAX_LAG секунд и которая применила WAL
+    до границы записи (WriteFence), иначе - с основной БД.
+    После успешного запроса записи клиент (заголовок Authorization) закрепляется за основной БД
+    на REPLICA_PIN_SECONDS секунд, чтобы видеть свои изменения (read-your-writes).
+    Стоит перед QueryBudgetMiddleware, поэтому проверка отставания не входит в бюджет запроса.
+    Включается непустым DATABASE_REPLICAS, иначе исключается из цепочки middleware.
+    Методы:
+        choose_replica(request) -> str | None:
+            Возвращает реплику для запроса или None.
+        is_read(request) -> bool:
+            Проверяет, что запрос - чтение представления с репликами.
+        pin(request) -> None:
+            Закрепляет клиента за основной БД.
+        is_pinned(request) -> bool:
+            Проверяет, закреплен ли клиент за основной БД.
+        make_pin_key(request) -> str | None:
+            Возвращает ключ закрепления клиента в кэше.
+    """
+
+    pin_prefix = "db:pin"
+    safe_methods = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = replica_alias.set(self.choose_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_alias.reset(token)
+        if request.method not in self.safe_methods and response.status_code < 400:
+            self.pin(request)
+        return response
+
+    @classmethod
+    def choose_replica(cls, request) -> str | None:
+        """Возвращает случайную реплику с допустимым отставанием, прошедшую границу записи, или None (основная БД)"""
+        if not cls.is_read(request) or cls.is_pinned(request):
+            return None
+        fence = WriteFence.get()
+        replicas = [
+            alias
+            for alias in settings.DATABASE_REPLICAS
+            if ReplicaLag.get(alias) <= settings.REPLICA_MAX_LAG
+            and (fence is None or ReplicaLag.caught_up(alias, fence))
+        ]
+        return random.choice(replicas) if replicas else None
+
+    @staticmethod
+    def is_read(request) -> bool:
+        """Проверяет, что запрос - GET/HEAD к представлению пространства имен из REPLICA_READ_NAMESPACES"""
+        if request.method not in ("GET", "HEAD"):
+            return False
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        return bool(match.namespaces) and match.namespaces[0] in settings.REPLICA_READ_NAMESPACES
+
+    @classmethod
+    def pin(cls, request) -> None:
+        """Закрепляет клиента за основной БД на REPLICA_PIN_SECONDS секунд"""
+        key = cls.make_pin_key(request)
+        if key is not None:
+            cache.set(key, 1, settings.REPLICA_PIN_SECONDS)
+
+    @classmethod
+    def is_pinned(cls, request) -> bool:
+        """Проверяет, закреплен ли клиент за основной БД"""
+        key = cls.make_pin_key(request)
+        return key is not None and cache.get(key) is not None
+
+    @classmethod
+    def make_pin_key(cls, request) -> str | None:
+        """Возвращает ключ закрепления по хешу заголовка Authorization или None для анонимного клиента"""
+        authorization = request.META.get("HTTP_AUTHORIZATION")
+        if not authorization:
+            return None
+        return f"{cls.pin_prefix}:{hashlib.sha256(authorization.encode('utf-8')).hexdigest()}"
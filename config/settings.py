@@ -26,6 +26,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework_simplejwt",
     "django_filters",
@@ -36,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "config.replicas.ReplicaMiddleware",
+    "config.query_budget.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -70,7 +73,7 @@ WSGI_APPLICATION = "config.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "django.db.backends.postgresql",
         "NAME": os.getenv("POSTGRES_DB"),
         "USER": os.getenv("POSTGRES_USER"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
@@ -79,6 +82,43 @@ DATABASES = {
     }
 }
 
+# Пул соединений psycopg 3 (продакшен-профиль, DB_POOL=True): соединения берутся из пула процесса,
+# а не открываются на каждый запрос. Серверная привязка параметров позволяет psycopg подготавливать
+# (PREPARE) запросы, выполненные на соединении DB_PREPARE_THRESHOLD раз, - частые запросы списков и деталей
+# buyrate разбираются и планируются сервером один раз на соединение (до 100 подготовленных запросов)
+DB_POOL = True if os.getenv("DB_POOL") == "True" else False
+if DB_POOL:
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True  # Пул проверяет соединение перед выдачей (check_connection)
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),  # Соединений на процесс
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),  # Ожидание свободного соединения, секунды
+            "max_idle": 5 * 60,
+            "max_lifetime": 30 * 60,
+        },
+        "server_side_binding": True,
+        "prepare_threshold": int(os.getenv("DB_PREPARE_THRESHOLD", 2)),
+    }
+
+# Реплики для чтения (config.replicas): POSTGRES_REPLICA_HOSTS="replica1:5432,replica2:5432"
+# В тестах реплика - отдельное соединение с тестовой БД (MIRROR)
+DATABASE_REPLICAS = []
+for number, address in enumerate(filter(None, os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",")), start=1):
+    replica_host, _, replica_port = address.strip().partition(":")
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "HOST": replica_host,
+        "PORT": replica_port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{number}")
+DATABASE_ROUTERS = ["config.replicas.ReplicaRouter"]
+REPLICA_READ_NAMESPACES = ("buyrate", "users")  # Чтение (GET/HEAD) этих приложений идет на реплики
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 5))  # Чтение с основной БД после записи, секунды
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", 1))  # Допустимое отставание реплики, секунды
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", 2))  # Период проверки отставания, секунды
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -122,6 +162,11 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 # Медиатека (Media)
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Аватары (users.services.AvatarService)
+AVATAR_SIZES = (40, 80, 160, 320)  # Размеры вариантов (квадрат), пиксели
+AVATAR_MAX_UPLOAD_SIZE = int(os.getenv("AVATAR_MAX_UPLOAD_SIZE", 10 * 1024 * 1024))  # Размер загрузки, байты
+AVATAR_MAX_PIXELS = int(os.getenv("AVATAR_MAX_PIXELS", 25_000_000))  # Ширина * высота оригинала
+AVATAR_TASK_TIME_LIMIT = int(os.getenv("AVATAR_TASK_TIME_LIMIT", 30))  # Время обработки, секунды
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -132,8 +177,14 @@ AUTH_USER_MODEL = "users.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
-    "DEFAULT_AUTHENTICATION_CLASSES": ["rest_framework_simplejwt.authentication.JWTAuthentication"],
+    "DEFAULT_AUTHENTICATION_CLASSES": ["users.authentication.CachedJWTAuthentication"],
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
+    "DEFAULT_RENDERER_CLASSES": ["config.renderers.ORJSONRenderer", "rest_framework.renderers.BrowsableAPIRenderer"],
+    "DEFAULT_PARSER_CLASSES": [
+        "config.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 # Настройки срока действия токенов
 SIMPLE_JWT = {
@@ -158,15 +209,84 @@ EMAIL_USE_SSL = True if os.getenv("EMAIL_USE_SSL") == "True" else False
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", 10))  # Таймаут SMTP-соединения, секунды
+# Пакетная отправка писем (users.services.EmailBatchSender)
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", 50))  # Писем, отправляемых задачей за один захват соединения
+EMAIL_CONNECTION_MAX_AGE = int(os.getenv("EMAIL_CONNECTION_MAX_AGE", 60))  # Время жизни SMTP-соединения, секунды
 BASE_URL = "http://localhost:8000/"
 
 
+# Кэш (Redis, если задан CACHE_LOCATION, иначе локальная память процесса)
+if os.getenv("CACHE_LOCATION"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_LOCATION"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+ADS_LIST_CACHE_TIMEOUT = int(os.getenv("ADS_LIST_CACHE_TIMEOUT", 5 * 60))
+ADS_FACETS_CACHE_TIMEOUT = int(os.getenv("ADS_FACETS_CACHE_TIMEOUT", 30))  # Время жизни кэша фасетов, секунды
+# Блокировка пересчета фасетов по ключу: остальные запросы ждут результат не дольше этого времени, секунды
+ADS_FACETS_LOCK_TIMEOUT = int(os.getenv("ADS_FACETS_LOCK_TIMEOUT", 5))
+# Пограничный кэш nginx (buyrate.cache.EdgeCache): s-maxage ответов и сервис очистки по суррогатным ключам
+EDGE_CACHE_TIMEOUT = int(os.getenv("EDGE_CACHE_TIMEOUT", 60))  # Время жизни ответа на границе, секунды
+EDGE_PURGE_URL = os.getenv("EDGE_PURGE_URL", "")  # Пусто - очистка отключена
+EDGE_PURGE_TIMEOUT = int(os.getenv("EDGE_PURGE_TIMEOUT", 5))  # Таймаут запроса очистки, секунды
+# Кэш пользователей для JWT-аутентификации (users.cache.UserAuthCache)
+USER_AUTH_CACHE_SIZE = int(os.getenv("USER_AUTH_CACHE_SIZE", 1024))  # Записей в LRU процесса
+USER_AUTH_CACHE_LOCAL_TTL = int(os.getenv("USER_AUTH_CACHE_LOCAL_TTL", 30))  # Время жизни записи LRU, секунды
+USER_AUTH_CACHE_TIMEOUT = int(os.getenv("USER_AUTH_CACHE_TIMEOUT", 5 * 60))  # Время жизни записи в Redis, секунды
+# Токены сброса пароля (users.services.PasswordResetTokenService): "cache" - Redis, "db" - таблица БД
+PASSWORD_RESET_TOKEN_STORE = os.getenv("PASSWORD_RESET_TOKEN_STORE", "cache" if os.getenv("CACHE_LOCATION") else "db")
+PASSWORD_RESET_TIMEOUT = int(os.getenv("PASSWORD_RESET_TIMEOUT", 60 * 60))  # Время жизни токена, секунды
+
+# Бюджеты SQL-запросов представлений (config.query_budget.QueryBudgetMiddleware)
+QUERY_BUDGET_ENABLED = True if os.getenv("QUERY_BUDGET_ENABLED", str(DEBUG)) == "True" else False
+QUERY_BUDGET_RAISE = False  # True - превышение бюджета вызывает исключение (включается в тестах)
+QUERY_BUDGET_REPEAT_LIMIT = 2  # Шаблон запроса, выполненный больше раз, считается N+1
+
+# Асинхронные представления чтения buyrate (для запуска под ASGI: uvicorn config.asgi:application)
+ASYNC_READ_VIEWS = True if os.getenv("ASYNC_READ_VIEWS") == "True" else False
+
+
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
 
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
+# Исходящая очередь задач (users.outbox, команда relay_outbox)
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 100))  # Задач в одной пачке публикации
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 0.5))  # Пауза при пустой очереди, секунды
+OUTBOX_RETRY_DELAY = int(os.getenv("OUTBOX_RETRY_DELAY", 10))  # Отсрочка после ошибки брокера, секунды
+# Обработка изображений и импорт CSV нагружают CPU и требуют лимитов времени, поэтому идут в отдельные очереди
+# (пул prefork): под eventlet такая задача блокирует все зеленые потоки воркера
+CELERY_TASK_ROUTES = {
+    "users.tasks.process_avatar": {"queue": "images"},
+    "buyrate.tasks.import_ads": {"queue": "imports"},
+}
+# Загрузка объявлений в статусе running дольше этого времени считается прерванной и забирается повторно, секунды
+AD_IMPORT_STALE_TIMEOUT = int(os.getenv("AD_IMPORT_STALE_TIMEOUT", CELERY_TASK_TIME_LIMIT + 5 * 60))
+# Период обновления материализованной статистики продавцов (buyrate.tasks.refresh_author_stats), секунды
+AUTHOR_STATS_REFRESH_INTERVAL = int(os.getenv("AUTHOR_STATS_REFRESH_INTERVAL", 5 * 60))
+CELERY_BEAT_SCHEDULE = {
+    "purge-password-reset-tokens": {
+        "task": "users.tasks.purge_password_reset_tokens",
+        "schedule": 60 * 60,
+    },
+    "refresh-author-stats": {
+        "task": "buyrate.tasks.refresh_author_stats",
+        "schedule": AUTHOR_STATS_REFRESH_INTERVAL,
+        # Необработанный запуск не копится в очереди: следующий все равно пересчитает статистику целиком
+        "options": {"expires": AUTHOR_STATS_REFRESH_INTERVAL},
+    },
+}
 
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:80",
@@ -1,8 +1,64 @@
+import smtplib
+from unittest.mock import patch
+
 import pytest
+from django.core.cache import cache
+from django.db import connections
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
 from buyrate.models import Ad, Review
+from config.query_budget import QueryBudgetMiddleware
+from config.replicas import ReplicaLag
+from users.cache import UserAuthCache
 from users.models import User
+from users.services import EmailBatchSender
+
+
+@pytest.fixture(autouse=True)
+def clear_cache() -> None:
+    cache.clear()
+    UserAuthCache.clear_local()
+
+
+@pytest.fixture(autouse=True)
+def query_budget(settings) -> list:
+    """
+    Включает проверку бюджетов SQL-запросов представлений: превышение бюджета или N+1 роняет тест.
+    Возвращает список отчетов по запросам теста (представление, к-во запросов, бюджет, повторы).
+    """
+    settings.QUERY_BUDGET_ENABLED = True
+    settings.QUERY_BUDGET_RAISE = True
+    reports = []
+    QueryBudgetMiddleware.observers.append(reports.append)
+    yield reports
+    QueryBudgetMiddleware.observers.remove(reports.append)
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix) -> None:
+    """Добавляет реплику БД replica1 (зеркало тестовой БД), если она не задана POSTGRES_REPLICA_HOSTS"""
+    if "replica1" not in connections.settings:
+        default = connections.settings["default"]
+        connections.settings["replica1"] = {**default, "TEST": {**default["TEST"], "MIRROR": "default"}}
+
+
+@pytest.fixture(autouse=True)
+def database_replicas(settings) -> None:
+    """Отключает реплики БД: чтение с реплики включает фикстура replica"""
+    settings.DATABASE_REPLICAS = []
+    ReplicaLag.clear()
+
+
+@pytest.fixture
+def replica(settings) -> str:
+    """
+    Включает реплику БД replica1 для ReplicaMiddleware: отдельное соединение с тестовой БД,
+    которое видит только зафиксированные данные. Тесты объявляют ее в django_db(databases=...).
+    Возвращает псевдоним реплики.
+    """
+    settings.DATABASE_REPLICAS = ["replica1"]
+    return "replica1"
 
 
 @pytest.fixture
@@ -12,13 +68,13 @@ def api_client() -> APIClient:
 
 @pytest.fixture
 def user_api_client(api_client: APIClient, user: User) -> APIClient:
-    api_client.force_authenticate(user=user)
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
     return api_client
 
 
 @pytest.fixture
 def admin_api_client(api_client: APIClient, admin: User) -> APIClient:
-    api_client.force_authenticate(user=admin)
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(admin)}")
     return api_client
 
 
@@ -67,3 +123,57 @@ def review_one(user_two: User, ad_one: Ad) -> Review:
 @pytest.fixture
 def review_two(user: User, ad_two: Ad) -> Review:
     return Review.objects.create(text="Ноутбук работает без нареканий. Рекомендую!", author=user, ad=ad_two)
+
+
+class FakeSMTPConnection:
+    """
+    SMTP-соединение для тестов: запоминает отправленные письма, отправки после первых fail_after писем
+    разрывают соединение fail_sends раз, письма адресатам из refused отклоняются сервером
+    """
+
+    def __init__(self, fail_sends: int = 0, fail_after: int = 0, refused: tuple = ()):
+        self.fail_sends = fail_sends
+        self.fail_after = fail_after
+        self.refused = set(refused)
+        self.sent = []
+        self.closed = False
+
+    def open(self) -> None:
+        pass
+
+    def send_messages(self, messages: list) -> int:
+        if self.fail_sends and len(self.sent) >= self.fail_after:
+            self.fail_sends -= 1
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        for message in messages:
+            refused = {
+                recipient: (550, b"No such user") for recipient in message.recipients() if recipient in self.refused
+            }
+            if refused:
+                raise smtplib.SMTPRecipientsRefused(refused)
+            self.sent.append(message)
+        return len(messages)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def smtp_connections() -> tuple:
+    """
+    Подменяет SMTP-соединения EmailBatchSender.
+    Возвращает (planned, connections): planned - соединения, которые откроются первыми
+    (например, FakeSMTPConnection(fail_sends=1)), connections - все открытые соединения.
+    """
+    connections = []
+    planned = []
+
+    def get_connection(**kwargs) -> FakeSMTPConnection:
+        connection = planned.pop(0) if planned else FakeSMTPConnection()
+        connections.append(connection)
+        return connection
+
+    EmailBatchSender.close()
+    with patch("users.services.get_connection", side_effect=get_connection):
+        yield planned, connections
+    EmailBatchSender.close()
@@ -0,0 +1,96 @@
+from asgiref.sync import sync_to_async
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from users.cache import UserAuthCache
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация с кэшированием пользователя (UserAuthCache: LRU процесса + Redis).
+    Пользователь загружается из БД только при промахе кэша; request.user содержит поля id, role, is_active,
+    остальные поля загружаются из БД при первом обращении к ним.
+    При включенном CHECK_REVOKE_TOKEN нужен хеш пароля, поэтому пользователь загружается из БД как в JWTAuthentication.
+    Методы:
+        get_user(self, validated_token):
+            Возвращает пользователя по идентификатору из токена.
+        get_user_id(validated_token):
+            Возвращает идентификатор пользователя из токена.
+        get_user_data_queryset(self, user_id):
+            Возвращает запрос полей кэша пользователя.
+        make_user(data):
+            Проверяет активность и возвращает пользователя по данным кэша.
+    """
+
+    def get_user(self, validated_token):
+        """Возвращает пользователя по идентификатору из токена"""
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+        user_id = self.get_user_id(validated_token)
+        data = UserAuthCache.get(user_id)
+        if data is None:
+            data = self.get_user_data_queryset(user_id).first()
+            if data is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            UserAuthCache.set(user_id, data)
+        return self.make_user(data)
+
+    @staticmethod
+    def get_user_id(validated_token):
+        """Возвращает идентификатор пользователя из токена"""
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def get_user_data_queryset(self, user_id):
+        """Возвращает запрос полей кэша пользователя"""
+        return self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*UserAuthCache.fields)
+
+    @staticmethod
+    def make_user(data: dict):
+        """Проверяет активность и возвращает пользователя по данным кэша"""
+        if api_settings.CHECK_USER_IS_ACTIVE and not data["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return UserAuthCache.build_user(data)
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+    """
+    JWT-аутентификация для асинхронных представлений.
+    Разбор и проверка токена не обращаются к БД, пользователь берется из UserAuthCache,
+    а при промахе загружается асинхронным ORM, поэтому проверка токена не блокирует цикл событий.
+    Методы:
+        aauthenticate(self, request) -> tuple | None:
+            Возвращает (пользователь, токен) или None, если токен не передан.
+        aget_user(self, validated_token):
+            Возвращает пользователя по идентификатору из токена.
+    """
+
+    async def aauthenticate(self, request) -> tuple | None:
+        """Возвращает (пользователь, токен) или None, если токен не передан"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """Возвращает пользователя по идентификатору из токена"""
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return await sync_to_async(JWTAuthentication.get_user)(self, validated_token)
+        user_id = self.get_user_id(validated_token)
+        data = await UserAuthCache.aget(user_id)
+        if data is None:
+            data = await self.get_user_data_queryset(user_id).afirst()
+            if data is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            await UserAuthCache.aset(user_id, data)
+        return self.make_user(data)
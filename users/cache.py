@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from users.models import User
+
+
+class UserAuthCache:
+    """
+    Двухуровневый кэш данных пользователя для аутентификации (id, role, is_active).
+    Первый уровень - ограниченный LRU в памяти процесса (USER_AUTH_CACHE_SIZE записей, USER_AUTH_CACHE_LOCAL_TTL),
+    второй - общий кэш Django (Redis, USER_AUTH_CACHE_TIMEOUT).
+    При сохранении и удалении пользователя записи сбрасываются сигналами; LRU других процессов
+    обновится не позднее чем через USER_AUTH_CACHE_LOCAL_TTL секунд.
+    Методы:
+        get(user_id) -> dict | None:
+            Возвращает данные пользователя из LRU или общего кэша.
+        aget(user_id) -> dict | None:
+            Асинхронный вариант get.
+        set(user_id, data) -> None:
+            Сохраняет данные пользователя на обоих уровнях.
+        aset(user_id, data) -> None:
+            Асинхронный вариант set.
+        invalidate(user_id) -> None:
+            Удаляет данные пользователя на обоих уровнях.
+        clear_local() -> None:
+            Очищает LRU текущего процесса.
+        build_user(data) -> User:
+            Возвращает пользователя с загруженными полями кэша, остальные поля загружаются при обращении.
+    """
+
+    prefix = "users:auth"
+    fields = ("id", "role", "is_active")
+    _local = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, user_id) -> dict | None:
+        """Возвращает данные пользователя из LRU или общего кэша"""
+        data = cls._get_local(user_id)
+        if data is None:
+            data = cache.get(cls.make_key(user_id))
+            if data is not None:
+                cls._set_local(user_id, data)
+        return data
+
+    @classmethod
+    async def aget(cls, user_id) -> dict | None:
+        """Асинхронный вариант get"""
+        data = cls._get_local(user_id)
+        if data is None:
+            data = await cache.aget(cls.make_key(user_id))
+            if data is not None:
+                cls._set_local(user_id, data)
+        return data
+
+    @classmethod
+    def set(cls, user_id, data: dict) -> None:
+        """Сохраняет данные пользователя на обоих уровнях"""
+        cache.set(cls.make_key(user_id), data, settings.USER_AUTH_CACHE_TIMEOUT)
+        cls._set_local(user_id, data)
+
+    @classmethod
+    async def aset(cls, user_id, data: dict) -> None:
+        """Асинхронный вариант set"""
+        await cache.aset(cls.make_key(user_id), data, settings.USER_AUTH_CACHE_TIMEOUT)
+        cls._set_local(user_id, data)
+
+    @classmethod
+    def invalidate(cls, user_id) -> None:
+        """Удаляет данные пользователя на обоих уровнях"""
+        with cls._lock:
+            cls._local.pop(str(user_id), None)
+        cache.delete(cls.make_key(user_id))
+
+    @classmethod
+    def clear_local(cls) -> None:
+        """Очищает LRU текущего процесса"""
+        with cls._lock:
+            cls._local.clear()
+
+    @classmethod
+    def make_key(cls, user_id) -> str:
+        return f"{cls.prefix}:{user_id}"
+
+    @staticmethod
+    def build_user(data: dict) -> User:
+        """Возвращает пользователя с загруженными полями кэша, остальные поля загружаются при обращении"""
+        fields = [field.attname for field in User._meta.concrete_fields if field.attname in data]
+        return User.from_db(DEFAULT_DB_ALIAS, fields, [data[name] for name in fields])
+
+    @classmethod
+    def _get_local(cls, user_id) -> dict | None:
+        key = str(user_id)
+        with cls._lock:
+            entry = cls._local.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at < time.monotonic():
+                del cls._local[key]
+                return None
+            cls._local.move_to_end(key)
+            return data
+
+    @classmethod
+    def _set_local(cls, user_id, data: dict) -> None:
+        with cls._lock:
+            cls._local[str(user_id)] = (time.monotonic() + settings.USER_AUTH_CACHE_LOCAL_TTL, data)
+            cls._local.move_to_end(str(user_id))
+            while len(cls._local) > settings.USER_AUTH_CACHE_SIZE:
+                cls._local.popitem(last=False)
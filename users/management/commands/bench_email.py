@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.mail import EmailMessage, send_mail
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from users.services import EmailBatchSender
+
+
+class Command(BaseCommand):
+    """
+    Команда для замера пропускной способности отправки писем.
+    Сравнивает send_mail (новое SMTP-соединение на каждое письмо) с EmailBatchSender
+    (одно соединение воркера, письма параллельных задач отправляются пачками).
+    По умолчанию поднимает локальный SMTP-сервер aiosmtpd (зависимость для разработки),
+    с --host/--port отправляет на указанный сервер.
+    Методы:
+        add_arguments(self, parser):
+            Добавляет аргументы команды: messages, concurrency, host, port.
+        handle(self, *args, **options) -> None:
+            Обрабатывает команду замера.
+    """
+
+    help = "Замер пропускной способности отправки писем (send_mail и EmailBatchSender)."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды: messages, concurrency, host, port."""
+        parser.add_argument("--messages", type=int, default=200, help="К-во писем")
+        parser.add_argument("--concurrency", type=int, default=20, help="К-во параллельных задач")
+        parser.add_argument("--host", type=str, default=None, help="SMTP-сервер (по умолчанию локальный aiosmtpd)")
+        parser.add_argument("--port", type=int, default=8025, help="Порт SMTP-сервера")
+
+    def handle(self, *args, **options) -> None:
+        """Обрабатывает команду замера."""
+        controller = None
+        host = options["host"]
+        if host is None:
+            try:
+                from aiosmtpd.controller import Controller
+                from aiosmtpd.handlers import Sink
+            except ImportError:
+                raise CommandError("Установите aiosmtpd или укажите --host SMTP-сервера.")
+            host = "127.0.0.1"
+            controller = Controller(Sink(), hostname=host, port=options["port"])
+            controller.start()
+
+        smtp_settings = {
+            "EMAIL_BACKEND": "django.core.mail.backends.smtp.EmailBackend",
+            "EMAIL_HOST": host,
+            "EMAIL_PORT": options["port"],
+            "EMAIL_USE_TLS": False,
+            "EMAIL_USE_SSL": False,
+            "EMAIL_HOST_USER": "",
+            "EMAIL_HOST_PASSWORD": "",
+        }
+        try:
+            with override_settings(**smtp_settings):
+                self.run(options["messages"], options["concurrency"])
+        finally:
+            EmailBatchSender.close()
+            if controller is not None:
+                controller.stop()
+
+    def run(self, count: int, concurrency: int) -> None:
+        """Выполняет замер и выводит к-во писем в секунду"""
+        recipients = [[f"user{i}@example.com"] for i in range(count)]
+
+        def send_with_send_mail(recipient_list: list) -> None:
+            send_mail("Восстановление пароля", "Текст письма", "noreply@example.com", recipient_list)
+
+        def send_with_batch_sender(recipient_list: list) -> None:
+            message = EmailMessage("Восстановление пароля", "Текст письма", "noreply@example.com", recipient_list)
+            EmailBatchSender.send([message])
+
+        for name, func in (("send_mail", send_with_send_mail), ("EmailBatchSender", send_with_batch_sender)):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as executor:
+                list(executor.map(func, recipients))
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{name}: {count} писем за {elapsed:.2f} с, {count / elapsed:.0f} писем/с")
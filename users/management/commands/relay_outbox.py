@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from users.outbox import TaskOutboxRelay
+
+
+class Command(BaseCommand):
+    """
+    Команда ретранслятора исходящей очереди задач (TaskOutbox) в брокер Celery.
+    Публикует задачи пачками, пока очередь не опустеет, затем ждет interval секунд.
+    Методы:
+        add_arguments(self, parser):
+            Добавляет аргументы команды: interval, batch-size, once.
+        handle(self, *args, **options) -> None:
+            Обрабатывает команду ретрансляции.
+    """
+
+    help = "Публикация задач из исходящей очереди в брокер Celery."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды: interval, batch-size, once."""
+        parser.add_argument(
+            "--interval", type=float, default=settings.OUTBOX_POLL_INTERVAL, help="Пауза при пустой очереди, секунды"
+        )
+        parser.add_argument("--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE, help="Размер пачки")
+        parser.add_argument("--once", action="store_true", help="Опубликовать очередь и завершить работу")
+
+    def handle(self, *args, **options) -> None:
+        """Обрабатывает команду ретрансляции."""
+        batch_size = options["batch_size"]
+        total = 0
+        while True:
+            published = TaskOutboxRelay.publish_batch(batch_size)
+            total += published
+            if published == batch_size:
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
+            # Долгоживущий процесс: закрывает разорванные и устаревшие соединения с БД
+            close_old_connections()
+        self.stdout.write(self.style.SUCCESS(f"Опубликовано задач: {total}"))
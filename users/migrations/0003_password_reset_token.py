@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_user_token"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PasswordResetToken",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+                ("token_hash", models.CharField(max_length=64, verbose_name="Хеш токена")),
+                ("expires_at", models.DateTimeField(db_index=True, verbose_name="Истекает")),
+            ],
+            options={
+                "verbose_name": "токен сброса пароля",
+                "verbose_name_plural": "токены сброса пароля",
+            },
+        ),
+        migrations.RemoveField(
+            model_name="user",
+            name="token",
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_password_reset_token"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskOutbox",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("task_name", models.CharField(max_length=255, verbose_name="Задача")),
+                ("args", models.JSONField(default=list, verbose_name="Позиционные аргументы")),
+                ("kwargs", models.JSONField(default=dict, verbose_name="Именованные аргументы")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Создана")),
+                ("available_at", models.DateTimeField(default=django.utils.timezone.now, verbose_name="Доступна с")),
+                ("attempts", models.PositiveIntegerField(default=0, verbose_name="Попыток публикации")),
+                ("last_error", models.TextField(blank=True, default="", verbose_name="Последняя ошибка")),
+            ],
+            options={
+                "verbose_name": "задача в очереди публикации",
+                "verbose_name_plural": "задачи в очереди публикации",
+                "indexes": [models.Index(fields=["available_at", "id"], name="users_outbox_available_idx")],
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -10,8 +11,8 @@ class User(AbstractUser):
         email(str): Уникальный email
         phone(str): Номер телефона
         role(str): Рол пользователя: user, admin
-        image(ImageField): Аватар (изображение)
-        token(str): Токен для восстановления пароля
+        image(ImageField): Аватар (изображение, оригинал загрузки)
+        avatar_variants(dict): Варианты аватара по размерам и форматам: {"40": {"webp": путь, "jpeg": путь}, ...}
     """
 
     ROLE_CHOICES = [("user", "пользователь"), ("admin", "администратор")]
@@ -26,7 +27,7 @@ class User(AbstractUser):
     image = models.ImageField(
         upload_to="avatars/", blank=True, null=True, verbose_name="Аватар", help_text="Загрузите изображение аватара"
     )
-    token = models.CharField(max_length=100, verbose_name="Token", blank=True, null=True)
+    avatar_variants = models.JSONField(default=dict, blank=True, verbose_name="Варианты аватара")
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -37,3 +38,60 @@ class User(AbstractUser):
     class Meta:
         verbose_name = "пользователь"
         verbose_name_plural = "пользователи"
+
+
+class PasswordResetToken(models.Model):
+    """
+    Токен сброса пароля в БД (резервное хранилище PasswordResetTokenService, если Redis не настроен или недоступен)
+    Хранится только хеш токена, у пользователя не больше одного токена.
+    Атрибуты:
+        user(User): Пользователь (первичный ключ)
+        token_hash(str): HMAC-хеш токена
+        expires_at(datetime): Время истечения токена (индекс для удаления истекших токенов)
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="+", verbose_name="Пользователь"
+    )
+    token_hash = models.CharField(max_length=64, verbose_name="Хеш токена")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Истекает")
+
+    def __str__(self):
+        return f"{self.user_id}: {self.expires_at}"
+
+    class Meta:
+        verbose_name = "токен сброса пароля"
+        verbose_name_plural = "токены сброса пароля"
+
+
+class TaskOutbox(models.Model):
+    """
+    Исходящая очередь задач Celery (transactional outbox)
+    Задача записывается в той же транзакции, что и данные, и публикуется в брокер ретранслятором после фиксации.
+    Атрибуты:
+        task_name(str): Имя задачи Celery
+        args(list): Позиционные аргументы задачи
+        kwargs(dict): Именованные аргументы задачи
+        created_at(datetime): Время постановки в очередь
+        available_at(datetime): Время, с которого задачу можно публиковать (откладывается при ошибке брокера)
+        attempts(int): К-во неудачных попыток публикации
+        last_error(str): Последняя ошибка публикации
+    """
+
+    task_name = models.CharField(max_length=255, verbose_name="Задача")
+    args = models.JSONField(default=list, verbose_name="Позиционные аргументы")
+    kwargs = models.JSONField(default=dict, verbose_name="Именованные аргументы")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создана")
+    available_at = models.DateTimeField(default=timezone.now, verbose_name="Доступна с")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток публикации")
+    last_error = models.TextField(blank=True, default="", verbose_name="Последняя ошибка")
+
+    def __str__(self):
+        return f"{self.task_name} #{self.pk}"
+
+    class Meta:
+        verbose_name = "задача в очереди публикации"
+        verbose_name_plural = "задачи в очереди публикации"
+        indexes = [
+            models.Index(fields=["available_at", "id"], name="users_outbox_available_idx"),
+        ]
@@ -0,0 +1,75 @@
+import logging
+from datetime import timedelta
+
+from celery import Task, current_app
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from users.models import TaskOutbox
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxTask(Task):
+    """
+    Базовый класс задач Celery с постановкой через исходящую очередь (@shared_task(base=OutboxTask))
+    enqueue() записывает задачу в TaskOutbox в текущей транзакции БД и не обращается к брокеру,
+    поэтому задача не выполнится до фиксации транзакции и не выполнится при ее откате,
+    а время ответа не зависит от доступности брокера. Публикует задачи TaskOutboxRelay.
+    Методы:
+        enqueue(self, *args, **kwargs) -> TaskOutbox:
+            Ставит задачу в исходящую очередь.
+    """
+
+    def enqueue(self, *args, **kwargs) -> TaskOutbox:
+        """Ставит задачу в исходящую очередь (аргументы должны сериализоваться в JSON)"""
+        return TaskOutbox.objects.create(task_name=self.name, args=list(args), kwargs=kwargs)
+
+
+class TaskOutboxRelay:
+    """
+    Ретранслятор исходящей очереди задач в брокер Celery (команда relay_outbox).
+    Забирает пачку задач с блокировкой строк (SKIP LOCKED, поэтому ретрансляторов может быть несколько),
+    публикует их по одному соединению с брокером и удаляет опубликованные строки в той же транзакции.
+    При ошибке брокера неопубликованные задачи откладываются на OUTBOX_RETRY_DELAY секунд.
+    Доставка "хотя бы один раз": при сбое между публикацией и фиксацией задача будет опубликована повторно.
+    Методы:
+        publish_batch(batch_size) -> int:
+            Публикует пачку задач и возвращает к-во опубликованных.
+    """
+
+    @staticmethod
+    def publish_batch(batch_size: int | None = None) -> int:
+        """
+        Публикует пачку задач
+        :param batch_size: Размер пачки (по умолчанию OUTBOX_BATCH_SIZE)
+        :return: К-во опубликованных задач
+        """
+        batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        with transaction.atomic():
+            rows = list(
+                TaskOutbox.objects.select_for_update(skip_locked=True)
+                .filter(available_at__lte=timezone.now())
+                .order_by("available_at", "id")[:batch_size]
+            )
+            if not rows:
+                return 0
+
+            published = []
+            try:
+                with current_app.producer_or_acquire() as producer:
+                    for row in rows:
+                        current_app.send_task(row.task_name, args=row.args, kwargs=row.kwargs, producer=producer)
+                        published.append(row.pk)
+            except Exception as exc:
+                logger.warning("Ошибка публикации задач из исходящей очереди", exc_info=True)
+                failed = [row.pk for row in rows if row.pk not in published]
+                TaskOutbox.objects.filter(pk__in=failed).update(
+                    attempts=F("attempts") + 1,
+                    available_at=timezone.now() + timedelta(seconds=settings.OUTBOX_RETRY_DELAY),
+                    last_error=repr(exc),
+                )
+            TaskOutbox.objects.filter(pk__in=published).delete()
+        return len(published)
@@ -1,7 +1,9 @@
+from django.conf import settings
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 
 from users.models import User
+from users.services import AvatarService
 
 
 class UserCreateSerializer(ModelSerializer):
@@ -28,3 +30,23 @@ class UserCreateSerializer(ModelSerializer):
         user.set_password(validated_data.pop("password"))
         user.save()
         return user
+
+
+class UserAvatarSerializers(serializers.Serializer):
+    """
+    Сериализатор загрузки аватара.
+    Показывает поля:
+        image(ImageField): Изображение не больше AVATAR_MAX_UPLOAD_SIZE байт и AVATAR_MAX_PIXELS пикселей
+    """
+
+    image = serializers.ImageField()
+
+    def validate_image(self, value):
+        """Проверяет размер файла и изображения (по заголовку, без декодирования)"""
+        if value.size > settings.AVATAR_MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError(f"Файл больше {settings.AVATAR_MAX_UPLOAD_SIZE} байт.")
+        try:
+            AvatarService.check_image(*value.image.size)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
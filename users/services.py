@@ -1,6 +1,27 @@
-from django.core.mail import send_mail
+import hashlib
+import logging
+import queue
+import secrets
+import smtplib
+import threading
+import time
+from concurrent.futures import Future
+from datetime import timedelta
+from io import BytesIO
 
-from config import settings
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+from PIL import Image, ImageOps
+
+from users.models import PasswordResetToken
+
+logger = logging.getLogger(__name__)
 
 
 class UserService:
@@ -8,7 +29,7 @@ class UserService:
     Сервисное класс для работы с пользователями
     Методы:
         send_email(subject: str, message: str, user_emails: list) -> None:
-            Отправка письма на email.
+            Отправка письма на email через EmailBatchSender.
     """
 
     @staticmethod
@@ -21,4 +42,294 @@ class UserService:
         """
         from_email = settings.DEFAULT_FROM_EMAIL
         recipient_list = user_emails
-        send_mail(subject, message, from_email, recipient_list)
+        EmailBatchSender.send([EmailMessage(subject, message, from_email, recipient_list)])
+
+
+class EmailBatchSender:
+    """
+    Отправитель писем с долгоживущим SMTP-соединением воркера и пакетной отправкой.
+    Письма ставятся в очередь процесса, отправку выполняет одна задача за раз: она забирает из очереди
+    все накопившиеся письма пачками по EMAIL_BATCH_SIZE и отправляет их по одному через общее соединение,
+    поэтому при параллельных задачах (пул eventlet) письма уходят за одну SMTP-сессию, а при одиночных
+    отправляются сразу. Результат и ошибка каждого письма возвращаются только его задаче.
+    Соединение переиспользуется между задачами и переоткрывается после EMAIL_CONNECTION_MAX_AGE секунд
+    или при разрыве (неотправленное письмо отправляется повторно один раз, отправленные не повторяются).
+    Методы:
+        send(messages) -> int:
+            Ставит письма в очередь, отправляет очередь и возвращает к-во отправленных писем.
+        flush() -> None:
+            Отправляет накопившиеся письма пачками.
+        get_connection() -> BaseEmailBackend:
+            Возвращает открытое соединение воркера.
+        close() -> None:
+            Закрывает соединение воркера.
+    """
+
+    reconnect_errors = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+    _queue = queue.SimpleQueue()
+    _lock = threading.Lock()
+    _connection = None
+    _opened_at = 0.0
+
+    @classmethod
+    def send(cls, messages: list) -> int:
+        """
+        Ставит письма в очередь, отправляет очередь и возвращает к-во отправленных писем
+        :param messages: Список EmailMessage
+        :return: К-во отправленных писем
+        """
+        futures = []
+        for message in messages:
+            future = Future()
+            cls._queue.put((message, future))
+            futures.append(future)
+        cls.flush()
+        return sum(future.result() for future in futures)
+
+    @classmethod
+    def flush(cls) -> None:
+        """Отправляет накопившиеся письма пачками, пока очередь не опустеет"""
+        with cls._lock:
+            while True:
+                batch = []
+                while len(batch) < settings.EMAIL_BATCH_SIZE:
+                    try:
+                        batch.append(cls._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                for message, future in batch:
+                    try:
+                        future.set_result(cls._send_message(message))
+                    except Exception as exc:
+                        future.set_exception(exc)
+
+    @classmethod
+    def get_connection(cls) -> BaseEmailBackend:
+        """Возвращает открытое соединение воркера, переоткрывая его по истечении EMAIL_CONNECTION_MAX_AGE"""
+        if cls._connection is not None and time.monotonic() - cls._opened_at > settings.EMAIL_CONNECTION_MAX_AGE:
+            cls.close()
+        if cls._connection is None:
+            connection = get_connection(fail_silently=False)
+            connection.open()
+            cls._connection, cls._opened_at = connection, time.monotonic()
+        return cls._connection
+
+    @classmethod
+    def close(cls) -> None:
+        """Закрывает соединение воркера"""
+        connection, cls._connection = cls._connection, None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                logger.warning("Ошибка закрытия SMTP-соединения", exc_info=True)
+
+    @classmethod
+    def _send_message(cls, message: EmailMessage) -> int:
+        try:
+            return cls.get_connection().send_messages([message]) or 0
+        except cls.reconnect_errors:
+            logger.warning("SMTP-соединение разорвано, повторная отправка письма", exc_info=True)
+            cls.close()
+            try:
+                return cls.get_connection().send_messages([message]) or 0
+            except cls.reconnect_errors:
+                cls.close()
+                raise
+
+
+class PasswordResetTokenService:
+    """
+    Сервисный класс токенов сброса пароля.
+    Токены одноразовые и истекают через PASSWORD_RESET_TIMEOUT секунд, хранится только их HMAC-хеш.
+    Хранилище - Redis (кэш Django, ключ по пользователю, истечение по TTL) при PASSWORD_RESET_TOKEN_STORE = "cache",
+    резервное - таблица PasswordResetToken (при PASSWORD_RESET_TOKEN_STORE = "db" или ошибке кэша).
+    Методы:
+        issue(user_id) -> str:
+            Создает токен пользователя (предыдущий токен перестает действовать).
+        consume(user_id, token) -> bool:
+            Проверяет и погашает токен пользователя.
+        purge_expired(batch_size) -> int:
+            Удаляет истекшие токены из БД по индексу expires_at.
+    """
+
+    prefix = "users:password_reset"
+
+    @classmethod
+    def issue(cls, user_id) -> str:
+        """
+        Создает токен пользователя (предыдущий токен перестает действовать)
+        :param user_id: id пользователя
+        :return: Токен для ссылки сброса пароля
+        """
+        token = secrets.token_urlsafe(32)
+        token_hash = cls.make_hash(token)
+        if settings.PASSWORD_RESET_TOKEN_STORE == "cache":
+            try:
+                cache.set(cls.make_key(user_id), token_hash, settings.PASSWORD_RESET_TIMEOUT)
+                return token
+            except Exception:
+                logger.warning("Кэш недоступен, токен сброса пароля сохранен в БД", exc_info=True)
+        expires_at = timezone.now() + timedelta(seconds=settings.PASSWORD_RESET_TIMEOUT)
+        PasswordResetToken.objects.bulk_create(
+            [PasswordResetToken(user_id=user_id, token_hash=token_hash, expires_at=expires_at)],
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=["token_hash", "expires_at"],
+        )
+        return token
+
+    @classmethod
+    def consume(cls, user_id, token: str) -> bool:
+        """
+        Проверяет и погашает токен пользователя
+        Токен погашается удалением, поэтому из параллельных запросов с одним токеном успешен только один.
+        :param user_id: id пользователя
+        :param token: Токен из ссылки сброса пароля
+        :return: True, если токен действителен
+        """
+        if not token:
+            return False
+        token_hash = cls.make_hash(token)
+        if settings.PASSWORD_RESET_TOKEN_STORE == "cache":
+            key = cls.make_key(user_id)
+            try:
+                stored_hash = cache.get(key)
+                if stored_hash is not None:
+                    return constant_time_compare(stored_hash, token_hash) and bool(cache.delete(key))
+            except Exception:
+                logger.warning("Кэш недоступен, токен сброса пароля проверяется в БД", exc_info=True)
+        deleted, _ = PasswordResetToken.objects.filter(
+            user_id=user_id, token_hash=token_hash, expires_at__gt=timezone.now()
+        ).delete()
+        return deleted > 0
+
+    @staticmethod
+    def purge_expired(batch_size: int = 1000) -> int:
+        """
+        Удаляет истекшие токены из БД пачками по индексу expires_at
+        :param batch_size: Размер пачки
+        :return: К-во удаленных токенов
+        """
+        total = 0
+        while True:
+            expired = PasswordResetToken.objects.filter(expires_at__lte=timezone.now()).values("pk")[:batch_size]
+            deleted, _ = PasswordResetToken.objects.filter(pk__in=expired).delete()
+            total += deleted
+            if deleted < batch_size:
+                return total
+
+    @classmethod
+    def make_key(cls, user_id) -> str:
+        return f"{cls.prefix}:{user_id}"
+
+    @staticmethod
+    def make_hash(token: str) -> str:
+        """Возвращает HMAC-хеш токена (по SECRET_KEY)"""
+        return salted_hmac("users.password_reset", token, algorithm="sha256").hexdigest()
+
+
+class AvatarService:
+    """
+    Сервисный класс обработки аватаров.
+    Оригинал декодируется один раз (JPEG - сразу в уменьшенном масштабе через draft), обрезается по центру в квадрат
+    и уменьшается до размеров AVATAR_SIZES в форматах WebP и JPEG.
+    Варианты сохраняются по неизменяемым путям avatars/v/<xx>/<хеш>-<размер>.<расширение>, где хеш считается
+    от содержимого оригинала и версии обработки, поэтому одинаковые загрузки не обрабатываются повторно.
+    Методы:
+        check_image(width, height) -> None:
+            Проверяет, что изображение не больше AVATAR_MAX_PIXELS.
+        make_variants(name) -> dict:
+            Создает варианты аватара из оригинала в хранилище и возвращает их пути.
+        choose_variant(variants, size, accept) -> str | None:
+            Возвращает путь наименьшего варианта не меньше size в поддерживаемом клиентом формате.
+    """
+
+    version = 1
+    formats = {
+        "webp": ("webp", "WEBP", {"quality": 80, "method": 4}),
+        "jpeg": ("jpg", "JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+    }
+
+    @staticmethod
+    def check_image(width: int, height: int) -> None:
+        """Проверяет, что изображение не больше AVATAR_MAX_PIXELS"""
+        if width * height > settings.AVATAR_MAX_PIXELS:
+            raise ValueError(f"Изображение больше {settings.AVATAR_MAX_PIXELS} пикселей")
+
+    @classmethod
+    def make_variants(cls, name: str) -> dict:
+        """
+        Создает варианты аватара из оригинала в хранилище
+        :param name: Путь оригинала в хранилище
+        :return: Пути вариантов: {"40": {"webp": путь, "jpeg": путь}, ...}
+        """
+        largest = max(settings.AVATAR_SIZES)
+        digest = hashlib.sha256(f"avatar:v{cls.version}:{largest}".encode())
+        with default_storage.open(name, "rb") as file:
+            for chunk in file.chunks():
+                digest.update(chunk)
+            file.seek(0)
+            with Image.open(file) as image:
+                cls.check_image(*image.size)
+                image.draft("RGB", (largest, largest))
+                base = cls.make_square(cls.to_rgb(ImageOps.exif_transpose(image)), largest)
+        digest = digest.hexdigest()[:32]
+
+        variants = {}
+        for size in sorted(settings.AVATAR_SIZES, reverse=True):
+            side = min(size, base.width)
+            if side != base.width:
+                base = base.resize((side, side), Image.Resampling.LANCZOS)
+            variants[str(size)] = {
+                fmt: cls.save_variant(base, f"avatars/v/{digest[:2]}/{digest}-{size}", fmt) for fmt in cls.formats
+            }
+        return variants
+
+    @classmethod
+    def choose_variant(cls, variants: dict, size: int, accept: str) -> str | None:
+        """
+        Возвращает путь наименьшего варианта не меньше size (или наибольшего) в поддерживаемом клиентом формате
+        :param variants: Пути вариантов (User.avatar_variants)
+        :param size: Требуемый размер, пиксели
+        :param accept: Заголовок Accept клиента (WebP, если поддерживается, иначе JPEG)
+        """
+        sizes = sorted(int(key) for key in variants)
+        if not sizes:
+            return None
+        fitting = next((key for key in sizes if key >= size), sizes[-1])
+        return variants[str(fitting)]["webp" if "image/webp" in accept else "jpeg"]
+
+    @staticmethod
+    def to_rgb(image: Image.Image) -> Image.Image:
+        """Приводит изображение к RGB, прозрачные области заливаются белым"""
+        if image.mode == "RGB":
+            return image
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+
+    @staticmethod
+    def make_square(image: Image.Image, size: int) -> Image.Image:
+        """Обрезает изображение по центру в квадрат и уменьшает до size (без увеличения)"""
+        width, height = image.size
+        side = min(width, height)
+        left, top = (width - side) // 2, (height - side) // 2
+        target = min(side, size)
+        return image.resize(
+            (target, target), Image.Resampling.LANCZOS, box=(left, top, left + side, top + side), reducing_gap=3.0
+        )
+
+    @classmethod
+    def save_variant(cls, image: Image.Image, stem: str, fmt: str) -> str:
+        """Сохраняет вариант в хранилище, если его еще нет (пути неизменяемые), и возвращает путь"""
+        extension, pil_format, options = cls.formats[fmt]
+        name = f"{stem}.{extension}"
+        if not default_storage.exists(name):
+            buffer = BytesIO()
+            image.save(buffer, format=pil_format, **options)
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        return name
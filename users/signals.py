@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from config.replicas import WriteFence
+from users.cache import UserAuthCache
+from users.models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_auth_cache(sender, instance: User, **kwargs) -> None:
+    """
+    Сбрасывает кэш аутентификации пользователя сразу и после фиксации транзакции.
+    Перед сбросом записывается граница записи для реплик: кэш не заполнится данными отстающей реплики.
+    """
+    UserAuthCache.invalidate(instance.pk)
+    WriteFence.record_on_commit()
+    transaction.on_commit(lambda: UserAuthCache.invalidate(instance.pk))
@@ -1,10 +1,13 @@
 from celery import shared_task
+from celery.signals import worker_process_shutdown, worker_shutdown
 
 from config import settings
-from users.services import UserService
+from users.models import User
+from users.outbox import OutboxTask
+from users.services import AvatarService, EmailBatchSender, PasswordResetTokenService, UserService
 
 
-@shared_task
+@shared_task(base=OutboxTask)
 def send_password_recovery_email(email: str, uidb64: str, token: str) -> None:
     """
     Отправляет электронное письмо для восстановления пароля.
@@ -18,3 +21,39 @@ def send_password_recovery_email(email: str, uidb64: str, token: str) -> None:
     message = url
     recipient_list = [email]
     UserService.send_email(subject, message, recipient_list)
+
+
+@shared_task
+def purge_password_reset_tokens() -> int:
+    """
+    Удаляет истекшие токены сброса пароля из БД (запускается celery beat).
+    :return: К-во удаленных токенов
+    """
+    return PasswordResetTokenService.purge_expired()
+
+
+@shared_task(
+    base=OutboxTask, soft_time_limit=settings.AVATAR_TASK_TIME_LIMIT, time_limit=settings.AVATAR_TASK_TIME_LIMIT + 10
+)
+def process_avatar(user_id: int, name: str) -> dict:
+    """
+    Создает варианты аватара пользователя и сохраняет их пути у пользователя.
+    Пути не сохраняются, если за время обработки пользователь загрузил другой аватар.
+    :param user_id: id пользователя
+    :param name: Путь оригинала в хранилище
+    :return: Пути вариантов
+    """
+    variants = AvatarService.make_variants(name)
+    User.objects.filter(pk=user_id, image=name).update(avatar_variants=variants)
+    return variants
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def close_email_connection(**kwargs) -> None:
+    """
+    Закрывает SMTP-соединение воркера при его остановке.
+    worker_shutdown срабатывает в основном процессе (пулы eventlet/gevent/solo),
+    worker_process_shutdown - в дочерних процессах пула prefork
+    """
+    EmailBatchSender.close()
@@ -1,18 +1,36 @@
-import secrets
+import smtplib
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO
 from unittest.mock import MagicMock, patch
 
 import pytest
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail import EmailMessage
 from django.core.management import call_command
+from django.db import transaction
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.http import urlsafe_base64_encode
 from jwt.utils import force_bytes
+from PIL import Image
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
 
 from config import settings
-from users.models import User
-from users.services import UserService
-from users.tasks import send_password_recovery_email
+from conftest import FakeSMTPConnection
+from users import urls as users_urls
+from users.authentication import CachedJWTAuthentication
+from users.cache import UserAuthCache
+from users.models import PasswordResetToken, TaskOutbox, User
+from users.outbox import TaskOutboxRelay
+from users.services import AvatarService, EmailBatchSender, PasswordResetTokenService, UserService
+from users.tasks import process_avatar, purge_password_reset_tokens, send_password_recovery_email
 
 
 @pytest.mark.django_db
@@ -87,8 +105,7 @@ def test_create_user(api_client: APIClient) -> None:
 
 
 @pytest.mark.django_db
-@patch("users.tasks.send_password_recovery_email.delay")
-def test_reset_password(mock_send_email: MagicMock, api_client: APIClient, user: User) -> None:
+def test_reset_password(api_client: APIClient, user: User) -> None:
     """Тестирование запроса восстановления пароля"""
     data = {"email": user.email}
 
@@ -97,19 +114,111 @@ def test_reset_password(mock_send_email: MagicMock, api_client: APIClient, user:
     assert response.status_code == status.HTTP_200_OK
     assert response.data == {"detail": "Ссылка для сброса успешно отправлена"}
 
-    mock_send_email.assert_called_once()
+    outbox = TaskOutbox.objects.get()
+    assert outbox.task_name == send_password_recovery_email.name
+    assert outbox.args[:2] == [user.email, urlsafe_base64_encode(force_bytes(str(user.pk)))]
 
 
-@pytest.mark.django_db
-@patch("users.services.send_mail")
-def test_send_email(mock_send_mail: MagicMock, user: User) -> None:
+def test_send_email(mailoutbox: list) -> None:
     """Тестирование сервисного метода отправки сообщения"""
     subject = "Тестовая тема"
     message = "Тестовый текст"
-    user_emails = [user.email]
+    user_emails = ["user1@example.com"]
     UserService.send_email(subject, message, user_emails)
-    assert mock_send_mail.call_count == 1
-    mock_send_mail.assert_called_once_with(subject, message, settings.DEFAULT_FROM_EMAIL, user_emails)
+    assert len(mailoutbox) == 1
+    sent = mailoutbox[0]
+    assert (sent.subject, sent.body, sent.from_email, sent.to) == (
+        subject,
+        message,
+        settings.DEFAULT_FROM_EMAIL,
+        user_emails,
+    )
+
+
+def test_email_batch_sender_reuses_connection(settings, smtp_connections: tuple) -> None:
+    """Тестирование переиспользования SMTP-соединения и его переоткрытия по EMAIL_CONNECTION_MAX_AGE"""
+    planned, connections = smtp_connections
+    for _ in range(3):
+        assert EmailBatchSender.send([EmailMessage("Тема", "Текст", to=["user1@example.com"])]) == 1
+    assert len(connections) == 1
+    assert len(connections[0].sent) == 3
+
+    settings.EMAIL_CONNECTION_MAX_AGE = -1
+    EmailBatchSender.send([EmailMessage("Тема", "Текст", to=["user1@example.com"])])
+    assert len(connections) == 2
+    assert connections[0].closed
+
+
+def send_in_parallel(messages: list) -> list:
+    """Отправляет письма параллельными задачами, пока соединение занято, и возвращает их результаты"""
+    results = [None] * len(messages)
+
+    def send(index: int) -> None:
+        try:
+            results[index] = EmailBatchSender.send([messages[index]])
+        except Exception as exc:
+            results[index] = exc
+
+    # Пока соединение занято, письма задач накапливаются в очереди
+    with EmailBatchSender._lock:
+        threads = [threading.Thread(target=send, args=(index,)) for index in range(len(messages))]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while EmailBatchSender._queue.qsize() < len(messages) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_email_batch_sender_batches_queued_messages(settings, smtp_connections: tuple) -> None:
+    """Тестирование отправки писем параллельных задач через одно соединение"""
+    settings.EMAIL_BATCH_SIZE = 2
+    planned, connections = smtp_connections
+    messages = [EmailMessage("Тема", "Текст", to=[f"user{index}@example.com"]) for index in range(5)]
+
+    assert send_in_parallel(messages) == [1] * 5
+    assert len(connections) == 1
+    assert sorted(message.to[0] for message in connections[0].sent) == sorted(message.to[0] for message in messages)
+
+
+def test_email_batch_sender_refused_recipient(smtp_connections: tuple) -> None:
+    """Тестирование отклонения адресата в пачке: ошибка возвращается только его задаче"""
+    planned, connections = smtp_connections
+    planned.append(FakeSMTPConnection(refused=("bad@example.com",)))
+    messages = [
+        EmailMessage("Тема", "Текст", to=["user1@example.com"]),
+        EmailMessage("Тема", "Текст", to=["bad@example.com"]),
+        EmailMessage("Тема", "Текст", to=["user2@example.com"]),
+    ]
+
+    results = send_in_parallel(messages)
+    assert results[0] == 1 and results[2] == 1
+    assert isinstance(results[1], smtplib.SMTPRecipientsRefused)
+    assert len(connections) == 1
+    assert sorted(message.to[0] for message in connections[0].sent) == ["user1@example.com", "user2@example.com"]
+
+
+def test_email_batch_sender_reconnects(smtp_connections: tuple) -> None:
+    """Тестирование переподключения при разрыве SMTP-соединения без повторной отправки отправленных писем"""
+    planned, connections = smtp_connections
+    planned.append(FakeSMTPConnection(fail_sends=1, fail_after=1))
+
+    messages = [EmailMessage("Тема", "Текст", to=[f"user{index}@example.com"]) for index in range(3)]
+    assert EmailBatchSender.send(messages) == 3
+    assert connections[0].closed
+    assert connections[0].sent == messages[:1]
+    assert connections[1].sent == messages[1:]
+
+    # Повторный разрыв не скрывается, а следующее письмо уходит по новому соединению
+    EmailBatchSender.close()
+    planned.extend([FakeSMTPConnection(fail_sends=1), FakeSMTPConnection(fail_sends=1)])
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        EmailBatchSender.send(messages[:1])
+    assert EmailBatchSender.send(messages[:1]) == 1
+    assert len(connections) == 5
+    assert connections[-1].sent == messages[:1]
 
 
 @pytest.mark.django_db
@@ -142,9 +251,7 @@ def test_reset_password_confirm(api_client: APIClient, user: User) -> None:
     """Тестирование подтверждение сброса пароля"""
 
     uid64 = urlsafe_base64_encode(force_bytes(str(user.pk)))
-    token = secrets.token_hex(16)
-    user.token = token
-    user.save()
+    token = PasswordResetTokenService.issue(user.pk)
     password = "new12345"
 
     data = {"uid": uid64, "token": token, "new_password": password}
@@ -157,6 +264,10 @@ def test_reset_password_confirm(api_client: APIClient, user: User) -> None:
     user.refresh_from_db()
     assert user.check_password(password) is True
 
+    # Токен одноразовый
+    response = api_client.post(reverse("users:reset_password_confirm"), data=data)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
 
 @pytest.mark.django_db
 def test_reset_password_confirm_empty_user(api_client: APIClient) -> None:
@@ -181,3 +292,289 @@ def test_reset_password_confirm_invalid_token(api_client: APIClient, user: User)
 
     assert response.status_code == status.HTTP_403_FORBIDDEN
     assert response.data == {"detail": "Токен не корректный"}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("store", ["cache", "db"])
+def test_password_reset_token_store(settings, store: str, user: User, user_two: User) -> None:
+    """Тестирование хранилищ токенов сброса пароля: хеширование, одноразовость, замена токена"""
+    settings.PASSWORD_RESET_TOKEN_STORE = store
+    old_token = PasswordResetTokenService.issue(user.pk)
+    token = PasswordResetTokenService.issue(user.pk)
+    stored_hash = cache.get(PasswordResetTokenService.make_key(user.pk))
+    if store == "db":
+        assert stored_hash is None
+        stored_hash = PasswordResetToken.objects.get(user=user).token_hash
+    assert stored_hash == PasswordResetTokenService.make_hash(token) != token
+
+    assert not PasswordResetTokenService.consume(user.pk, old_token)
+    assert not PasswordResetTokenService.consume(user_two.pk, token)
+    assert not PasswordResetTokenService.consume(user.pk, "")
+    assert PasswordResetTokenService.consume(user.pk, token)
+    assert not PasswordResetTokenService.consume(user.pk, token)
+    assert not PasswordResetToken.objects.exists()
+
+
+@pytest.mark.django_db
+def test_password_reset_token_cache_fallback(settings, user: User) -> None:
+    """Тестирование резервного хранения токена в БД при ошибке кэша"""
+    settings.PASSWORD_RESET_TOKEN_STORE = "cache"
+    with patch("users.services.cache.set", side_effect=ConnectionError):
+        token = PasswordResetTokenService.issue(user.pk)
+    assert PasswordResetToken.objects.filter(user=user).exists()
+    with patch("users.services.cache.get", side_effect=ConnectionError):
+        assert PasswordResetTokenService.consume(user.pk, token)
+
+
+@pytest.mark.django_db
+def test_password_reset_token_expired(settings, user: User, user_two: User) -> None:
+    """Тестирование истечения токена и удаления истекших токенов из БД"""
+    settings.PASSWORD_RESET_TOKEN_STORE = "db"
+    token = PasswordResetTokenService.issue(user.pk)
+    PasswordResetTokenService.issue(user_two.pk)
+    PasswordResetToken.objects.filter(user=user).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    assert not PasswordResetTokenService.consume(user.pk, token)
+    assert purge_password_reset_tokens() == 1
+    assert list(PasswordResetToken.objects.values_list("user_id", flat=True)) == [user_two.pk]
+
+
+@pytest.mark.django_db
+def test_reset_password_does_not_save_user(api_client: APIClient, user: User) -> None:
+    """Тестирование запроса сброса пароля без записи в таблицу пользователей"""
+    with patch.object(User, "save") as mock_save:
+        response = api_client.post(reverse("users:reset_password"), data={"email": user.email})
+    assert response.status_code == status.HTTP_200_OK
+    mock_save.assert_not_called()
+    email, uidb64, token = TaskOutbox.objects.get().args
+    assert PasswordResetTokenService.consume(user.pk, token)
+
+
+@pytest.mark.django_db
+@patch("users.outbox.current_app")
+def test_task_outbox_enqueue_in_transaction(mock_app: MagicMock) -> None:
+    """Тестирование постановки задачи в исходящую очередь в транзакции без обращения к брокеру"""
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            send_password_recovery_email.enqueue("user1@example.com", "AB", "token")
+            raise RuntimeError
+    assert not TaskOutbox.objects.exists()
+
+    send_password_recovery_email.enqueue("user1@example.com", "AB", "token")
+    assert TaskOutbox.objects.count() == 1
+    mock_app.send_task.assert_not_called()
+
+
+@pytest.mark.django_db
+@patch("users.outbox.current_app")
+def test_task_outbox_relay(mock_app: MagicMock, settings, django_assert_num_queries) -> None:
+    """Тестирование публикации исходящей очереди пачками и отсрочки при ошибке брокера"""
+    for i in range(5):
+        send_password_recovery_email.enqueue(f"user{i}@example.com", "AB", "token")
+
+    # SAVEPOINT, SELECT ... FOR UPDATE SKIP LOCKED, DELETE, RELEASE
+    with django_assert_num_queries(4):
+        assert TaskOutboxRelay.publish_batch(3) == 3
+    assert mock_app.producer_or_acquire.call_count == 1
+    assert [call.kwargs["args"][0] for call in mock_app.send_task.call_args_list] == [
+        "user0@example.com",
+        "user1@example.com",
+        "user2@example.com",
+    ]
+    assert mock_app.send_task.call_args.args == (send_password_recovery_email.name,)
+
+    # Брокер недоступен после первой задачи: она удаляется, остальные откладываются
+    mock_app.send_task.side_effect = [None, ConnectionError("broker")]
+    assert TaskOutboxRelay.publish_batch() == 1
+    delayed = TaskOutbox.objects.get()
+    assert (delayed.args[0], delayed.attempts) == ("user4@example.com", 1)
+    assert "broker" in delayed.last_error
+    assert delayed.available_at > timezone.now()
+    assert TaskOutboxRelay.publish_batch() == 0
+
+    mock_app.send_task.side_effect = None
+    TaskOutbox.objects.update(available_at=timezone.now())
+    call_command("relay_outbox", "--once")
+    assert not TaskOutbox.objects.exists()
+
+
+def make_image_file(size: tuple, mode: str = "RGB", image_format: str = "PNG", name: str = "avatar.png"):
+    """Возвращает загружаемый файл изображения"""
+    buffer = BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == "RGBA" else (200, 30, 30)).save(buffer, format=image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f"image/{image_format.lower()}")
+
+
+@pytest.mark.django_db
+def test_avatar_variants(settings, tmp_path) -> None:
+    """Тестирование создания вариантов аватара по неизменяемым путям"""
+    settings.MEDIA_ROOT = tmp_path
+    name = default_storage.save("avatars/avatar.png", make_image_file((900, 600), mode="RGBA"))
+
+    variants = AvatarService.make_variants(name)
+    assert sorted(variants, key=int) == ["40", "80", "160", "320"]
+    for size, paths in variants.items():
+        assert paths["webp"].startswith("avatars/v/") and paths["webp"].endswith(f"-{size}.webp")
+        assert paths["jpeg"].endswith(f"-{size}.jpg")
+        with default_storage.open(paths["webp"]) as file, Image.open(file) as image:
+            assert (image.format, image.size) == ("WEBP", (int(size), int(size)))
+
+    # Одинаковое содержимое - те же пути, файлы не перезаписываются
+    same = default_storage.save("avatars/same.png", default_storage.open(name))
+    assert AvatarService.make_variants(same) == variants
+
+    # Маленький оригинал не увеличивается, большой JPEG декодируется в уменьшенном масштабе
+    small = default_storage.save("avatars/small.png", make_image_file((50, 30)))
+    with default_storage.open(AvatarService.make_variants(small)["320"]["jpeg"]) as file, Image.open(file) as image:
+        assert image.size == (30, 30)
+    large = default_storage.save("avatars/large.jpg", make_image_file((4000, 3000), image_format="JPEG"))
+    with patch.object(AvatarService, "make_square", wraps=AvatarService.make_square) as make_square:
+        AvatarService.make_variants(large)
+    assert max(make_square.call_args.args[0].size) < 4000
+
+    settings.AVATAR_MAX_PIXELS = 1000
+    with pytest.raises(ValueError):
+        AvatarService.make_variants(name)
+
+
+def test_avatar_choose_variant() -> None:
+    """Тестирование выбора наименьшего подходящего варианта и формата"""
+    variants = {str(size): {"webp": f"{size}.webp", "jpeg": f"{size}.jpg"} for size in (40, 80, 160, 320)}
+    assert AvatarService.choose_variant(variants, 40, "image/webp,*/*") == "40.webp"
+    assert AvatarService.choose_variant(variants, 41, "image/png") == "80.jpg"
+    assert AvatarService.choose_variant(variants, 1000, "") == "320.jpg"
+    assert AvatarService.choose_variant(variants, 0, "") == "40.jpg"
+    assert AvatarService.choose_variant({}, 40, "") is None
+
+
+@pytest.mark.django_db
+def test_avatar_upload_and_redirect(settings, tmp_path, user_api_client: APIClient, user: User) -> None:
+    """Тестирование загрузки аватара, его обработки задачей и перенаправления на вариант"""
+    settings.MEDIA_ROOT = tmp_path
+    url = reverse("users:avatar", kwargs={"pk": user.pk})
+    assert user_api_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+
+    response = user_api_client.put(
+        reverse("users:avatar_upload"), {"image": make_image_file((500, 500))}, format="multipart"
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    user.refresh_from_db()
+    outbox = TaskOutbox.objects.get()
+    assert (outbox.task_name, outbox.args) == (process_avatar.name, [user.pk, user.image.name])
+
+    # До обработки - оригинал без кэширования
+    response = user_api_client.get(url, {"size": 40})
+    assert response.status_code == status.HTTP_302_FOUND
+    assert response["Location"] == user.image.url
+    assert "max-age=0" in response["Cache-Control"]
+
+    process_avatar(*outbox.args)
+    user.refresh_from_db()
+    response = user_api_client.get(url, {"size": 64}, HTTP_ACCEPT="image/webp,*/*")
+    assert response["Location"] == default_storage.url(user.avatar_variants["80"]["webp"])
+    assert response["Vary"] == "Accept"
+    assert "max-age=300" in response["Cache-Control"]
+    response = user_api_client.get(url, {"size": 64})
+    assert response["Location"].endswith("-80.jpg")
+    assert user_api_client.get(url, {"size": "abc"}).status_code == status.HTTP_400_BAD_REQUEST
+
+    # Обработка аватара, который уже заменен новой загрузкой, не меняет пути вариантов
+    other = default_storage.save("avatars/other.png", make_image_file((100, 100)))
+    assert process_avatar(user.pk, other) != user.avatar_variants
+    assert User.objects.get(pk=user.pk).avatar_variants == user.avatar_variants
+
+
+@pytest.mark.django_db
+def test_avatar_upload_validation(settings, tmp_path, user_api_client: APIClient) -> None:
+    """Тестирование ограничений размера загружаемого аватара"""
+    settings.MEDIA_ROOT = tmp_path
+    url = reverse("users:avatar_upload")
+    response = user_api_client.put(url, {"image": SimpleUploadedFile("a.png", b"not an image")}, format="multipart")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    settings.AVATAR_MAX_PIXELS = 100
+    response = user_api_client.put(url, {"image": make_image_file((20, 20))}, format="multipart")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "пикселей" in str(response.data["image"])
+
+    settings.AVATAR_MAX_UPLOAD_SIZE = 10
+    response = user_api_client.put(url, {"image": make_image_file((5, 5))}, format="multipart")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not TaskOutbox.objects.exists()
+
+
+def test_query_budget_declared() -> None:
+    """Тестирование объявления бюджета SQL-запросов для всех представлений users"""
+    for pattern in users_urls.urlpatterns:
+        view_class = pattern.callback.view_class
+        if view_class.__module__ == "users.views":
+            assert "query_budget" in vars(view_class), view_class.__name__
+
+
+@pytest.mark.django_db
+def test_cached_jwt_authentication(user: User, django_assert_num_queries) -> None:
+    """Тестирование кэширования пользователя при JWT-аутентификации и сброса кэша сигналами"""
+    authentication = CachedJWTAuthentication()
+    token = AccessToken.for_user(user)
+    with django_assert_num_queries(1):
+        cached_user = authentication.get_user(token)
+    with django_assert_num_queries(0):
+        cached_user = authentication.get_user(token)
+    assert (cached_user.pk, cached_user.role, cached_user.is_active) == (user.pk, "user", True)
+    assert cached_user.is_authenticated
+
+    # Остальные поля загружаются при обращении
+    with django_assert_num_queries(1):
+        assert cached_user.email == user.email
+
+    # Локальный LRU пуст, данные берутся из общего кэша
+    UserAuthCache.clear_local()
+    with django_assert_num_queries(0):
+        authentication.get_user(token)
+
+    user.role = "admin"
+    user.save()
+    with django_assert_num_queries(1):
+        assert authentication.get_user(token).role == "admin"
+
+    user.is_active = False
+    user.save()
+    with pytest.raises(AuthenticationFailed, match="User is inactive"):
+        authentication.get_user(token)
+
+    user.delete()
+    with pytest.raises(AuthenticationFailed, match="User not found"):
+        authentication.get_user(token)
+
+
+@pytest.mark.django_db
+def test_cached_user_save_keeps_other_fields(user: User) -> None:
+    """Тестирование сохранения пользователя из кэша без перезаписи незагруженных полей"""
+    cached_user = CachedJWTAuthentication().get_user(AccessToken.for_user(user))
+    cached_user.role = "admin"
+    cached_user.save()
+    user.refresh_from_db()
+    assert (user.role, user.email, user.is_active) == ("admin", "user1@example.com", True)
+
+
+def test_user_auth_cache_lru(settings) -> None:
+    """Тестирование ограничения размера и времени жизни локального LRU"""
+    settings.USER_AUTH_CACHE_SIZE = 2
+    for user_id in (1, 2, 3):
+        UserAuthCache.set(user_id, {"id": user_id, "role": "user", "is_active": True})
+    assert list(UserAuthCache._local) == ["2", "3"]
+
+    settings.USER_AUTH_CACHE_LOCAL_TTL = -1
+    UserAuthCache._set_local(4, {"id": 4, "role": "user", "is_active": True})
+    assert UserAuthCache._get_local(4) is None
+
+
+@pytest.mark.django_db
+def test_cached_jwt_admin_permission(api_client: APIClient, user: User, admin: User) -> None:
+    """Тестирование проверки роли IsAdmin для пользователя из кэша"""
+    url = reverse("buyrate:reviews-import")
+    for _ in range(2):
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        assert api_client.post(url, b"", content_type="application/x-ndjson").status_code == status.HTTP_403_FORBIDDEN
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(admin)}")
+        assert api_client.post(url, b"", content_type="application/x-ndjson").status_code == status.HTTP_200_OK
@@ -3,7 +3,13 @@ from rest_framework.permissions import AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from users.apps import UsersConfig
-from users.views import UserCreateAPIView, UserResetPassword, UserResetPasswordConfirm
+from users.views import (
+    UserAvatarAPIView,
+    UserAvatarUploadAPIView,
+    UserCreateAPIView,
+    UserResetPassword,
+    UserResetPasswordConfirm,
+)
 
 app_name = UsersConfig.name
 
@@ -15,4 +21,7 @@ urlpatterns = [
     path("register/", UserCreateAPIView.as_view(), name="register"),
     path("reset_password/", UserResetPassword.as_view(), name="reset_password"),
     path("reset_password_confirm/", UserResetPasswordConfirm.as_view(), name="reset_password_confirm"),
+    # Avatar
+    path("me/avatar/", UserAvatarUploadAPIView.as_view(), name="avatar_upload"),
+    path("<int:pk>/avatar/", UserAvatarAPIView.as_view(), name="avatar"),
 ]
@@ -1,21 +1,24 @@
-import secrets
-
-from django.http import Http404
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import Http404, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.generics import CreateAPIView
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import AllowAny
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from users.models import User
-from users.serializers import UserCreateSerializer
-from users.tasks import send_password_recovery_email
+from users.serializers import UserAvatarSerializers, UserCreateSerializer
+from users.services import AvatarService, PasswordResetTokenService
+from users.tasks import process_avatar, send_password_recovery_email
 
 
 class UserCreateAPIView(CreateAPIView):
@@ -23,6 +26,7 @@ class UserCreateAPIView(CreateAPIView):
     Представление для создания пользователя (POST)
     """
 
+    query_budget = 2
     serializer_class = UserCreateSerializer
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
@@ -41,6 +45,7 @@ class UserResetPassword(APIView):
             Запрос сброса пароля для пользователя.
     """
 
+    query_budget = 5  # пользователь, токен (хранилище db), задача в TaskOutbox, SAVEPOINT/RELEASE
     permission_classes = (AllowAny,)
 
     @swagger_auto_schema(
@@ -69,12 +74,11 @@ class UserResetPassword(APIView):
         """
         email = request.data.get("email")
         try:
-            user = get_object_or_404(User, email=email)
+            user = get_object_or_404(User.objects.only("id"), email=email)
             uidb64 = urlsafe_base64_encode(force_bytes(str(user.pk)))
-            token = secrets.token_hex(16)
-            user.token = token
-            user.save()
-            send_password_recovery_email.delay(email, uidb64, token)
+            with transaction.atomic():
+                token = PasswordResetTokenService.issue(user.pk)
+                send_password_recovery_email.enqueue(email, uidb64, token)
             return Response({"detail": "Ссылка для сброса успешно отправлена"}, status=status.HTTP_200_OK)
         except Http404:
             return Response({"detail": "Пользователь не найден"}, status=status.HTTP_404_NOT_FOUND)
@@ -88,6 +92,7 @@ class UserResetPasswordConfirm(APIView):
             Подтверждает сброс пароля для пользователя.
     """
 
+    query_budget = 3  # пользователь, токен (хранилище db), UPDATE пароля
     permission_classes = (AllowAny,)
 
     @swagger_auto_schema(
@@ -124,11 +129,92 @@ class UserResetPasswordConfirm(APIView):
         new_password = request.data.get("new_password")
         try:
             uid = urlsafe_base64_decode(uidb64).decode()
-            user = get_object_or_404(User, pk=uid)
-            if user.token != token:
+            user = get_object_or_404(User.objects.only("id", "password"), pk=uid)
+            if not PasswordResetTokenService.consume(user.pk, token):
                 return Response({"detail": "Токен не корректный"}, status=status.HTTP_403_FORBIDDEN)
             user.set_password(new_password)
-            user.save()
+            user.save(update_fields=["password"])
             return Response({"detail": "Пароль успешно изменен"}, status=status.HTTP_200_OK)
         except Http404:
             return Response({"detail": "Пользователь не найден"}, status=status.HTTP_404_NOT_FOUND)
+
+
+class UserAvatarUploadAPIView(APIView):
+    """
+    Представление для загрузки аватара текущего пользователя (PUT)
+    Оригинал сохраняется сразу, варианты (AvatarService) создаются задачей process_avatar,
+    до их готовности отдаются предыдущие варианты.
+    Методы:
+        put(self, request: Request) -> Response:
+            Сохраняет оригинал и ставит обработку аватара в очередь.
+    """
+
+    query_budget = 4  # пользователь, UPDATE image, задача в TaskOutbox, SAVEPOINT/RELEASE
+    parser_classes = (MultiPartParser, FormParser)
+
+    @swagger_auto_schema(
+        operation_id="avatar_upload",
+        request_body=UserAvatarSerializers,
+        responses={202: openapi.Response("Аватар принят в обработку"), 400: openapi.Response("Неверное изображение")},
+    )
+    def put(self, request: Request) -> Response:
+        """
+        Сохраняет оригинал и ставит обработку аватара в очередь
+        :param request: HTTP запрос с изображением в поле image (multipart/form-data)
+        :return: Ответ с сообщением о результате операции.
+        """
+        serializer = UserAvatarSerializers(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = request.user
+        with transaction.atomic():
+            user.image = serializer.validated_data["image"]
+            user.save(update_fields=["image"])
+            process_avatar.enqueue(user.pk, user.image.name)
+        return Response({"detail": "Аватар принят в обработку"}, status=status.HTTP_202_ACCEPTED)
+
+
+class UserAvatarAPIView(APIView):
+    """
+    Представление аватара пользователя (GET)
+    Перенаправляет на наименьший вариант не меньше ?size= (в пикселях) в формате WebP, если клиент его
+    принимает (Accept), иначе JPEG. Пока варианты не готовы, перенаправляет на оригинал.
+    Методы:
+        get(self, request: Request, pk: int) -> HttpResponseRedirect:
+            Перенаправляет на вариант аватара.
+    """
+
+    query_budget = 2  # пользователь (JWT, при промахе кэша), варианты аватара
+    permission_classes = (AllowAny,)
+    cache_max_age = 5 * 60
+
+    @swagger_auto_schema(
+        operation_id="avatar",
+        security=[],
+        manual_parameters=[
+            openapi.Parameter(
+                "size", openapi.IN_QUERY, description="Размер аватара, пиксели", type=openapi.TYPE_INTEGER
+            ),
+        ],
+        responses={302: openapi.Response("Перенаправление на изображение"), 404: openapi.Response("Аватара нет")},
+    )
+    def get(self, request: Request, pk: int):
+        """
+        Перенаправляет на вариант аватара
+        :param request: HTTP запрос с необязательным параметром size
+        :param pk: id пользователя
+        :return: Перенаправление на изображение
+        """
+        try:
+            size = int(request.query_params.get("size", 0))
+        except ValueError:
+            return Response({"detail": "Неверный размер"}, status=status.HTTP_400_BAD_REQUEST)
+        row = User.objects.filter(pk=pk).values_list("avatar_variants", "image").first()
+        if row is None or not (row[0] or row[1]):
+            return Response({"detail": "Аватар не найден"}, status=status.HTTP_404_NOT_FOUND)
+
+        variants, image = row
+        name = AvatarService.choose_variant(variants, size, request.headers.get("Accept", ""))
+        response = HttpResponseRedirect(default_storage.url(name or image))
+        patch_vary_headers(response, ["Accept"])
+        patch_cache_control(response, public=True, max_age=self.cache_max_age if name else 0)
+        return response